@@ -0,0 +1,199 @@
+"""
+Reproducible synthetic filesystem trees for the discovery and lookup benchmarks.
+
+The generated root looks like a small Mac:
+    <root>/Applications/<App>.app               bundles with XML or binary Info.plist, resources and nested helpers
+    <root>/Users/bench/Library/...              leftovers of some apps in the usual Library locations, plus decoys
+    <root>/data/...                             deep decoy hierarchy with symlink loops
+
+Usage:
+    python benchmarks/fixtures.py <root> [--apps 50] [--decoy-files 100000] [--seed 1]
+"""
+
+import argparse
+import json
+import os
+import plistlib
+import random
+from typing import List
+
+
+class FixtureGenerator:
+    LIBRARY_LOCATIONS = [
+        'Application Support',
+        'Caches',
+        'Preferences',
+        'Containers',
+        'Group Containers',
+        'Saved Application State',
+        'HTTPStorages',
+        'LaunchAgents',
+    ]
+
+    def __init__(self, root: str, apps: int = 50, resources_per_app: int = 200, helpers_per_app: int = 1,
+                 leftover_ratio: float = 0.5, binary_plist_ratio: float = 0.5, decoy_files: int = 100000,
+                 decoy_depth: int = 6, decoy_fanout: int = 8, symlink_loops: int = 4, seed: int = 1) -> None:
+        self.root = os.path.abspath(root)
+        self.apps = apps
+        self.resources_per_app = resources_per_app
+        self.helpers_per_app = helpers_per_app
+        self.leftover_ratio = leftover_ratio
+        self.binary_plist_ratio = binary_plist_ratio
+        self.decoy_files = decoy_files
+        self.decoy_depth = decoy_depth
+        self.decoy_fanout = decoy_fanout
+        self.symlink_loops = symlink_loops
+        self.seed = seed
+
+        self.files = 0
+        self.dirs = 0
+
+    @property
+    def applications_root(self) -> str:
+        return os.path.join(self.root, 'Applications')
+
+    @property
+    def library_root(self) -> str:
+        return os.path.join(self.root, 'Users', 'bench', 'Library')
+
+    def generate(self) -> dict:
+        """
+        Generate the tree and return its manifest (the parameters, the app identifiers and the entry counts).
+        """
+        rng = random.Random(self.seed)
+        self.files = 0
+        self.dirs = 0
+
+        app_manifests = [self.__create_app(rng, idx) for idx in range(self.apps)]
+        self.__create_library(rng, app_manifests)
+        self.__create_decoys(rng)
+
+        manifest = {
+            'root': self.root,
+            'seed': self.seed,
+            'parameters': {
+                'apps': self.apps,
+                'resources_per_app': self.resources_per_app,
+                'helpers_per_app': self.helpers_per_app,
+                'leftover_ratio': self.leftover_ratio,
+                'binary_plist_ratio': self.binary_plist_ratio,
+                'decoy_files': self.decoy_files,
+                'decoy_depth': self.decoy_depth,
+                'decoy_fanout': self.decoy_fanout,
+                'symlink_loops': self.symlink_loops,
+            },
+            'apps': app_manifests,
+            'files': self.files,
+            'dirs': self.dirs,
+        }
+        with open(os.path.join(self.root, 'manifest.json'), 'w') as fp:
+            json.dump(manifest, fp, indent=2)
+
+        return manifest
+
+    def __create_app(self, rng: random.Random, idx: int) -> dict:
+        name = f"Bench App {idx}"
+        identifier = f"com.vendor{idx % 7}.Bench-App-{idx}"
+        bundle = os.path.join(self.applications_root, f"Vendor {idx % 3}" if idx % 5 == 0 else '', f"{name}.app")
+        self.__write_bundle(rng, bundle, identifier, name)
+
+        helpers = []
+        for helper_idx in range(self.helpers_per_app):
+            helper_identifier = f"{identifier}.helper{helper_idx}"
+            helper = os.path.join(bundle, 'Contents', 'Library', 'LoginItems', f"{name} Helper {helper_idx}.app")
+            self.__write_bundle(rng, helper, helper_identifier, f"{name} Helper {helper_idx}")
+            helpers.append(helper_identifier)
+
+        return {'name': name, 'identifier': identifier, 'path': bundle, 'helpers': helpers, 'leftovers': []}
+
+    def __write_bundle(self, rng: random.Random, bundle: str, identifier: str, name: str) -> None:
+        contents = os.path.join(bundle, 'Contents')
+        self.__makedirs(os.path.join(contents, 'MacOS'))
+        self.__makedirs(os.path.join(contents, 'Resources'))
+
+        info = {
+            'CFBundleIdentifier': identifier,
+            'CFBundleName': name,
+            'CFBundleShortVersionString': f"{rng.randint(1, 20)}.{rng.randint(0, 9)}",
+            'CFBundleExecutable': name,
+            'CFBundleIconFile': 'AppIcon',
+        }
+        fmt = plistlib.FMT_BINARY if rng.random() < self.binary_plist_ratio else plistlib.FMT_XML
+        with open(os.path.join(contents, 'Info.plist'), 'wb') as fp:
+            plistlib.dump(info, fp, fmt=fmt)
+        self.files += 1
+
+        self.__touch(os.path.join(contents, 'MacOS', name))
+        for resource_idx in range(self.resources_per_app):
+            subdir = os.path.join(contents, 'Resources', f"group{resource_idx % 10}")
+            if resource_idx < 10:
+                self.__makedirs(subdir)
+            self.__touch(os.path.join(subdir, f"resource{resource_idx}.dat"))
+
+    def __create_library(self, rng: random.Random, app_manifests: List[dict]) -> None:
+        for location in self.LIBRARY_LOCATIONS:
+            self.__makedirs(os.path.join(self.library_root, location))
+            for decoy_idx in range(20):
+                self.__touch(os.path.join(self.library_root, location, f"org.decoy.Tool{decoy_idx}.plist"))
+
+        for app in app_manifests:
+            if rng.random() >= self.leftover_ratio:
+                continue
+
+            for location in rng.sample(self.LIBRARY_LOCATIONS, 3):
+                if location in ('Preferences', 'LaunchAgents'):
+                    path = os.path.join(self.library_root, location, f"{app['identifier']}.plist")
+                    self.__touch(path)
+                else:
+                    path = os.path.join(self.library_root, location, app['identifier'])
+                    self.__makedirs(os.path.join(path, 'data'))
+                    for file_idx in range(5):
+                        self.__touch(os.path.join(path, 'data', f"blob{file_idx}"))
+                app['leftovers'].append(path)
+
+    def __create_decoys(self, rng: random.Random) -> None:
+        data_root = os.path.join(self.root, 'data')
+        self.__makedirs(data_root)
+
+        directories = [data_root]
+        frontier = [data_root]
+        for depth in range(self.decoy_depth):
+            next_frontier = []
+            for directory in frontier:
+                for idx in range(rng.randint(1, self.decoy_fanout)):
+                    subdir = os.path.join(directory, f"d{depth}-{idx}")
+                    self.__makedirs(subdir)
+                    next_frontier.append(subdir)
+            directories.extend(next_frontier)
+            frontier = next_frontier[:max(1, self.decoy_fanout ** 3)]
+
+        for idx in range(self.decoy_files):
+            self.__touch(os.path.join(directories[idx % len(directories)], f"decoy{idx}.bin"))
+
+        for idx in range(self.symlink_loops):
+            os.symlink(data_root, os.path.join(directories[(idx * 7919) % len(directories)], f"loop{idx}"))
+
+    def __makedirs(self, path: str) -> None:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+            self.dirs += 1
+
+    def __touch(self, path: str) -> None:
+        open(path, 'wb').close()
+        self.files += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root')
+    parser.add_argument('--apps', type=int, default=50)
+    parser.add_argument('--decoy-files', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    manifest = FixtureGenerator(args.root, apps=args.apps, decoy_files=args.decoy_files, seed=args.seed).generate()
+    print(f"Generated {manifest['files']} files and {manifest['dirs']} directories in {manifest['root']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Compares the memory held by large related-file result sets and app lists in their compact representation
+(PathStore, slotted AppModel) and in the plain one they replaced (list of str, AppModel with a __dict__).
+
+Usage:
+    python benchmarks/memory_benchmark.py [--apps 500] [--paths-per-app 600] [--seed 1] [--output results.json]
+
+The sizes are measured with tracemalloc, only the memory allocated while building each representation counts.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.AppModel import AppModel
+from models.PathStore import PathStore
+
+LOCATIONS = [
+    '/Users/benchmark/Library/Containers/{identifier}/Data/Library/Caches',
+    '/Users/benchmark/Library/Containers/{identifier}/Data/Library/Application Support/{name}',
+    '/Users/benchmark/Library/Group Containers/group.{identifier}/Library/Caches',
+    '/Users/benchmark/Library/Application Support/{name}/Cache/Cache_Data',
+    '/Users/benchmark/Library/Caches/{identifier}/fsCachedData',
+]
+
+
+class PlainAppModel:
+    """AppModel as it was before it got slots, for comparison"""
+
+    def __init__(self, name, identifier, path, display_name=None, version='', executable='', helper_identifiers=None):
+        self.name = name
+        self.identifier = identifier
+        self.path = path
+        self.display_name = display_name or name
+        self.version = version
+        self.executable = executable
+        self.relative_identifier = identifier.replace(f".{name.replace(' ', '-')}", '')
+        self.helper_identifiers = helper_identifiers or []
+        self.match_patterns = frozenset({self.identifier, self.relative_identifier} | set(self.helper_identifiers))
+        self.paths = [path]
+        self.versions = [version]
+
+
+def generate_apps(count: int, rng: random.Random) -> list:
+    apps = []
+    for i in range(count):
+        name = f"App{i:04d} {rng.choice(['Pro', 'Studio', 'Helper', 'Lite'])}"
+        identifier = f"com.vendor{rng.randrange(count // 4 + 1)}.{name.replace(' ', '-')}"
+        apps.append((name, identifier, f"/Applications/{name}.app", f"{rng.randrange(10)}.{rng.randrange(100)}"))
+
+    return apps
+
+
+def generate_paths(apps: list, paths_per_app: int, rng: random.Random) -> list:
+    paths = []
+    for name, identifier, _, _ in apps:
+        for i in range(paths_per_app):
+            directory = rng.choice(LOCATIONS).format(identifier=identifier, name=name)
+            paths.append(f"{directory}/{rng.getrandbits(64):016x}.{i % 97:02d}.cache")
+
+    return paths
+
+
+def measure(build) -> tuple:
+    """Bytes still allocated by build() once it returned, and the seconds it took"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', type=int, default=500)
+    parser.add_argument('--paths-per-app', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    apps = generate_apps(args.apps, rng)
+    # Decoded from bytes, the way the walk produces them, so they are not shared with the generator
+    encoded = [path.encode() for path in generate_paths(apps, args.paths_per_app, rng)]
+    print(f"{args.apps} apps, {len(encoded)} paths")
+
+    results = {
+        'related_files': {
+            'list': measure(lambda: [path.decode() for path in encoded]),
+            'PathStore': measure(lambda: PathStore(path.decode() for path in encoded)),
+        },
+        'apps': {
+            'plain': measure(lambda: [PlainAppModel(name, identifier, path, version=version)
+                                      for name, identifier, path, version in apps]),
+            'slotted': measure(lambda: [AppModel(name, identifier, path, version=version)
+                                        for name, identifier, path, version in apps]),
+        },
+    }
+
+    for benchmark, representations in results.items():
+        baseline = None
+        for representation, (size, elapsed) in representations.items():
+            baseline = baseline or size
+            print(f"{benchmark:>14} {representation:>10} {size / 1024:>12.0f} KB {elapsed:>8.3f}s "
+                  f"{size / baseline:>7.2f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'apps': args.apps,
+                'paths': len(encoded),
+                'results': {
+                    benchmark: {representation: {'bytes': size, 'elapsed': round(elapsed, 3)}
+                                for representation, (size, elapsed) in representations.items()}
+                    for benchmark, representations in results.items()
+                },
+            }, fp, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
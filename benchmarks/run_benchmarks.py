@@ -0,0 +1,178 @@
+"""
+Times the app discovery and the related-file lookup against a synthetic tree and stores the results as JSON,
+so a change can be compared with the previous commit.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--size small|medium|large] [--workers 1 --workers 8]
+                                        [--root EXISTING_FIXTURE] [--output results.json] [--compare previous.json]
+
+Every benchmark runs in its own process so the peak RSS reported is its own.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fixtures import FixtureGenerator
+from models.AppModel import AppModel
+from services.AppService import AppService
+from services.FileLookupService import FileLookupService
+
+SIZES = {
+    'small': {'apps': 20, 'resources_per_app': 50, 'decoy_files': 10000},
+    'medium': {'apps': 100, 'resources_per_app': 200, 'decoy_files': 200000},
+    'large': {'apps': 300, 'resources_per_app': 1000, 'decoy_files': 2000000},
+}
+
+
+def peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def bench_list_apps(manifest: dict, workers: int) -> dict:
+    app_service = AppService(os.path.join(manifest['root'], 'Applications'))
+    started = time.perf_counter()
+    apps = app_service.list_apps()
+    elapsed = time.perf_counter() - started
+
+    return {'elapsed': elapsed, 'entries': app_service.visited_entries, 'results': apps.length()}
+
+
+def bench_find_app_related_files(manifest: dict, workers: int) -> dict:
+    app = next((app for app in manifest['apps'] if app['leftovers']), manifest['apps'][0])
+    app_model = AppModel(app['name'], app['identifier'], app['path'])
+    lookup_service = FileLookupService(app_model, search_paths=[manifest['root']], workers=workers)
+    started = time.perf_counter()
+    related_files = lookup_service.find_app_related_files()
+    elapsed = time.perf_counter() - started
+
+    return {'elapsed': elapsed, 'entries': manifest['files'] + manifest['dirs'], 'results': len(related_files),
+            'visited_dirs': lookup_service.visited_dirs}
+
+
+def bench_find_related_files_batch(manifest: dict, workers: int) -> dict:
+    app_models = [AppModel(app['name'], app['identifier'], app['path']) for app in manifest['apps']]
+    lookup_service = FileLookupService(search_paths=[manifest['root']], workers=workers)
+    started = time.perf_counter()
+    related_files = lookup_service.find_related_files(app_models)
+    elapsed = time.perf_counter() - started
+
+    return {'elapsed': elapsed, 'entries': manifest['files'] + manifest['dirs'],
+            'results': sum(len(paths) for paths in related_files.values()),
+            'visited_dirs': lookup_service.visited_dirs}
+
+
+BENCHMARKS = {
+    'list_apps': bench_list_apps,
+    'find_app_related_files': bench_find_app_related_files,
+    'find_related_files_batch': bench_find_related_files_batch,
+}
+
+
+def run_isolated(name: str, manifest: dict, workers: int) -> dict:
+    """Run a benchmark function in a fresh process so the peak RSS is its own"""
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_one, (name, manifest, workers))
+
+
+def run_one(name: str, manifest: dict, workers: int) -> dict:
+    result = BENCHMARKS[name](manifest, workers)
+    result['entries_per_second'] = result['entries'] / result['elapsed'] if result['elapsed'] else None
+    result['peak_rss_kb'] = peak_rss_kb()
+
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=BENCHMARKS_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, previous_path: str) -> None:
+    with open(previous_path) as fp:
+        previous = json.load(fp)
+
+    previous_runs = {(run['benchmark'], run['workers']): run for run in previous['runs']}
+    print(f"\nCompared with {previous.get('commit')} ({previous_path}):")
+    for run in results['runs']:
+        before = previous_runs.get((run['benchmark'], run['workers']))
+        if before is None:
+            continue
+        change = (run['elapsed'] - before['elapsed']) / before['elapsed'] * 100 if before['elapsed'] else 0
+        print(f"{run['benchmark']:>28} w={run['workers']:<3} {before['elapsed']:.3f}s -> {run['elapsed']:.3f}s "
+              f"({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, action='append', help="Lookup worker counts to run (repeatable)")
+    parser.add_argument('--benchmark', choices=sorted(BENCHMARKS), action='append')
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark, the fastest one is kept")
+    parser.add_argument('--root', help="Existing fixture (with its manifest.json) instead of a generated one")
+    parser.add_argument('--output', help="Where to write the JSON results")
+    parser.add_argument('--compare', help="Previous JSON results to compare with")
+    args = parser.parse_args()
+
+    temp_dir = None
+    if args.root:
+        with open(os.path.join(args.root, 'manifest.json')) as fp:
+            manifest = json.load(fp)
+    else:
+        temp_dir = tempfile.mkdtemp(prefix='uninstaller-benchmark-')
+        print(f"Generating the {args.size} fixture in {temp_dir}...")
+        manifest = FixtureGenerator(temp_dir, seed=args.seed, **SIZES[args.size]).generate()
+        print(f"{manifest['files']} files, {manifest['dirs']} directories")
+
+    results = {
+        'commit': git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'fixture': {key: manifest[key] for key in ('seed', 'parameters', 'files', 'dirs')},
+        'runs': [],
+    }
+
+    try:
+        for name in args.benchmark or list(BENCHMARKS):
+            for workers in (args.workers or [1, 4]) if name != 'list_apps' else [1]:
+                runs = [run_isolated(name, manifest, workers) for _ in range(max(1, args.repeat))]
+                best = min(runs, key=lambda run: run['elapsed'])
+                best.update({'benchmark': name, 'workers': workers})
+                results['runs'].append(best)
+                print(f"{name:>28} w={workers:<3} {best['elapsed']:8.3f}s {best['entries_per_second'] or 0:12.0f} "
+                      f"entries/s {best['peak_rss_kb']:>9} KB peak RSS {best['results']:>7} results")
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+    output = args.output or os.path.join(BENCHMARKS_DIR, 'results', f"{results['commit']}-{args.size}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fp:
+        json.dump(results, fp, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures how the directory walk throughput of ParallelWalker scales with the number of workers.
+
+Usage:
+    python benchmarks/walker_benchmark.py [--fanout 8] [--depth 4] [--files 20] [--max-workers 8] [--root PATH]
+
+A synthetic tree is generated in a temporary folder unless --root points to an existing tree.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ParallelWalker import ParallelWalker
+
+
+def build_tree(root, fanout, depth, files):
+    directories = 0
+    stack = [(root, 0)]
+    while stack:
+        directory, level = stack.pop()
+        os.makedirs(directory, exist_ok=True)
+        directories += 1
+        for i in range(files):
+            open(os.path.join(directory, f"file-{i}.dat"), 'w').close()
+
+        if level < depth:
+            stack.extend((os.path.join(directory, f"dir-{i}"), level + 1) for i in range(fanout))
+
+    return directories
+
+
+def visit(root, dirs, files, state):
+    return [(d, state) for d in dirs], len(dirs) + len(files)
+
+
+def run(root, workers):
+    walker = ParallelWalker(workers)
+    directories = 0
+    entries = 0
+    started = time.perf_counter()
+    for _, count in walker.walk(root, None, visit):
+        directories += 1
+        entries += count
+
+    return directories, entries, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--root', help="Existing tree to walk instead of a generated one")
+    args = parser.parse_args()
+
+    root = args.root
+    temp_dir = None
+    if root is None:
+        temp_dir = tempfile.mkdtemp(prefix='walker-benchmark-')
+        root = os.path.join(temp_dir, 'tree')
+        print(f"Generating tree in {root}...")
+        print(f"{build_tree(root, args.fanout, args.depth, args.files)} directories generated")
+
+    try:
+        # Warm up the directory cache so every run measures the same thing
+        run(root, 1)
+
+        baseline = None
+        print(f"{'workers':>8} {'dirs':>10} {'entries':>10} {'seconds':>9} {'entries/s':>12} {'speedup':>8}")
+        workers = 1
+        while workers <= args.max_workers:
+            directories, entries, elapsed = run(root, workers)
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {directories:>10} {entries:>10} {elapsed:>9.3f} {entries / elapsed:>12.0f} "
+                  f"{baseline / elapsed:>7.2f}x")
+            workers *= 2
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
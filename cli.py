@@ -0,0 +1,354 @@
+"""
+Headless command line interface, usable without PySide6 (e.g. over SSH for fleet scans).
+
+Usage:
+    python -m cli list-apps [--root /Applications] [--format text|json|ndjson]
+    python -m cli find-related <bundle-id|path> [--search-path /] [--workers 8] [--format ...]
+    python -m cli audit [--root /Applications] [--search-path /] [--format ...]
+    python -m cli orphans [--root /Applications] [--location ~/Library/Caches] [--format ...]
+    python -m cli daemon [--root /Applications] [--search-path /] [--interval 30]
+
+list-apps and find-related answer from a running daemon with --daemon.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+from typing import Iterable, List
+
+from models.AppModel import AppModel
+from repositories.AppCatalog import AppCatalog
+from repositories.AppRegistry import AppRegistry
+from repositories.PathIndex import PathIndex
+from services.AppService import AppService
+from services.CancellationToken import CancellationToken
+from services.DiskUsageService import DiskUsageService
+from services.FileLookupService import FileLookupService
+from services.MountService import MountService
+from services.OrphanAuditService import OrphanAuditService
+from services.ScanClient import ScanClient
+from services.ScanDaemon import ScanDaemon
+from services.ScanMetrics import ScanMetrics
+from services.VolumeScanService import VolumeScanService
+
+FORMATS = ('text', 'json', 'ndjson')
+TIERS = {
+    'all': FileLookupService.ALL_TIERS,
+    'one': FileLookupService.TIER_ONE,
+    'two': FileLookupService.TIER_TWO,
+}
+
+
+def app_record(app: AppModel) -> dict:
+    return {
+        'name': app.name,
+        'display_name': app.display_name,
+        'identifier': app.identifier,
+        'version': app.version,
+        'executable': app.executable,
+        'path': app.path,
+        'paths': list(app.paths),
+        'versions': list(app.versions),
+    }
+
+
+def list_apps(args) -> List[AppModel]:
+    app_service = AppService(args.root, max_depth=args.max_depth, catalog=None if args.no_cache else AppCatalog(),
+                             metrics=args.metrics)
+
+    return sorted(app_service.list_apps().list(), key=lambda app: app.name.lower())
+
+
+def find_app(args) -> AppModel:
+    target = args.target
+    if target.rstrip('/').endswith('.app') or os.path.isdir(target):
+        registry = AppRegistry().append(os.path.abspath(target))
+        if registry is not None:
+            return registry.choice(0)
+    else:
+        for app in list_apps(args):
+            if app.identifier == target:
+                return app
+
+    raise LookupError(f"No application found for {target}")
+
+
+def create_lookup_service(args, app_model: AppModel = None) -> FileLookupService:
+    devices = None
+    if args.one_file_system:
+        devices = {os.stat(path).st_dev for path in args.search_path or FileLookupService.SEARCH_PATHS}
+
+    mount_service = MountService(args.mount_kind or [MountService.LOCAL], args.fs_type_allow, args.fs_type_deny)
+    if args.per_volume:
+        return VolumeScanService(
+            app_model,
+            search_paths=args.search_path,
+            workers=args.workers,
+            cancellation_token=CancellationToken(timeout=args.timeout, max_entries=args.max_entries),
+            metrics=args.metrics,
+            mount_service=mount_service,
+            volume_timeout=args.volume_timeout,
+            devices=devices
+        )
+
+    return FileLookupService(
+        app_model,
+        search_paths=args.search_path,
+        path_index=PathIndex(workers=args.workers) if args.index else None,
+        force_rescan=args.force_rescan,
+        workers=args.workers,
+        cancellation_token=CancellationToken(timeout=args.timeout, max_entries=args.max_entries),
+        metrics=args.metrics,
+        devices=devices,
+        mount_service=mount_service
+    )
+
+
+# The services report warnings with print(), they are redirected to stderr so only the records reach stdout
+OUTPUT = sys.stdout
+
+
+def write_records(records: Iterable[dict], output_format: str, text_line) -> None:
+    if output_format == 'json':
+        json.dump(list(records), OUTPUT, indent=2)
+        OUTPUT.write('\n')
+        return
+
+    for record in records:
+        if output_format == 'ndjson':
+            OUTPUT.write(json.dumps(record) + '\n')
+        else:
+            OUTPUT.write(text_line(record) + '\n')
+        OUTPUT.flush()
+
+
+def command_list_apps(args) -> int:
+    if args.daemon:
+        apps = sorted(ScanClient(args.socket).list_apps().list(), key=lambda app: app.name.lower())
+    else:
+        apps = list_apps(args)
+
+    write_records(
+        (app_record(app) for app in apps),
+        args.format,
+        lambda record: f"{record['name']}\t{record['identifier']}\t{record['version']}\t{record['path']}"
+    )
+
+    return 0
+
+
+def command_find_related(args) -> int:
+    if args.daemon:
+        return command_find_related_from_daemon(args)
+
+    app = find_app(args)
+    lookup_service = create_lookup_service(args, app)
+
+    # Matches are written as soon as they are found, except for the JSON format which needs the whole list:
+    # it is written like the other lookups, the app paths first and the other paths sorted
+    def records():
+        related_files = list()
+        for directory, matches in lookup_service.walk_related_files([app], TIERS[args.tier]):
+            for app_model, path in matches:
+                if args.format != 'json' or not directory:
+                    yield {'identifier': app_model.identifier, 'path': path}
+                else:
+                    related_files.append(path)
+
+        for path in sorted(related_files):
+            yield {'identifier': app.identifier, 'path': path}
+
+    write_records(records(), args.format, lambda record: record['path'])
+    return report_incomplete(lookup_service)
+
+
+def command_find_related_from_daemon(args) -> int:
+    client = ScanClient(args.socket)
+    if args.target.rstrip('/').endswith('.app') or os.path.isdir(args.target):
+        app = find_app(args)
+    else:
+        app = client.find_app(args.target)
+    related_files = client.find_related_files(app, TIERS[args.tier], args.force_rescan)
+
+    write_records(({'identifier': app.identifier, 'path': path} for path in related_files), args.format,
+                  lambda record: record['path'])
+    if related_files.complete:
+        return 0
+
+    print(f"Lookup stopped early ({related_files.reason}), results are incomplete", file=sys.stderr)
+    return 3
+
+
+def command_daemon(args) -> int:
+    daemon = ScanDaemon(args.socket, roots=args.root, search_paths=args.search_path, refresh_interval=args.interval,
+                        workers=args.workers, metrics=args.metrics)
+    # Exit through serve_forever() so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        daemon.serve_forever()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+def command_audit(args) -> int:
+    apps = list_apps(args)
+    lookup_service = create_lookup_service(args)
+    if TIERS[args.tier] == FileLookupService.TIER_ONE:
+        related_files = lookup_service.find_tier_one_related_files(apps)
+    elif TIERS[args.tier] == FileLookupService.TIER_TWO:
+        related_files = lookup_service.find_tier_two_related_files(apps)
+    else:
+        related_files = lookup_service.find_related_files(apps)
+
+    write_records(
+        (dict(app_record(app), related_files=list(related_files[app])) for app in apps),
+        args.format,
+        lambda record: "\n".join([f"{record['name']} ({record['identifier']})"] +
+                                 [f"  {path}" for path in record['related_files']])
+    )
+    return report_incomplete(lookup_service)
+
+
+def command_orphans(args) -> int:
+    token = CancellationToken(timeout=args.timeout)
+    audit_service = OrphanAuditService(args.location, cancellation_token=token, metrics=args.metrics)
+    groups = audit_service.audit(list_apps(args))
+
+    write_records(
+        ({'identifier': group.identifier, 'size': group.size, 'paths': group.paths} for group in groups),
+        args.format,
+        lambda record: "\n".join([f"{record['identifier']} ({DiskUsageService.format_size(record['size'])})"] +
+                                 [f"  {path}" for path in record['paths']])
+    )
+    if token.is_stopped():
+        print(f"Audit stopped early ({token.reason}), results are incomplete", file=sys.stderr)
+        return 3
+
+    return 0
+
+
+def report_incomplete(lookup_service: FileLookupService) -> int:
+    if lookup_service.complete:
+        return 0
+
+    print(f"Lookup stopped early ({lookup_service.incomplete_reason}), results are incomplete", file=sys.stderr)
+    return 3
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m cli', description="Mac Apps Uninstaller command line interface")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    apps_options = argparse.ArgumentParser(add_help=False)
+    apps_options.add_argument('--root', action='append', help="Folder to discover apps in (repeatable, default: "
+                                                             "/Applications, ~/Applications and the Applications "
+                                                             "folders of the other volumes)")
+    apps_options.add_argument('--max-depth', type=int, default=None, help="Maximum folder depth of the app discovery")
+    apps_options.add_argument('--no-cache', action='store_true', help="Ignore the on-disk app catalog")
+    apps_options.add_argument('--format', choices=FORMATS, default='text')
+    apps_options.add_argument('--metrics', action='store_true', help="Write the scan counters and timings as JSON "
+                                                                    "to stderr")
+
+    lookup_options = argparse.ArgumentParser(add_help=False)
+    lookup_options.add_argument('--search-path', action='append', help="Folder to search related files in "
+                                                                      "(repeatable, default: /)")
+    lookup_options.add_argument('--tier', choices=sorted(TIERS), default='all',
+                                help="one: well known Library locations, two: everything else, all: both")
+    lookup_options.add_argument('--workers', type=int, default=None,
+                                help="Threads listing directories (default: 1, more can help on cold disks)")
+    lookup_options.add_argument('--index', action='store_true', help="Answer from the persistent path index")
+    lookup_options.add_argument('--force-rescan', action='store_true', help="Rebuild the path index from disk")
+    lookup_options.add_argument('--one-file-system', action='store_true',
+                                help="Stay on the devices of the search paths, like du -x")
+    lookup_options.add_argument('--mount-kind', action='append', choices=MountService.KINDS,
+                                help="Kind of mounted volumes to search (repeatable, default: local)")
+    lookup_options.add_argument('--fs-type-allow', action='append', help="Only search the volumes of this file "
+                                                                        "system type (repeatable)")
+    lookup_options.add_argument('--fs-type-deny', action='append', help="Never search the volumes of this file "
+                                                                       "system type (repeatable)")
+    lookup_options.add_argument('--per-volume', action='store_true',
+                                help="Search every volume in its own process, the path index is not used")
+    lookup_options.add_argument('--volume-timeout', type=float, default=None,
+                                help="With --per-volume, stop searching a volume after this many seconds")
+    lookup_options.add_argument('--timeout', type=float, default=None, help="Stop the lookup after this many seconds")
+    lookup_options.add_argument('--max-entries', type=int, default=None,
+                                help="Stop the lookup after examining this many entries")
+
+    daemon_options = argparse.ArgumentParser(add_help=False)
+    daemon_options.add_argument('--socket', default=None, help="Unix socket of the scan daemon (default: in the "
+                                                               "cache directory)")
+
+    client_options = argparse.ArgumentParser(add_help=False, parents=[daemon_options])
+    client_options.add_argument('--daemon', action='store_true', help="Ask the running scan daemon instead of "
+                                                                      "scanning, --root and the lookup options are "
+                                                                      "the daemon's")
+
+    list_parser = subparsers.add_parser('list-apps', parents=[apps_options, client_options],
+                                        help="List the installed apps")
+    list_parser.set_defaults(handler=command_list_apps)
+
+    find_parser = subparsers.add_parser('find-related', parents=[apps_options, lookup_options, client_options],
+                                        help="Find the files related to one app")
+    find_parser.add_argument('target', help="Bundle identifier or path of the .app bundle")
+    find_parser.set_defaults(handler=command_find_related)
+
+    audit_parser = subparsers.add_parser('audit', parents=[apps_options, lookup_options],
+                                         help="Find the files related to every installed app in a single walk")
+    audit_parser.set_defaults(handler=command_audit)
+
+    orphans_parser = subparsers.add_parser('orphans', parents=[apps_options],
+                                           help="Find the Library entries of apps which are not installed anymore")
+    orphans_parser.add_argument('--location', action='append', help="Folder whose entries are audited (repeatable, "
+                                                                    "default: the Library locations)")
+    orphans_parser.add_argument('--timeout', type=float, default=None, help="Stop the audit after this many seconds")
+    orphans_parser.set_defaults(handler=command_orphans)
+
+    daemon_parser = subparsers.add_parser('daemon', parents=[apps_options, daemon_options],
+                                          help="Keep the app list and the path index warm and answer the "
+                                               "list-apps and find-related queries of the clients")
+    daemon_parser.add_argument('--search-path', action='append', help="Folder to index (repeatable, default: /)")
+    daemon_parser.add_argument('--workers', type=int, default=None,
+                               help="Threads listing directories (default: 1, more can help on cold disks)")
+    daemon_parser.add_argument('--interval', type=float, default=None,
+                               help=f"Seconds between two rediscoveries of the apps, the path index is rescanned "
+                                    f"every {ScanDaemon.INDEX_REFRESH_AGE}s (default: {ScanDaemon.REFRESH_INTERVAL})")
+    daemon_parser.set_defaults(handler=command_daemon)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'per_volume', False) and args.index:
+        parser.error("--per-volume walks the disk, it cannot be combined with --index")
+    for path in getattr(args, 'search_path', None) or []:
+        if not os.path.isdir(path):
+            parser.error(f"--search-path {path}: no such folder")
+    args.root = args.root or AppService.default_roots()
+    show_metrics = args.metrics
+    args.metrics = ScanMetrics(args.command) if show_metrics else ScanMetrics.disabled()
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.handler(args)
+    except BrokenPipeError:
+        return 0
+    except (LookupError, PermissionError, ConnectionError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if show_metrics:
+            print(json.dumps(args.metrics.snapshot(), sort_keys=True), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
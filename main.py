@@ -1,16 +1,37 @@
 import sys
 import os
-import subprocess
-from PySide6.QtWidgets import (QApplication, QMainWindow, QListWidget, QListWidgetItem, 
+import logging
+import multiprocessing
+import threading
+import time
+from PySide6.QtWidgets import (QApplication, QMainWindow, QListView, QTreeView, QHeaderView, QLineEdit,
                               QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, 
                               QMessageBox, QTextEdit, QSplitter, QDialog, QCheckBox,
                               QMenuBar, QMenu, QProgressBar)
-from PySide6.QtCore import Qt, QSize, QThread, QObject, Signal, QRunnable, QThreadPool
+from PySide6.QtCore import (Qt, QSize, QThread, QObject, Signal, QRunnable, QThreadPool, QTimer,
+                            QSortFilterProxyModel)
 from PySide6.QtGui import QIcon, QFont, QAction  # QAction moved to QtGui in PySide6
 
 from models.AppModel import AppModel
+from repositories.AppCatalog import AppCatalog
+from repositories.AppMetadataCache import AppMetadataCache
+from repositories.DiskUsageCache import DiskUsageCache
+from repositories.PathIndex import PathIndex
+from repositories.StagingArea import StagingArea
+from services.AppMetadataService import AppMetadataService
 from services.AppService import AppService
+from services.CacheDirectory import CacheDirectory
+from services.CancellationToken import CancellationToken
+from services.DeletionService import DeletionService
+from services.DiskUsageService import DiskUsageService
 from services.FileLookupService import FileLookupService
+from services.MountService import MountService
+from services.ScanClient import ScanClient
+from services.ScanMetrics import ScanMetrics
+from services.VolumeScanService import VolumeScanService
+from views.AppListModel import AppListModel
+from views.AppMetadataLoader import AppMetadataLoader, create_thumbnail
+from views.RelatedFilesModel import RelatedFilesModel
 
 # Try to import app_icon, but handle gracefully if it fails
 try:
@@ -21,23 +42,56 @@ except ImportError:
     print("Warning: app_icon module not available, using default icon")
 
 
+def request_scan_daemon(request):
+    """Answer of the scan daemon if one is running, None when the worker has to scan by itself"""
+    client = ScanClient()
+    if not client.available():
+        return None
+
+    try:
+        return request(client)
+    except ScanClient.Unavailable as e:
+        print(f"Scan daemon unavailable, scanning locally: {e}")
+        return None
+
+
 class AppLoaderSignals(QObject):
     """Signals for the AppLoader worker thread"""
+    cached = Signal(object)    # Signal emitted with the apps from the on-disk catalog, before revalidation
+    partial = Signal(object)   # Signal emitted with the apps of the folders listed so far, slower volumes pending
     finished = Signal(object)  # Signal emitted when loading is complete, passes the loaded apps
     error = Signal(str)        # Signal emitted when an error occurs
 
 
 class AppLoader(QThread):
     """Worker thread for loading applications"""
-    def __init__(self, lookup_folder):
+    def __init__(self, lookup_folders):
         super().__init__()
-        self.lookup_folder = lookup_folder
+        self.lookup_folders = lookup_folders
+        self.cancellation_token = CancellationToken()
+        self.metrics = ScanMetrics('list_apps')
         self.signals = AppLoaderSignals()
+
+    def cancel(self):
+        self.cancellation_token.cancel()
         
     def run(self):
         try:
-            app_service = AppService(self.lookup_folder)
-            apps = app_service.list_apps()
+            # A running scan daemon already knows the apps
+            apps = request_scan_daemon(lambda client: client.list_apps())
+            if apps is not None:
+                self.signals.finished.emit(apps)
+                return
+
+            app_service = AppService(self.lookup_folders, catalog=AppCatalog(),
+                                     cancellation_token=self.cancellation_token, metrics=self.metrics)
+            cached_apps = app_service.list_cached_apps()
+            if cached_apps.length():
+                self.signals.cached.emit(cached_apps)
+
+            apps = app_service.list_apps(self.signals.partial.emit)
+            self.metrics.log(lookup_folders=app_service.lookup_folders, apps=apps.length(),
+                             incomplete_reason=apps.incomplete_reason)
             self.signals.finished.emit(apps)
         except Exception as e:
             self.signals.error.emit(str(e))
@@ -45,28 +99,179 @@ class AppLoader(QThread):
 
 class FileLookupSignals(QObject):
     """Signals for the FileLookup worker thread"""
+    progress = Signal(list, int, str)  # Signal emitted periodically with the new files, folders visited and current folder
+    tier_finished = Signal(list)  # Signal emitted when the well known locations are scanned, passes the found files
     finished = Signal(list)    # Signal emitted when lookup is complete, passes the found files
     error = Signal(str)        # Signal emitted when an error occurs
 
 
 class FileLookup(QThread):
     """Worker thread for finding related files"""
-    def __init__(self, app_model):
+    # Minimum number of seconds between two progress signals
+    PROGRESS_INTERVAL = 0.1
+
+    # Seconds after which the search of a volume stops with partial results, when every volume is searched
+    # in its own process
+    VOLUME_TIMEOUT = 5 * 60
+
+    def __init__(self, app_model, path_index=None, force_rescan=False, full_sweep=True, timeout=None,
+                 per_volume=False, index_lock=None):
         super().__init__()
         self.app_model = app_model
+        self.path_index = path_index
+        # Held while the path index is refreshed and read, a retired lookup may still be using it
+        self.index_lock = index_lock or threading.Lock()
+        self.force_rescan = force_rescan
+        self.full_sweep = full_sweep
+        self.per_volume = per_volume  # Walk every volume in its own process instead of reading the path index
+        self.cancellation_token = CancellationToken(timeout=timeout)
+        self.incomplete_reason = None  # Set when the lookup was stopped before the end
+        self.from_daemon = False  # Set when the files were found by the scan daemon
+        self.metrics = ScanMetrics('find_related_files')
         self.signals = FileLookupSignals()
+
+    def cancel(self):
+        self.cancellation_token.cancel()
         
     def run(self):
         try:
-            lookup_service = FileLookupService(self.app_model)
-            related_files = lookup_service.find_app_related_files()
+            tier = FileLookupService.ALL_TIERS if self.full_sweep else FileLookupService.TIER_ONE
+            related_files = None
+            if not self.per_volume:
+                related_files = request_scan_daemon(
+                    lambda client: client.find_related_files(self.app_model, tier, self.force_rescan))
+            if related_files is not None:
+                self.from_daemon = True
+                self.incomplete_reason = related_files.reason
+                self.signals.finished.emit(list(related_files))
+                return
+
+            # Network shares, disk images and pseudo file systems are not searched
+            if self.per_volume:
+                lookup_service = VolumeScanService(self.app_model, cancellation_token=self.cancellation_token,
+                                                   metrics=self.metrics, mount_service=MountService(),
+                                                   volume_timeout=self.VOLUME_TIMEOUT)
+            else:
+                lookup_service = FileLookupService(self.app_model, path_index=self.path_index,
+                                                   force_rescan=self.force_rescan,
+                                                   cancellation_token=self.cancellation_token,
+                                                   metrics=self.metrics, mount_service=MountService())
+            related_files = self.stream_files(lookup_service, FileLookupService.TIER_ONE)
+            self.signals.tier_finished.emit(list(related_files))
+
+            if self.full_sweep and lookup_service.complete:
+                with self.index_lock:
+                    related_files += self.stream_files(lookup_service, FileLookupService.TIER_TWO)
+
+            self.incomplete_reason = lookup_service.incomplete_reason
+            self.metrics.log(identifier=self.app_model.identifier, related_files=len(related_files),
+                             full_sweep=self.full_sweep, incomplete_reason=self.incomplete_reason)
             self.signals.finished.emit(related_files)
         except Exception as e:
             self.signals.error.emit(str(e))
 
+    def stream_files(self, lookup_service, tier):
+        """Run one lookup tier, emitting the files in batches as they are found"""
+        found_files = []
+        batch = []
+        last_emit = time.monotonic()
+        directory = ''
+        for directory, matches in lookup_service.walk_related_files([self.app_model], tier):
+            batch.extend(path for app_model, path in matches)
+
+            if time.monotonic() - last_emit >= self.PROGRESS_INTERVAL:
+                self.signals.progress.emit(batch, lookup_service.indexed_dirs + lookup_service.visited_dirs,
+                                           directory)
+                found_files.extend(batch)
+                batch = []
+                last_emit = time.monotonic()
+
+        self.signals.progress.emit(batch, lookup_service.indexed_dirs + lookup_service.visited_dirs, directory)
+        found_files.extend(batch)
+
+        return found_files
+
+
+class SizeCalculatorSignals(QObject):
+    """Signals for the SizeCalculator worker thread"""
+    measured = Signal(str, int)  # Signal emitted with every top-level path and its size in bytes, memoized then measured
+    finished = Signal(dict)    # Signal emitted when all the paths are measured, passes the sizes
+    error = Signal(str)        # Signal emitted when an error occurs
+
+
+class SizeCalculator(QThread):
+    """Worker thread for computing the disk space an uninstall gives back"""
+    def __init__(self, file_paths):
+        super().__init__()
+        self.file_paths = file_paths
+        self.cancellation_token = CancellationToken()
+        self.signals = SizeCalculatorSignals()
+
+    def cancel(self):
+        self.cancellation_token.cancel()
+
+    def run(self):
+        try:
+            disk_usage_service = DiskUsageService(cache=DiskUsageCache(),
+                                                  cancellation_token=self.cancellation_token)
+            sizes = disk_usage_service.measure_many(self.file_paths, self.signals.measured.emit)
+            self.signals.finished.emit(sizes)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+
+class DeleterSignals(QObject):
+    """Signals for the Deleter worker thread"""
+    removed = Signal(object)   # Signal emitted with the DeletionResult of every path, as soon as it is removed or fails
+    finished = Signal(list, object)  # Signal emitted when all the paths are processed, passes the results and the staged uninstall
+    error = Signal(str)        # Signal emitted when an error occurs
+
+
+class Deleter(QThread):
+    """Worker thread for removing the files of an app, through the staging area when one is given"""
+    def __init__(self, file_paths, staging_area=None, label=''):
+        super().__init__()
+        self.file_paths = file_paths
+        self.staging_area = staging_area
+        self.label = label
+        self.signals = DeleterSignals()
+
+    def run(self):
+        try:
+            deletion_service = DeletionService()
+            if self.staging_area is None:
+                staged = None
+                results = deletion_service.remove_many(self.file_paths, self.signals.removed.emit)
+            else:
+                staged, results = deletion_service.stage_many(self.file_paths, self.staging_area, self.label,
+                                                              self.signals.removed.emit)
+            self.signals.finished.emit(results, staged)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+
+class Purger(QThread):
+    """Worker thread for purging staging directories, started with a low priority"""
+    def __init__(self, staged_uninstalls):
+        super().__init__()
+        self.staged_uninstalls = staged_uninstalls
+
+    def run(self):
+        # Failures stay in the staging area and are retried by the next purge
+        deletion_service = DeletionService()
+        for staged in self.staged_uninstalls:
+            result = deletion_service.purge(staged)
+            if not result.removed:
+                print(f"Error purging {staged.directory}: {', '.join(result.errors)}")
 
 
 class MainWindow(QMainWindow):
+    # Seconds during which an uninstall can be undone before its staging directory is purged
+    UNDO_WINDOW = 30
+
+    # Paths listed in the tooltip of the reclaimable space
+    LARGEST_PATHS = 10
+
     def __init__(self):
         super().__init__()
         
@@ -83,18 +288,18 @@ class MainWindow(QMainWindow):
             QMainWindow {
                 background-color: #f5f5f7;
             }
-            QListWidget {
+            QListView, QTreeView {
                 background-color: #ffffff;
                 border: 1px solid #d2d2d7;
                 border-radius: 8px;
                 padding: 5px;
                 font-size: 13px;
             }
-            QListWidget::item {
+            QListView::item {
                 border-bottom: 1px solid #d2d2d7;
                 padding: 8px;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #0071e3;
                 color: white;
             }
@@ -145,9 +350,16 @@ class MainWindow(QMainWindow):
         title_label.setObjectName("titleLabel")
         left_layout.addWidget(title_label)
         
-        self.app_list = QListWidget()
+        # Icons, versions, sizes and last used times are loaded in the background for the painted rows only
+        self.app_metadata_loader = AppMetadataLoader(
+            AppMetadataService(AppMetadataCache(), create_thumbnail), self)
+        self.app_list_model = AppListModel(self.app_metadata_loader, self)
+        self.app_list = QListView()
+        self.app_list.setModel(self.app_list_model)
+        self.app_list.setUniformItemSizes(True)
+        self.app_list.setIconSize(QSize(24, 24))
         self.app_list.setMinimumWidth(250)
-        self.app_list.currentItemChanged.connect(self.on_app_selected)
+        self.app_list.selectionModel().currentChanged.connect(self.on_app_selected)
         left_layout.addWidget(self.app_list)
         
         # Loading progress bar for app list
@@ -168,6 +380,43 @@ class MainWindow(QMainWindow):
         self.app_details = QTextEdit()
         self.app_details.setReadOnly(True)
         right_layout.addWidget(self.app_details)
+
+        # Related files, fed in batches by the lookup, rendered lazily and checked to be included in the uninstall
+        self.related_files_model = RelatedFilesModel(self)
+        self.related_files_proxy = QSortFilterProxyModel(self)
+        self.related_files_proxy.setSourceModel(self.related_files_model)
+        self.related_files_proxy.setSortRole(RelatedFilesModel.SORT_ROLE)
+        self.related_files_proxy.setFilterKeyColumn(RelatedFilesModel.PATH_COLUMN)
+        self.related_files_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.related_files_filter = QLineEdit()
+        self.related_files_filter.setPlaceholderText("Filter related files")
+        self.related_files_filter.setClearButtonEnabled(True)
+        self.related_files_filter.textChanged.connect(self.related_files_proxy.setFilterFixedString)
+        self.related_files_filter.hide()
+        right_layout.addWidget(self.related_files_filter)
+
+        self.related_files_view = QTreeView()
+        self.related_files_view.setModel(self.related_files_proxy)
+        self.related_files_view.setRootIsDecorated(False)
+        self.related_files_view.setUniformRowHeights(True)
+        self.related_files_view.setAlternatingRowColors(True)
+        # Lookup order, app paths first, until a column header is clicked
+        self.related_files_view.header().setSortIndicator(-1, Qt.AscendingOrder)
+        self.related_files_view.setSortingEnabled(True)
+        self.related_files_view.header().setStretchLastSection(False)
+        self.related_files_view.header().setSectionResizeMode(RelatedFilesModel.PATH_COLUMN, QHeaderView.Stretch)
+        self.related_files_view.header().setSectionResizeMode(RelatedFilesModel.SIZE_COLUMN,
+                                                              QHeaderView.ResizeToContents)
+        self.related_files_view.hide()
+        right_layout.addWidget(self.related_files_view, 2)
+
+        self.select_all_checkbox = QCheckBox("Select all")
+        self.select_all_checkbox.setChecked(True)
+        self.select_all_checkbox.toggled.connect(self.related_files_model.set_all_checked)
+        self.select_all_checkbox.hide()
+        right_layout.addWidget(self.select_all_checkbox)
+        self.related_files_model.dataChanged.connect(self.on_related_files_checked)
         
         # Loading progress bar for file lookup
         self.file_loading_progress = QProgressBar()
@@ -183,12 +432,43 @@ class MainWindow(QMainWindow):
         self.find_files_button.hide()  # Hide until an app is selected
         self.find_files_button.clicked.connect(self.find_related_files)
         right_layout.addWidget(self.find_files_button)
+
+        # Continue with the whole disk once the well known locations are scanned
+        self.full_sweep_checkbox = QCheckBox("Search the whole disk")
+        self.full_sweep_checkbox.setChecked(True)
+        self.full_sweep_checkbox.hide()
+        right_layout.addWidget(self.full_sweep_checkbox)
+
+        # Bypass the path index and walk the whole disk again
+        self.force_rescan_checkbox = QCheckBox("Force full rescan")
+        self.force_rescan_checkbox.hide()
+        self.full_sweep_checkbox.toggled.connect(self.force_rescan_checkbox.setEnabled)
+        right_layout.addWidget(self.force_rescan_checkbox)
+
+        # Walk the disk instead of the path index, every volume in its own process
+        self.per_volume_checkbox = QCheckBox("Search every volume separately")
+        self.per_volume_checkbox.setToolTip("Walk every disk in its own process, a slow or unresponsive volume is "
+                                            "skipped instead of stalling the search. The file index is not used.")
+        self.per_volume_checkbox.hide()
+        self.full_sweep_checkbox.toggled.connect(self.per_volume_checkbox.setEnabled)
+        right_layout.addWidget(self.per_volume_checkbox)
         
+        # Disk space given back by the uninstall, filled in while the files are measured
+        self.space_label = QLabel()
+        self.space_label.hide()
+        right_layout.addWidget(self.space_label)
+
         self.uninstall_button = QPushButton("Uninstall")
         self.uninstall_button.setEnabled(False)
         self.uninstall_button.hide()  # Hide until related files are found
         self.uninstall_button.clicked.connect(self.uninstall_app)
         right_layout.addWidget(self.uninstall_button)
+
+        # Restore the files of the last uninstall until its staging directory is purged
+        self.undo_button = QPushButton("Undo Uninstall")
+        self.undo_button.hide()
+        self.undo_button.clicked.connect(self.undo_uninstall)
+        right_layout.addWidget(self.undo_button)
         
         # Add panels to splitter
         splitter.addWidget(left_panel)
@@ -197,13 +477,37 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(splitter)
         self.setCentralWidget(central_widget)
+
+        # Live scan figures while scanning, the final summary afterwards
+        self.statusBar()
         
         # Initialize data
         self.selected_app = None
+        # Files found for the selected app
+        self.related_files = None
         self.apps = None
+        self.populating_app_list = False
+        self.path_index = PathIndex()
+        self.path_index_lock = threading.Lock()  # Shared by the lookups, which refresh and save the same index
+        self.app_loader = None
+        self.file_lookup = None
+        self.size_calculator = None
+        self.deleter = None
+        self.staging_area = StagingArea()
+        self.staged_uninstall = None  # Last uninstall, which can be undone until the timer purges it
+        self.purger = None
+        self.purge_requested = False  # Set when a purge is asked while the staging area is in use
+        self.uninstalling = False
+        self.undo_timer = QTimer(self)
+        self.undo_timer.setSingleShot(True)
+        self.undo_timer.timeout.connect(self.expire_undo)
+        self.retired_workers = []  # Cancelled workers kept alive until their thread ends
         
         # Start loading apps in background
         self.load_apps()
+
+        # Staging directories left by the last session, or by a crash, are not restorable anymore
+        self.purge_staging()
     
     def create_menu_bar(self):
         # Create menu bar
@@ -252,21 +556,47 @@ class MainWindow(QMainWindow):
         """Start loading applications in background thread"""
         # Show loading progress
         self.app_loading_progress.setRange(0, 0)  # Indeterminate progress
+        self.app_loading_progress.setFormat("Loading applications...")
         self.app_loading_progress.show()
         
         # Disable app list during loading
         self.app_list.setEnabled(False)
         
-        # Create and start the worker thread
-        self.app_loader = AppLoader('/Applications')
+        # Create and start the worker thread, replacing a load which is still running
+        self.retire_worker(self.app_loader)
+        self.app_loader = AppLoader(AppService.default_roots())
+        self.app_loader.signals.cached.connect(self.on_apps_cached)
+        self.app_loader.signals.partial.connect(self.on_apps_cached)
         self.app_loader.signals.finished.connect(self.on_apps_loaded)
         self.app_loader.signals.error.connect(self.on_app_load_error)
         self.app_loader.start()
     
+    def retire_worker(self, worker):
+        """Cancel a worker whose results are not wanted anymore, so at most one scan of each kind runs"""
+        if worker is None or not worker.isRunning():
+            return
+
+        worker.cancel()
+        # Results of a superseded scan must not reach the UI
+        worker.signals.blockSignals(True)
+
+        # Keep a reference until the thread ends, destroying a running QThread aborts the application
+        self.retired_workers.append(worker)
+        worker.finished.connect(lambda: self.retired_workers.remove(worker))
+
+    def on_apps_cached(self, apps):
+        """Handler for an app list available before the loading is done: the catalog, then the folders listed so far"""
+        self.apps = apps
+        self.populate_app_list()
+
+        self.app_loading_progress.setFormat("Refreshing applications...")
+        self.app_list.setEnabled(True)
+
     def on_apps_loaded(self, apps):
         """Handler for when apps are loaded successfully"""
         self.apps = apps
         self.populate_app_list()
+        self.show_scan_summary(self.app_loader.metrics)
         
         # Hide progress and enable app list
         self.app_loading_progress.hide()
@@ -283,13 +613,17 @@ class MainWindow(QMainWindow):
         self.app_list.setEnabled(True)
     
     def refresh_app_list(self):
-        self.app_list.clear()
+        self.app_list_model.set_apps([])
+        self.on_app_selected(None, None)
         self.details_title.setText("Select an application")
         self.app_details.setText("")
         self.uninstall_button.setEnabled(False)
         self.uninstall_button.hide()  # Hide when refreshing app list
         self.find_files_button.setEnabled(False)
         self.find_files_button.hide()  # Hide when refreshing app list
+        self.full_sweep_checkbox.hide()
+        self.force_rescan_checkbox.hide()
+        self.per_volume_checkbox.hide()
         
         # Start loading apps again
         self.load_apps()
@@ -315,19 +649,44 @@ class MainWindow(QMainWindow):
         )
     
     def populate_app_list(self):
-        # Sort apps alphabetically by name
-        sorted_apps = sorted(self.apps.list(), key=lambda app: app.name.lower())
-        for app in sorted_apps:
-            item = QListWidgetItem(app.name)
-            item.setData(Qt.UserRole, app)
-            self.app_list.addItem(item)
+        # Keep the current selection when the list is rebuilt (e.g. after the cached list was revalidated)
+        selected_path = self.selected_app.path if self.selected_app is not None else None
+        self.populating_app_list = True
+        self.app_list_model.set_apps(self.apps.list())
+
+        row = self.app_list_model.row_of(selected_path) if selected_path is not None else -1
+        if row >= 0:
+            self.selected_app = self.app_list_model.app(row)
+            self.app_list.setCurrentIndex(self.app_list_model.index(row))
+
+        self.populating_app_list = False
+
+        # The selected app is gone after revalidation
+        if row < 0 and selected_path is not None:
+            self.on_app_selected(None, None)
     
     def on_app_selected(self, current, previous):
-        if current is None:
+        # Selection restored by populate_app_list, the app did not change
+        if self.populating_app_list:
+            return
+
+        # A lookup for the previously selected app is not needed anymore
+        self.retire_worker(self.file_lookup)
+        self.retire_worker(self.size_calculator)
+        self.space_label.hide()
+        self.show_related_files_view(False)
+        self.file_loading_progress.hide()
+        self.file_loading_progress.setFormat("Finding related files...")
+        self.related_files = None
+
+        if current is None or not current.isValid():
             self.uninstall_button.setEnabled(False)
             self.uninstall_button.hide()  # Hide when no app selected
             self.find_files_button.setEnabled(False)
             self.find_files_button.hide()  # Hide when no app selected
+            self.full_sweep_checkbox.hide()
+            self.force_rescan_checkbox.hide()
+            self.per_volume_checkbox.hide()
             self.details_title.setText("Select an application")
             self.app_details.setText("")
             self.selected_app = None
@@ -339,13 +698,18 @@ class MainWindow(QMainWindow):
         # Display basic app details immediately
         details = f"App name: {self.selected_app.name}\n"
         details += f"Bundle identifier: {self.selected_app.identifier}\n"
-        details += f"Relative identifier: {self.selected_app.relative_identifier}\n\n"
-        details += "Click 'Find Related Files' to search for files related to this application."
+        details += f"Relative identifier: {self.selected_app.relative_identifier}\n"
+        for path, version in zip(self.selected_app.paths, self.selected_app.versions):
+            details += f"Location: {path}" + (f" (version {version})" if version else "") + "\n"
+        details += "\nClick 'Find Related Files' to search for files related to this application."
         self.app_details.setText(details)
         
         # Show and enable the find files button
         self.find_files_button.setEnabled(True)
         self.find_files_button.show()
+        self.full_sweep_checkbox.show()
+        self.force_rescan_checkbox.show()
+        self.per_volume_checkbox.show()
         
         # Hide uninstall button until files are found
         self.uninstall_button.setEnabled(False)
@@ -360,8 +724,11 @@ class MainWindow(QMainWindow):
         details = f"App name: {self.selected_app.name}\n"
         details += f"Bundle identifier: {self.selected_app.identifier}\n"
         details += f"Relative identifier: {self.selected_app.relative_identifier}\n\n"
-        details += "Searching for related files...\n"
+        details += "Searching for related files..."
         self.app_details.setText(details)
+
+        # The rows are appended as the lookup finds them
+        self.show_related_files_view(True)
         
         # Disable the find files button while searching
         self.find_files_button.setEnabled(False)
@@ -370,42 +737,152 @@ class MainWindow(QMainWindow):
         self.file_loading_progress.setRange(0, 0)  # Indeterminate progress
         self.file_loading_progress.show()
         
-        # Start file lookup in background
-        self.file_lookup = FileLookup(self.selected_app)
+        # Start file lookup in background, at most one lookup runs at a time
+        self.retire_worker(self.file_lookup)
+        self.file_lookup = FileLookup(self.selected_app, self.path_index, self.force_rescan_checkbox.isChecked(),
+                                      self.full_sweep_checkbox.isChecked(),
+                                      per_volume=self.per_volume_checkbox.isChecked(),
+                                      index_lock=self.path_index_lock)
+        self.file_lookup.signals.progress.connect(self.on_file_lookup_progress)
+        self.file_lookup.signals.tier_finished.connect(self.on_tier_one_files_found)
         self.file_lookup.signals.finished.connect(self.on_files_found)
         self.file_lookup.signals.error.connect(self.on_file_lookup_error)
         self.file_lookup.start()
     
+    def on_file_lookup_progress(self, new_files, visited_dirs, current_dir):
+        """Handler for the batches of files streamed by the lookup, appended to the model as a single insert"""
+        if self.selected_app is None:
+            return
+
+        self.related_files_model.append_paths(new_files)
+
+        self.file_loading_progress.setFormat(f"Scanned {visited_dirs} folders: {current_dir}")
+        self.statusBar().showMessage(self.file_lookup.metrics.summary())
+
+    def on_tier_one_files_found(self, related_files):
+        """Handler for when the well known locations are scanned, the uninstall can start from these results"""
+        if self.selected_app is None:
+            return
+
+        # The files are already listed by the progress handler
+        self.related_files = related_files
+        self.uninstall_button.setEnabled(True)
+        self.uninstall_button.show()
+
     def on_files_found(self, related_files):
         """Handler for when related files are found successfully"""
         if self.selected_app is None:
             return
-            
+
+        # A per-volume search walks the disk, the path index is left as it was
+        status = self.index_freshness() if self.file_lookup.full_sweep and not self.file_lookup.per_volume else ""
+        if self.file_lookup.from_daemon:
+            status = "Found by the scan daemon"
+        if self.file_lookup.incomplete_reason is not None:
+            status = f"Search stopped early ({self.file_lookup.incomplete_reason}), the list may be incomplete"
+        self.show_related_files(related_files, status)
+        self.show_scan_summary(self.file_lookup.metrics)
+
+        # Hide progress bar
+        self.file_loading_progress.hide()
+        self.file_loading_progress.setFormat("Finding related files...")
+
+        # Measured once the lookup is over, so the lookup does not compete with it for the disk
+        self.measure_related_files(related_files)
+
+    def measure_related_files(self, related_files):
+        """Start computing the disk space given back by removing the related files"""
+        self.retire_worker(self.size_calculator)
+        self.space_label.show()
+
+        self.size_calculator = SizeCalculator(related_files)
+        self.size_calculator.signals.measured.connect(self.related_files_model.set_size)
+        self.size_calculator.signals.finished.connect(self.on_related_files_measured)
+        self.size_calculator.signals.error.connect(self.on_measure_error)
+        self.size_calculator.start()
+        self.update_space_label()
+
+    def on_related_files_checked(self, top_left, bottom_right, roles):
+        """Handler for the rows checked, unchecked or measured, the total follows the checked rows"""
+        if self.space_label.isVisible():
+            self.update_space_label()
+
+    def on_related_files_measured(self, sizes):
+        """Handler for when all the related files are measured"""
+        self.update_space_label()
+
+    def update_space_label(self):
+        model = self.related_files_model
+        space = DiskUsageService.format_size(model.checked_size)
+        if self.size_calculator is not None and self.size_calculator.isRunning():
+            space = f"about {space} (computing...)"
+
+        self.space_label.setText(f"{model.checked_count} of {model.rowCount()} files selected, "
+                                 f"reclaimable space: {space}")
+        self.space_label.setToolTip("\n".join(f"{DiskUsageService.format_size(size)}\t{path}"
+                                              for path, size in model.largest_checked(self.LARGEST_PATHS)))
+
+    def on_measure_error(self, error_msg):
+        """Handler for when the disk space cannot be computed"""
+        self.space_label.setText(f"Reclaimable space: unknown ({error_msg})")
+
+    def show_related_files_view(self, visible):
+        """Show the related files list, emptied, or hide it"""
+        self.related_files_model.clear()
+        self.related_files_filter.clear()
+        self.select_all_checkbox.setChecked(True)
+        self.related_files_filter.setVisible(visible)
+        self.related_files_view.setVisible(visible)
+        self.related_files_view.setEnabled(True)
+        self.select_all_checkbox.setVisible(visible)
+
+    def show_related_files(self, related_files, status):
         # Store the related files
-        self.selected_app.related_files = related_files
+        self.related_files = related_files
+
+        # Most rows are already listed by the progress handler
+        self.related_files_model.append_paths(related_files)
         
         # Update app details with found files
         details = f"App name: {self.selected_app.name}\n"
         details += f"Bundle identifier: {self.selected_app.identifier}\n"
         details += f"Relative identifier: {self.selected_app.relative_identifier}\n\n"
-        details += "Related files found:\n"
-        for file in self.selected_app.related_files:
-            details += f"• {file}\n"
+        if status:
+            details += f"{status}\n\n"
+        details += f"{len(related_files)} related files found, uncheck the ones to keep."
         
         self.app_details.setText(details)
         self.uninstall_button.setEnabled(True)
         self.uninstall_button.show()  # Show button when files are found
         
-        # Hide progress bar
-        self.file_loading_progress.hide()
-        
         # Hide the find files button since files are already found
         self.find_files_button.hide()
+        self.full_sweep_checkbox.hide()
+        self.force_rescan_checkbox.hide()
+        self.force_rescan_checkbox.setChecked(False)
+        self.per_volume_checkbox.hide()
+
+    def show_scan_summary(self, metrics):
+        """Show the final figures of a scan in the status bar"""
+        elapsed = metrics.snapshot()['elapsed']
+        self.statusBar().showMessage(f"{metrics.scan.replace('_', ' ').capitalize()} took {elapsed}s: "
+                                     f"{metrics.summary()}")
+
+    def index_freshness(self):
+        """Describe how recent the path index used to find the related files is"""
+        refreshed_at = self.path_index.refreshed_at
+        if refreshed_at is None:
+            return "File index: not built"
+
+        age = int(self.path_index.age())
+        when = time.strftime("%H:%M:%S", time.localtime(refreshed_at))
+        return f"File index refreshed at {when} ({age}s ago, {self.path_index.relisted_dirs} folders rescanned)"
     
     def on_file_lookup_error(self, error_msg):
         """Handler for when file lookup fails"""
         # Hide progress bar
         self.file_loading_progress.hide()
+        self.file_loading_progress.setFormat("Finding related files...")
         
         if "Python does not have read access to the /private folder" in error_msg:
             self.app_details.setText("Error: Python does not have read access to the /private folder.\n"
@@ -422,62 +899,84 @@ class MainWindow(QMainWindow):
     def uninstall_app(self):
         if self.selected_app is None:
             return
+
+        file_paths = self.related_files_model.checked_paths()
+        if not file_paths:
+            return
         
+        # Only known once the lookup is over, the uninstall can start from the tier one results
+        space = ""
+        if self.size_calculator is not None and self.size_calculator.file_paths is self.related_files:
+            space = DiskUsageService.format_size(self.related_files_model.checked_size)
+            if self.size_calculator.isRunning():
+                space = f"at least {space}"
+            space = f"This frees {space} of disk space.\n\n"
+
         # Show single confirmation dialog
         confirm = QMessageBox.question(
             self,
             "Confirm Uninstall",
             f"Are you sure you want to uninstall {self.selected_app.name}?\n\n"
-            "This action cannot be undone.",
+            f"{len(file_paths)} of {self.related_files_model.rowCount()} related files are removed. "
+            f"{space}"
+            f"The uninstall can be undone during {self.UNDO_WINDOW} seconds.",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
         
         if confirm == QMessageBox.Yes:
             # Execute the actual file removal
-            self.execute_uninstall(self.selected_app.related_files)
+            self.execute_uninstall(file_paths)
     
     def execute_uninstall(self, file_paths):
-        """Execute the uninstall by removing files with rm -rf command"""
+        """Execute the uninstall by moving the files to the staging area in a background thread"""
         # Update details panel to show uninstall progress
-        self.app_details.setText(f"Uninstalling {self.selected_app.name}...\n\nExecuting rm -rf commands:")
-        
-        successfully_removed = []
-        failed_removals = []
-        output_lines = [f"Uninstalling {self.selected_app.name}:", ""]
-        
-        for file_path in file_paths:
-            try:
-                output_lines.append(f"Removing: {file_path}")
-                
-                # Use subprocess to execute rm -rf with quoted file paths
-                result = subprocess.run(['rm', '-rf', file_path], 
-                                       capture_output=True, 
-                                       text=True, 
-                                       check=False)
-                
-                if result.returncode == 0:
-                    successfully_removed.append(file_path)
-                    output_lines.append("✓ Successfully removed")
-                else:
-                    failed_removals.append(file_path)
-                    output_lines.append("✗ Failed to remove (requires sudo)")
-                    if result.stderr:
-                        output_lines.append(f"Error: {result.stderr.strip()}")
-                
-                # Update display in real-time
-                self.app_details.setText("\n".join(output_lines))
-                # Force GUI update
-                QApplication.processEvents()
-                    
-            except Exception as e:
-                failed_removals.append(file_path)
-                output_lines.append(f"✗ Failed to remove: {str(e)}")
-                self.app_details.setText("\n".join(output_lines))
-                QApplication.processEvents()
-        
+        self.app_details.setText(f"Uninstalling {self.selected_app.name}:\n")
+
+        # The selection must not change while its files are removed
+        self.app_list.setEnabled(False)
+        self.related_files_view.setEnabled(False)
+        self.uninstall_button.setEnabled(False)
+        self.find_files_button.setEnabled(False)
+
+        # An uninstall started from the tier one results ends the lookup still sweeping the disk, its results
+        # would replace the uninstall summary, and the measure of the files being removed
+        self.retire_worker(self.file_lookup)
+        self.retire_worker(self.size_calculator)
+        self.file_loading_progress.hide()
+        self.file_loading_progress.setFormat("Finding related files...")
+
+        # Only the last uninstall can be undone, the previous one is purged now
+        self.expire_undo()
+        self.uninstalling = True
+
+        self.deleter = Deleter(file_paths, self.staging_area, self.selected_app.name)
+        self.deleter.signals.removed.connect(self.on_path_removed)
+        self.deleter.signals.finished.connect(self.on_uninstall_finished)
+        self.deleter.signals.error.connect(self.on_uninstall_error)
+        self.deleter.start()
+
+    def on_path_removed(self, result):
+        """Handler for every path removed or failed, only the new lines are appended to the details"""
+        lines = [f"Removing: {result.path}"]
+        if result.staged:
+            lines.append("✓ Moved to the staging area")
+        elif result.removed:
+            lines.append("✓ Successfully removed")
+        else:
+            lines.append("✗ Failed to remove (requires sudo)")
+            lines.extend(f"Error: {error}" for error in result.errors)
+
+        self.app_details.append("\n".join(lines))
+
+    def on_uninstall_finished(self, results, staged):
+        """Handler for when all the paths are processed"""
+        self.uninstalling = False
+        successfully_removed = [result.path for result in results if result.removed]
+        failed_removals = [result.path for result in results if not result.removed]
+        output_lines = [self.app_details.toPlainText(), ""]
+
         # Final summary
-        output_lines.append("")
         output_lines.append("=" * 50)
         output_lines.append("UNINSTALL SUMMARY")
         output_lines.append("=" * 50)
@@ -494,17 +993,108 @@ class MainWindow(QMainWindow):
             # Add commands without bullet points for easy copy-paste
             for file_path in failed_removals:
                 output_lines.append(f'sudo rm -rf "{file_path}"')
+
+            self.app_list.setEnabled(True)
+            self.related_files_view.setEnabled(True)
+            self.find_files_button.setEnabled(True)
         else:
             output_lines.append("All files successfully removed!")
             # Refresh the app list to reflect changes
             self.refresh_app_list()
+
+        if staged is not None and staged.entries:
+            output_lines.append("")
+            output_lines.append(f"The staged files can be restored during {self.UNDO_WINDOW} seconds.")
+            self.staged_uninstall = staged
+            self.undo_button.setText(f"Undo Uninstall of {staged.label}")
+            self.undo_button.show()
+            self.undo_timer.start(self.UNDO_WINDOW * 1000)
         
         # Show final output
         self.app_details.setText("\n".join(output_lines))
 
+        if self.purge_requested:
+            self.purge_staging()
+
+    def on_uninstall_error(self, error_msg):
+        """Handler for when the uninstall fails"""
+        self.uninstalling = False
+        self.app_details.append(f"\nError while uninstalling:\n{error_msg}")
+        self.app_list.setEnabled(True)
+        self.related_files_view.setEnabled(True)
+        self.find_files_button.setEnabled(True)
+
+    def undo_uninstall(self):
+        """Move the files of the last uninstall back, the files removed from other devices are gone"""
+        staged = self.staged_uninstall
+        if staged is None:
+            return
+
+        self.undo_timer.stop()
+        self.undo_button.hide()
+        self.staged_uninstall = None
+
+        failed = self.staging_area.restore(staged)
+        self.refresh_app_list()
+        if failed:
+            self.app_details.setText(f"Could not restore {len(failed)} files of {staged.label}:\n\n" +
+                                     "\n".join(failed))
+        else:
+            self.app_details.setText(f"{staged.label} was restored.")
+
+    def expire_undo(self):
+        """Close the undo window of the last uninstall and purge it"""
+        self.undo_timer.stop()
+        self.undo_button.hide()
+        self.staged_uninstall = None
+        self.purge_staging()
+
+    def purge_staging(self):
+        """Purge, at a low priority, the staging directories which cannot be undone anymore"""
+        if self.uninstalling or (self.purger is not None and self.purger.isRunning()):
+            # Purged once the staging area is not in use anymore
+            self.purge_requested = True
+            return
+
+        self.purge_requested = False
+        # The uninstalls of other running instances are left to them until their undo window closes
+        staged_uninstalls = [
+            staged for staged in self.staging_area.purgeable(self.UNDO_WINDOW)
+            if self.staged_uninstall is None or staged.id != self.staged_uninstall.id
+        ]
+        if not staged_uninstalls:
+            return
+
+        self.purger = Purger(staged_uninstalls)
+        self.purger.finished.connect(self.on_staging_purged)
+        self.purger.start(QThread.LowestPriority)
+
+    def on_staging_purged(self):
+        """Handler for when the purge thread ends"""
+        if self.purge_requested:
+            self.purge_staging()
+
+
+def configure_scan_log():
+    """Write the scan summaries, as JSON records, to scan.log in the user cache dir"""
+    try:
+        handler = logging.FileHandler(CacheDirectory.path('scan.log'))
+    except OSError as e:
+        print(f"Warning: Could not open the scan log: {e}")
+        return
+
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    scan_logger = logging.getLogger('mac_apps_uninstaller.scan')
+    scan_logger.addHandler(handler)
+    scan_logger.setLevel(logging.INFO)
+
 
 def main():
+    # The volume processes of a per-volume search are spawned from the executable of the app bundle
+    multiprocessing.freeze_support()
     try:
+        configure_scan_log()
+
         # Enable macOS-specific features
         if sys.platform == "darwin":
             # Set the app ID
@@ -0,0 +1,17 @@
+class AppMetadata:
+    path: str
+    version: str
+    size: int
+    last_used: float
+    thumbnail_path: str
+
+    def __init__(self, path: str, version: str = '', size: int = None, last_used: float = None,
+                 thumbnail_path: str = None):
+        self.path = path
+        self.version = version
+        # Bytes on disk of the bundle
+        self.size = size
+        # Last access time of the bundle's executable, None if unknown
+        self.last_used = last_used
+        # PNG thumbnail of the bundle icon, None if the bundle has no readable icon file
+        self.thumbnail_path = thumbnail_path
@@ -1,13 +1,67 @@
 class AppModel:
+    """
+    Immutable record of an installed app. The attributes are slots, there is no per-instance __dict__.
+    """
+
+    __slots__ = ('name', 'identifier', 'path', 'display_name', 'version', 'executable', 'relative_identifier',
+                 'helper_identifiers', 'copies')
+
     name: str
     identifier: str
-    related_files: list
+    helper_identifiers: tuple
+    copies: tuple
+
+    def __init__(self, name: str, identifier: str, path: str, display_name: str = None, version: str = '',
+                 executable: str = '', helper_identifiers: tuple = (), copies: tuple = ()):
+        set_attribute = object.__setattr__
+        set_attribute(self, 'name', name)
+        set_attribute(self, 'identifier', identifier)
+        set_attribute(self, 'path', path)
+        set_attribute(self, 'display_name', display_name or name)
+        set_attribute(self, 'version', version)
+        set_attribute(self, 'executable', executable)
+        set_attribute(self, 'relative_identifier', self.__extract_relative_identifier(identifier))
+        set_attribute(self, 'helper_identifiers', tuple(helper_identifiers or ()))
+        # (path, version) of the other copies of the app found with this identifier (other folders or volumes)
+        set_attribute(self, 'copies', tuple(copies))
+
+    @property
+    def paths(self) -> tuple:
+        """Paths of every copy of the app, the primary one first"""
+        return (self.path,) + tuple(path for path, _ in self.copies)
+
+    @property
+    def versions(self) -> tuple:
+        return (self.version,) + tuple(version for _, version in self.copies)
+
+    @property
+    def match_patterns(self) -> frozenset:
+        """Names the related files are matched by, the helper identifiers containing one of them are redundant"""
+        patterns = {self.identifier, self.relative_identifier}
+
+        return frozenset(patterns | {
+            helper for helper in self.helper_identifiers if not any(pattern in helper for pattern in patterns)
+        })
+
+    def with_copy(self, path: str, version: str = '', helper_identifiers: tuple = ()) -> 'AppModel':
+        """The same app with one more copy, whose helpers may differ from the other copies'"""
+        if path in self.paths:
+            return self
+
+        return AppModel(self.name, self.identifier, self.path, self.display_name, self.version, self.executable,
+                        tuple(dict.fromkeys(self.helper_identifiers + tuple(helper_identifiers))),
+                        self.copies + ((path, version),))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"AppModel is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"AppModel is immutable, cannot delete {name}")
 
-    def __init__(self, name: str, identifier: str, path: str):
-        self.name = name
-        self.identifier = identifier
-        self.path = path
-        self.relative_identifier = self.__extract_relative_identifier(identifier)
+    def __reduce__(self):
+        # Pickled for the per-volume scan processes, the slots cannot be set back one by one
+        return AppModel, (self.name, self.identifier, self.path, self.display_name, self.version, self.executable,
+                          self.helper_identifiers, self.copies)
 
     def __extract_relative_identifier(self, identifier: str):
         name = self.name.replace(' ', '-')
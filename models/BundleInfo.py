@@ -0,0 +1,17 @@
+class BundleInfo:
+    path: str
+    identifier: str
+    display_name: str
+    version: str
+    executable: str
+    helper_identifiers: list
+
+    def __init__(self, path: str, identifier: str, display_name: str, version: str, executable: str,
+                 helper_identifiers: list = None):
+        self.path = path
+        self.identifier = identifier
+        self.display_name = display_name
+        self.version = version
+        self.executable = executable
+        # Identifiers of the login items, XPC services and extensions nested in the bundle
+        self.helper_identifiers = helper_identifiers or []
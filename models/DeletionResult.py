@@ -0,0 +1,12 @@
+class DeletionResult:
+    path: str
+    removed: bool
+    errors: list
+    staged: bool
+
+    def __init__(self, path: str, removed: bool, errors: list = None, staged: bool = False):
+        self.path = path
+        self.removed = removed
+        self.errors = errors or []
+        # Moved to a staging area, where it can still be restored until it is purged
+        self.staged = staged
@@ -0,0 +1,14 @@
+class MountPoint:
+    path: str
+    source: str
+    fs_type: str
+    options: list
+    kind: str
+
+    def __init__(self, path: str, source: str, fs_type: str, options: list = None, kind: str = None):
+        self.path = path
+        self.source = source
+        self.fs_type = fs_type
+        self.options = options or []
+        # MountService.LOCAL, NETWORK, PSEUDO or REMOVABLE
+        self.kind = kind
@@ -0,0 +1,10 @@
+class OrphanGroup:
+    identifier: str
+    paths: list
+    size: int
+
+    def __init__(self, identifier: str, paths: list = None, size: int = 0):
+        # Bundle identifier inferred from the entry names, no installed app has it
+        self.identifier = identifier
+        self.paths = paths or []
+        self.size = size
@@ -0,0 +1,126 @@
+from array import array
+from collections.abc import Sequence
+from typing import Callable, Dict, Iterable, Iterator
+
+
+class PathStore(Sequence):
+    """
+    Compact list of paths. Every directory is stored once, in a parent-pointer table of (parent, name) rows,
+    and a path is kept as the row of its directory plus its base name, the base names being packed in a single
+    buffer. Long shared prefixes (~/Library/Containers/...) are thus not repeated for every path and no string
+    object is kept per path.
+
+    The paths are rebuilt when they are read; the store indexes, iterates, compares and sorts like a list of str.
+    """
+
+    # Row of the table above the first component of every path, '' for the absolute paths
+    TOP = 0
+
+    def __init__(self, paths: Iterable[str] = ()) -> None:
+        self.__dir_parents = array('i', [-1])
+        self.__dir_names = ['']
+        self.__dir_rows: Dict[tuple, int] = dict()
+        # Directory row of every path (-1 for a bare name) and the bounds of its base name in the buffer
+        self.__dirs = array('i')
+        self.__offsets = array('Q', [0])
+        self.__names = bytearray()
+        # Row of every directory path appended, there are far fewer directories than paths
+        self.__head_rows: Dict[str, int] = dict()
+        self.extend(paths)
+
+    def append(self, path: str) -> None:
+        head, separator, name = path.rpartition('/')
+        if not separator:
+            row = -1
+        else:
+            row = self.__head_rows.get(head)
+            if row is None:
+                row = self.__head_rows[head] = self.__dir_row(head)
+
+        self.__dirs.append(row)
+        self.__names += name.encode('utf-8', 'surrogateescape')
+        self.__offsets.append(len(self.__names))
+
+    def __dir_row(self, head: str) -> int:
+        row = self.TOP
+        for component in head.split('/'):
+            child = self.__dir_rows.get((row, component))
+            if child is None:
+                child = len(self.__dir_names)
+                self.__dir_rows[(row, component)] = child
+                self.__dir_parents.append(row)
+                self.__dir_names.append(component)
+            row = child
+
+        return row
+
+    def extend(self, paths: Iterable[str]) -> None:
+        for path in paths:
+            self.append(path)
+
+    def sort(self, key: Callable = None, reverse: bool = False) -> None:
+        """Sort the paths in place, like list.sort()"""
+        paths = list(self)
+        order = sorted(range(len(paths)), key=paths.__getitem__ if key is None else lambda i: key(paths[i]),
+                       reverse=reverse)
+
+        offsets = self.__offsets
+        names = bytearray()
+        sorted_offsets = array('Q', [0])
+        for i in order:
+            names += self.__names[offsets[i]:offsets[i + 1]]
+            sorted_offsets.append(len(names))
+
+        self.__dirs = array('i', (self.__dirs[i] for i in order))
+        self.__offsets = sorted_offsets
+        self.__names = names
+
+    def __len__(self) -> int:
+        return len(self.__dirs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('PathStore index out of range')
+
+        return self.__path(index, dict())
+
+    def __iter__(self) -> Iterator[str]:
+        # The directory paths are only rebuilt once per iteration
+        dir_paths = dict()
+        for i in range(len(self)):
+            yield self.__path(i, dir_paths)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (PathStore, list, tuple)):
+            return NotImplemented
+
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def __path(self, index: int, dir_paths: Dict[int, str]) -> str:
+        name = self.__names[self.__offsets[index]:self.__offsets[index + 1]].decode('utf-8', 'surrogateescape')
+        row = self.__dirs[index]
+        if row < 0:
+            return name
+
+        return f"{self.__dir_path(row, dir_paths)}/{name}"
+
+    def __dir_path(self, row: int, dir_paths: Dict[int, str]) -> str:
+        path = dir_paths.get(row)
+        if path is None:
+            components = []
+            parent = row
+            while parent != self.TOP:
+                components.append(self.__dir_names[parent])
+                parent = self.__dir_parents[parent]
+            path = '/'.join(reversed(components))
+            dir_paths[row] = path
+
+        return path
@@ -0,0 +1,16 @@
+from models.PathStore import PathStore
+
+
+class ScanResult(PathStore):
+    """
+    Paths found by a scan, tagged with whether the scan ran to completion.
+    A scan stopped by a cancellation, a deadline or an entry budget returns its partial results.
+    """
+
+    complete: bool
+    reason: str
+
+    def __init__(self, paths=(), complete: bool = True, reason: str = None):
+        super().__init__(paths)
+        self.complete = complete
+        self.reason = reason
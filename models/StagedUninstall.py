@@ -0,0 +1,22 @@
+class StagedUninstall:
+    """
+    Paths of one uninstall moved into a staging directory, kept there until the staging directory is purged.
+    """
+
+    id: str
+    directory: str
+    label: str
+    created_at: float
+    entries: list
+    owner_pid: int
+
+    def __init__(self, id: str, directory: str, label: str = '', created_at: float = 0.0, entries: list = None,
+                 owner_pid: int = 0):
+        self.id = id
+        self.directory = directory
+        self.label = label
+        self.created_at = created_at
+        # Process which staged the paths and may still undo the uninstall, 0 when unknown
+        self.owner_pid = owner_pid
+        # (original path, staged path) pairs
+        self.entries = entries or []
@@ -0,0 +1,95 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+from models.BundleInfo import BundleInfo
+from services.CacheDirectory import CacheDirectory
+
+
+class AppCatalog:
+    """
+    Catalog of the discovered bundles, persisted between runs so the app list shows up before the lookup folders
+    are walked again. Every entry keeps the stat signature of the bundle's Info.plist and the mtimes of its helper
+    folders, so it can be revalidated cheaply and an app whose helpers changed is read again.
+    """
+
+    VERSION = 3
+    FILENAME = 'app_catalog.json'
+
+    def __init__(self, catalog_path: str = None):
+        self.__catalog_path = catalog_path
+        self.__entries = None
+
+    @property
+    def catalog_path(self) -> str:
+        if self.__catalog_path is None:
+            self.__catalog_path = CacheDirectory.path(self.FILENAME)
+
+        return self.__catalog_path
+
+    def entries(self) -> Dict[str, dict]:
+        if self.__entries is None:
+            self.__entries = self.__load()
+
+        return self.__entries
+
+    def lookup(self, bundle_path: str, signature: list) -> Optional[BundleInfo]:
+        """
+        Return the cached metadata of a bundle if its signature did not change since it was cataloged.
+        """
+        entry = self.entries().get(bundle_path)
+        if entry is None or entry['signature'] != signature:
+            return None
+
+        return self.__bundle_info(bundle_path, entry)
+
+    def bundle_infos(self, lookup_folder: str) -> Iterable[BundleInfo]:
+        for path, entry in self.entries().items():
+            if self.__is_within(path, lookup_folder):
+                yield self.__bundle_info(path, entry)
+
+    def replace(self, lookup_folder: str, items: Iterable[tuple]) -> None:
+        """
+        Replace the catalog content below a lookup folder and persist it.
+
+        :param lookup_folder: Folder the items were discovered in
+        :param items: (BundleInfo, signature) tuples
+        """
+        entries = {
+            path: entry for path, entry in self.entries().items() if not self.__is_within(path, lookup_folder)
+        }
+        entries.update({
+            bundle_info.path: {
+                'identifier': bundle_info.identifier,
+                'display_name': bundle_info.display_name,
+                'version': bundle_info.version,
+                'executable': bundle_info.executable,
+                'helper_identifiers': bundle_info.helper_identifiers,
+                'signature': signature,
+            }
+            for bundle_info, signature in items
+        })
+        self.__entries = entries
+        self.__save()
+
+    @staticmethod
+    def signature(plist_stat: os.stat_result, helper_dir_mtimes: List[Optional[int]]) -> list:
+        return [plist_stat.st_mtime_ns, plist_stat.st_ino, plist_stat.st_size, helper_dir_mtimes]
+
+    @staticmethod
+    def __bundle_info(bundle_path: str, entry: dict) -> BundleInfo:
+        return BundleInfo(bundle_path, entry['identifier'], entry['display_name'], entry['version'],
+                          entry['executable'], entry['helper_identifiers'])
+
+    @staticmethod
+    def __is_within(path: str, lookup_folder: str) -> bool:
+        return path.startswith(lookup_folder.rstrip('/') + '/')
+
+    def __load(self) -> Dict[str, dict]:
+        data = CacheDirectory.read_versioned(self.catalog_path, self.VERSION, 'app catalog')
+        return data.get('apps', {}) if data is not None else {}
+
+    def __save(self) -> None:
+        try:
+            CacheDirectory.write_versioned(self.catalog_path, self.VERSION, {'apps': self.__entries})
+        except OSError as e:
+            print(f"Error writing app catalog: {e}")
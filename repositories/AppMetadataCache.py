@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+from models.AppMetadata import AppMetadata
+from services.CacheDirectory import CacheDirectory
+
+
+class AppMetadataCache:
+    """
+    Versions, sizes and icon thumbnails shown by the app list, kept between runs so scrolling through the list
+    does not read every bundle again. The thumbnails are PNG files next to the entries. Entries and thumbnails are
+    keyed by bundle path and Info.plist mtime, so an updated app is read again. Stored entries are written to disk
+    by flush(), once per batch of apps rather than once per app. The methods are thread safe.
+    """
+
+    VERSION = 1
+    FILENAME = 'app_metadata.json'
+    THUMBNAILS_DIRNAME = 'thumbnails'
+
+    def __init__(self, cache_path: str = None, thumbnails_dir: str = None):
+        self.__cache_path = cache_path
+        self.__thumbnails_dir = thumbnails_dir
+        self.__entries = None
+        self.__dirty = False
+        self.__lock = threading.Lock()
+
+    @property
+    def cache_path(self) -> str:
+        if self.__cache_path is None:
+            self.__cache_path = CacheDirectory.path(self.FILENAME)
+
+        return self.__cache_path
+
+    @property
+    def thumbnails_dir(self) -> str:
+        if self.__thumbnails_dir is None:
+            self.__thumbnails_dir = CacheDirectory.path(self.THUMBNAILS_DIRNAME)
+
+        os.makedirs(self.__thumbnails_dir, exist_ok=True)
+        return self.__thumbnails_dir
+
+    def thumbnail_path(self, bundle_path: str, plist_mtime_ns: int) -> str:
+        digest = hashlib.sha1(bundle_path.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.thumbnails_dir, f"{digest}-{plist_mtime_ns}.png")
+
+    def lookup(self, bundle_path: str, plist_mtime_ns: int) -> Optional[AppMetadata]:
+        with self.__lock:
+            entry = self.__load_entries().get(bundle_path)
+
+        if entry is None or entry['plist_mtime_ns'] != plist_mtime_ns:
+            return None
+
+        thumbnail_path = entry['thumbnail_path']
+        if thumbnail_path is not None and not os.path.exists(thumbnail_path):
+            return None
+
+        return AppMetadata(bundle_path, entry['version'], entry['size'], None, thumbnail_path)
+
+    def store(self, metadata: AppMetadata, plist_mtime_ns: int) -> None:
+        with self.__lock:
+            entries = self.__load_entries()
+            previous = entries.get(metadata.path)
+            entries[metadata.path] = {
+                'plist_mtime_ns': plist_mtime_ns,
+                'version': metadata.version,
+                'size': metadata.size,
+                'thumbnail_path': metadata.thumbnail_path,
+            }
+            self.__dirty = True
+
+        # The thumbnail of the previous version of the app is not needed anymore
+        if previous is not None and previous['thumbnail_path'] not in (None, metadata.thumbnail_path):
+            try:
+                os.unlink(previous['thumbnail_path'])
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """Write the entries stored since the last flush, if any"""
+        with self.__lock:
+            if self.__dirty:
+                self.__save()
+                self.__dirty = False
+
+    def __load_entries(self) -> Dict[str, dict]:
+        if self.__entries is None:
+            self.__entries = self.__load()
+
+        return self.__entries
+
+    def __load(self) -> Dict[str, dict]:
+        data = CacheDirectory.read_versioned(self.cache_path, self.VERSION, 'app metadata cache')
+        return data.get('apps', {}) if data is not None else {}
+
+    def __save(self) -> None:
+        try:
+            CacheDirectory.write_versioned(self.cache_path, self.VERSION, {'apps': self.__entries})
+        except OSError as e:
+            print(f"Error writing app metadata cache: {e}")
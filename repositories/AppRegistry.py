@@ -1,12 +1,30 @@
 import os
-import subprocess
+from typing import Iterable
 
 from models.AppModel import AppModel
+from models.BundleInfo import BundleInfo
+from services.BundleInfoService import BundleInfoService
+from services.ScanMetrics import ScanMetrics
 
 
 class AppRegistry:
-    def __init__(self):
+    """
+    Apps in the order they were added. The copies of an app (same bundle identifier) are merged into the model
+    of the first one added.
+    """
+
+    def __init__(self, bundle_info_service: BundleInfoService = None, metrics: ScanMetrics = None):
         self.__apps = []
+        # Row of every identifier in the app list
+        self.__rows = dict()
+        self.__metrics = metrics or ScanMetrics.disabled()
+        # Set when the discovery was stopped early, the list then holds the apps found until then
+        self.incomplete_reason = None
+        self.__bundle_info_service = bundle_info_service or BundleInfoService()
+
+    @property
+    def complete(self) -> bool:
+        return self.incomplete_reason is None
 
     def length(self):
         return len(self.__apps)
@@ -18,29 +36,66 @@ class AppRegistry:
         return self.__apps[idx]
 
     def append(self, app_path):
-        identifier = self.__find_bundle_identifier(app_path)
-        if identifier is None:
+        self.__metrics.increment(ScanMetrics.PLIST_READS)
+        bundle_info = self.__bundle_info_service.read(app_path)
+        if bundle_info is None:
             return None
 
-        name = os.path.basename(app_path)
-        # Remove .app extension from displayed name
-        if name.endswith('.app'):
-            name = name[:-4]
-        self.__apps.append(AppModel(name, identifier, app_path))
+        self.__add(bundle_info)
+
+        return self
+
+    def append_bundle_info(self, bundle_info: BundleInfo):
+        self.__add(bundle_info)
+
+        return self
+
+    def append_model(self, app_model: AppModel):
+        """Add an app read elsewhere, e.g. received from the scan daemon"""
+        if app_model.identifier not in self.__rows:
+            self.__rows[app_model.identifier] = len(self.__apps)
+            self.__apps.append(app_model)
 
         return self
 
+    def extend(self, app_paths: Iterable[str]):
+        """
+        Add many bundles at once, reading their Info.plist files in parallel.
+        Bundles with a missing or corrupt Info.plist are skipped.
+        """
+        app_paths = list(app_paths)
+        self.__metrics.increment(ScanMetrics.PLIST_READS, len(app_paths))
+        with self.__metrics.phase('plist_read'):
+            bundle_infos = self.__bundle_info_service.read_many(app_paths)
+
+        for bundle_info in bundle_infos:
+            self.__add(bundle_info)
+
+        return self
+
+    def __add(self, bundle_info: BundleInfo) -> None:
+        row = self.__rows.get(bundle_info.identifier)
+        if row is not None:
+            self.__apps[row] = self.__apps[row].with_copy(bundle_info.path, bundle_info.version,
+                                                          bundle_info.helper_identifiers)
+            return
+
+        self.__rows[bundle_info.identifier] = len(self.__apps)
+        self.__apps.append(self.__create_model(bundle_info))
+
     @staticmethod
-    def __find_bundle_identifier(app_path):
-        try:
-            # Use the 'defaults' command to read the Info.plist of the app
-            result = subprocess.run(
-                ['defaults', 'read', f'{app_path}/Contents/Info', 'CFBundleIdentifier'],
-                capture_output=True,
-                text=True
-            )
-
-            return result.stdout.strip()
-        except Exception as e:
-            print(f"Error reading bundle identifier: {e}")
-            return None
+    def __create_model(bundle_info: BundleInfo) -> AppModel:
+        name = os.path.basename(bundle_info.path)
+        # Remove .app extension from displayed name
+        if name.endswith('.app'):
+            name = name[:-4]
+
+        return AppModel(
+            name,
+            bundle_info.identifier,
+            bundle_info.path,
+            display_name=bundle_info.display_name,
+            version=bundle_info.version,
+            executable=bundle_info.executable,
+            helper_identifiers=bundle_info.helper_identifiers
+        )
@@ -0,0 +1,80 @@
+import os
+import time
+from typing import Dict, Optional
+
+from services.CacheDirectory import CacheDirectory
+
+
+class DiskUsageCache:
+    """
+    Sizes of the paths measured by the disk usage engine, remembered so the reclaimable space of an app can be
+    shown before its files are measured again. One entry is kept per measured top-level path, keyed by its
+    signature. A file rewritten or grown in place below a directory does not change the directory's signature,
+    so a memoized size is only an estimate shown while the path is measured again. The least recently measured
+    entries are pruned beyond MAX_ENTRIES.
+    """
+
+    VERSION = 2
+    FILENAME = 'disk_usage.json'
+
+    MAX_ENTRIES = 5000
+
+    # Entry layout: [signature, size in bytes, measured at]
+    SIGNATURE, SIZE, MEASURED_AT = range(3)
+
+    def __init__(self, cache_path: str = None):
+        self.__cache_path = cache_path
+        self.__entries = None
+
+    @property
+    def cache_path(self) -> str:
+        if self.__cache_path is None:
+            self.__cache_path = CacheDirectory.path(self.FILENAME)
+
+        return self.__cache_path
+
+    def entries(self) -> Dict[str, list]:
+        if self.__entries is None:
+            self.__entries = self.__load()
+
+        return self.__entries
+
+    def lookup(self, path: str, path_stat: os.stat_result) -> Optional[int]:
+        """Return the size memoized for a path, if the path itself did not change since it was measured"""
+        entry = self.entries().get(path)
+        if entry is None or entry[self.SIGNATURE] != self.signature(path_stat):
+            return None
+
+        return entry[self.SIZE]
+
+    def update(self, measured: Dict[str, list]) -> None:
+        """
+        Memoize the sizes of measured paths and persist them, pruning the oldest entries.
+
+        :param measured: Path to [signature, size] of every path measured
+        """
+        entries = self.entries()
+        measured_at = time.time()
+        for path, (signature, size) in measured.items():
+            entries[path] = [signature, size, measured_at]
+
+        if len(entries) > self.MAX_ENTRIES:
+            newest = sorted(entries.items(), key=lambda item: item[1][self.MEASURED_AT], reverse=True)
+            entries = dict(newest[:self.MAX_ENTRIES])
+
+        self.__entries = entries
+        self.__save()
+
+    @staticmethod
+    def signature(path_stat: os.stat_result) -> list:
+        return [path_stat.st_mtime_ns, path_stat.st_ino, path_stat.st_size]
+
+    def __load(self) -> Dict[str, list]:
+        data = CacheDirectory.read_versioned(self.cache_path, self.VERSION, 'disk usage cache')
+        return data.get('paths', {}) if data is not None else {}
+
+    def __save(self) -> None:
+        try:
+            CacheDirectory.write_versioned(self.cache_path, self.VERSION, {'paths': self.__entries})
+        except OSError as e:
+            print(f"Error writing disk usage cache: {e}")
@@ -0,0 +1,280 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from services.CacheDirectory import CacheDirectory
+from services.CancellationToken import CancellationToken
+from services.ParallelWalker import Listing, ParallelWalker
+from services.PathTrie import PathTrie
+
+
+class PathIndex:
+    """
+    Locate-style index of the scanned directory trees. For every directory it keeps its mtime and the names
+    of its entries, so a refresh only has to list the directories whose mtime changed since the last pass.
+
+    The index is stored as gzip compressed JSON lines, sorted by path, with front-coded directory paths, one file
+    per set of roots. An index serves every caller whose ignored directories cover its own: the callers prune
+    their extra ignored directories while walking it, so the tier two lookup and the full lookup share one index.
+    """
+
+    VERSION = 2
+    FILENAME = 'path_index-{roots}.jsonl.gz'
+
+    # Record layout: [mtime_ns, subdirectories, symlinked directories, files]
+    MTIME, DIRS, LINKED_DIRS, FILES = range(4)
+
+    # Threads listing directories while the index is built or refreshed. A refresh mostly stats directories
+    # which are in the cache already, more threads make it slower, unless the caller asks for them.
+    WORKERS = 1
+
+    def __init__(self, index_path: str = None, workers: int = None):
+        # Fixed path given by the caller, otherwise the file of the current roots in the cache directory
+        self.__fixed_index_path = index_path
+        self.__workers = max(1, workers or self.WORKERS)
+        self.__records: Dict[str, list] = dict()
+        self.__roots: List[str] = list()
+        self.__ignored_dirs: List[str] = list()
+        self.__refreshed_at: Optional[float] = None
+        self.__loaded = False
+        self.__relisted_dirs = 0
+        self.__deduplicated_dirs = 0
+
+    @property
+    def index_path(self) -> str:
+        return self.__path_of(self.__roots)
+
+    def __path_of(self, roots: List[str]) -> str:
+        if self.__fixed_index_path is not None:
+            return self.__fixed_index_path
+
+        key = hashlib.sha1(json.dumps(sorted(roots)).encode('utf-8')).hexdigest()[:12]
+        return CacheDirectory.path(self.FILENAME.format(roots=key))
+
+    @property
+    def refreshed_at(self) -> Optional[float]:
+        """Timestamp of the last full or incremental scan, None when the index was never built"""
+        return self.__refreshed_at
+
+    @property
+    def relisted_dirs(self) -> int:
+        """Number of directories listed from disk by the last scan"""
+        return self.__relisted_dirs
+
+    @property
+    def deduplicated_dirs(self) -> int:
+        """Number of directories left out by the last scan because they were already indexed through another path"""
+        return self.__deduplicated_dirs
+
+    def age(self) -> Optional[float]:
+        if self.__refreshed_at is None:
+            return None
+
+        return max(0.0, time.time() - self.__refreshed_at)
+
+    def ensure_fresh(self, roots: List[str], ignored_dirs: List[str], max_age: float = 0,
+                     force_rescan: bool = False, cancellation_token: CancellationToken = None) -> None:
+        """
+        Bring the index up to date for the given roots.
+
+        :param roots: Directories to index
+        :param ignored_dirs: Directories the caller does not need, the index may still hold some of them
+        :param max_age: Seconds during which an index is considered fresh without checking the disk
+        :param force_rescan: Rebuild the whole index from disk
+        :param cancellation_token: Stops the scan, the index is then left unchanged
+        """
+        for _ in self.iter_ensure_fresh(roots, ignored_dirs, max_age, force_rescan, cancellation_token):
+            pass
+
+    def iter_ensure_fresh(self, roots: List[str], ignored_dirs: List[str], max_age: float = 0,
+                          force_rescan: bool = False, cancellation_token: CancellationToken = None) -> Iterator[str]:
+        """
+        Same as ensure_fresh, yielding every directory indexed so the caller can report the progress
+        of a long scan. Nothing is yielded when the index is fresh.
+        """
+        if not self.__loaded or list(roots) != self.__roots:
+            self.load(roots)
+
+        if force_rescan or not self.__records:
+            yield from self.__refresh(dict(), list(roots), list(ignored_dirs), cancellation_token)
+        elif not self.__covers(ignored_dirs):
+            # Directories the index skipped are needed now: only they are listed, the others are revalidated.
+            # Only the directories ignored by both callers are left out, so neither invalidates the other.
+            yield from self.__refresh(self.__records, list(roots), self.__shared_ignored_dirs(ignored_dirs),
+                                      cancellation_token)
+        elif self.age() is None or self.age() > max_age:
+            yield from self.__refresh(self.__records, self.__roots, self.__ignored_dirs, cancellation_token)
+
+    def rebuild(self, roots: List[str], ignored_dirs: List[str], cancellation_token: CancellationToken = None) -> None:
+        for _ in self.__refresh(dict(), list(roots), list(ignored_dirs), cancellation_token):
+            pass
+
+    def refresh(self, cancellation_token: CancellationToken = None) -> None:
+        """
+        Incrementally rescan the indexed roots. Every known directory is stat-ed, but only the ones
+        whose mtime changed (and the new ones) are listed again, on several threads. A directory reachable
+        through several paths (firmlinks, bind mounts) is indexed once, under the first path reached.
+        """
+        for _ in self.__refresh(self.__records, self.__roots, self.__ignored_dirs, cancellation_token):
+            pass
+
+    def __refresh(self, previous: Dict[str, list], roots: List[str], ignored_dirs: List[str],
+                  cancellation_token: CancellationToken = None) -> Iterator[str]:
+        """Scan the roots, yielding every directory indexed, and save the index unless the scan was stopped"""
+        records = dict()
+        ignored_trie = PathTrie(ignored_dirs)
+        seen = set()
+        lock = threading.Lock()
+        counts = {'relisted': 0, 'deduplicated': 0}
+        stopped = list()
+
+        def listdir(directory: str) -> Optional[Listing]:
+            """Reuse the record of an unchanged directory, list it again otherwise. Runs on the walker threads."""
+            try:
+                dir_stat = os.stat(directory)
+            except OSError:
+                return None
+
+            with lock:
+                if (dir_stat.st_dev, dir_stat.st_ino) in seen:
+                    counts['deduplicated'] += 1
+                    return None
+                seen.add((dir_stat.st_dev, dir_stat.st_ino))
+
+            record = previous.get(directory)
+            if record is None or record[self.MTIME] != dir_stat.st_mtime_ns:
+                record = self.__scan(directory, dir_stat.st_mtime_ns)
+                with lock:
+                    counts['relisted'] += 1
+            # Directories which cannot be read are tried again by the next refresh, whatever their mtime
+            if record is None:
+                return None
+
+            with lock:
+                records[directory] = record
+            return record[self.DIRS], record[self.LINKED_DIRS], record[self.FILES]
+
+        def visit(root: str, dirs: List[str], files: List[str], ignored_node):
+            if cancellation_token is not None and cancellation_token.is_stopped():
+                stopped.append(root)
+                return [], None
+
+            children = list()
+            for d in dirs:
+                ignored_child = ignored_node.child(d) if ignored_node is not None else None
+                if ignored_child is None or not ignored_child.terminal:
+                    children.append((d, ignored_child))
+            return children, None
+
+        walker = ParallelWalker(self.__workers, listdir)
+        for root in roots:
+            if ignored_trie.covers(root):
+                continue
+            for directory, _ in walker.walk(root, ignored_trie.node(root), visit):
+                yield directory
+
+        if stopped:
+            return
+
+        self.__records = records
+        self.__relisted_dirs = counts['relisted']
+        self.__deduplicated_dirs = counts['deduplicated']
+        self.__roots = roots
+        self.__ignored_dirs = ignored_dirs
+        self.__refreshed_at = time.time()
+        self.save()
+
+    def listdir(self, directory: str) -> Optional[Listing]:
+        """
+        List an indexed directory the way ParallelWalker.scandir() lists it on disk.
+        """
+        record = self.__records.get(directory)
+        if record is None:
+            return None
+
+        return record[self.DIRS], record[self.LINKED_DIRS], record[self.FILES]
+
+    def load(self, roots: List[str] = None) -> bool:
+        """
+        Load the index of the given roots, of the current roots by default. Without an index file for them,
+        the index is left empty.
+        """
+        self.__loaded = True
+        if roots is not None and list(roots) != self.__roots:
+            self.__records = dict()
+            self.__roots = list(roots)
+            self.__ignored_dirs = list()
+            self.__refreshed_at = None
+
+        try:
+            with gzip.open(self.index_path, 'rt', encoding='utf-8') as fp:
+                header = json.loads(fp.readline())
+                if header.get('version') != self.VERSION or header.get('roots') != self.__roots:
+                    return False
+
+                records = dict()
+                previous_path = ''
+                for line in fp:
+                    shared, suffix, *record = json.loads(line)
+                    path = previous_path[:shared] + suffix
+                    records[path] = record
+                    previous_path = path
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, EOFError) as e:
+            print(f"Error reading path index: {e}")
+            return False
+
+        self.__records = records
+        self.__roots = header['roots']
+        self.__ignored_dirs = header['ignored_dirs']
+        self.__refreshed_at = header['refreshed_at']
+
+        return True
+
+    def save(self) -> None:
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as fp:
+                fp.write(json.dumps({
+                    'version': self.VERSION,
+                    'roots': self.__roots,
+                    'ignored_dirs': self.__ignored_dirs,
+                    'refreshed_at': self.__refreshed_at,
+                }) + '\n')
+
+                previous_path = ''
+                for path in sorted(self.__records):
+                    shared = len(os.path.commonprefix([previous_path, path]))
+                    fp.write(json.dumps([shared, path[shared:], *self.__records[path]]) + '\n')
+                    previous_path = path
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Error writing path index: {e}")
+
+    def __covers(self, ignored_dirs: List[str]) -> bool:
+        """Check if the index holds every directory a caller ignoring these directories walks"""
+        ignored_trie = PathTrie(ignored_dirs)
+        return all(ignored_trie.covers(directory) for directory in self.__ignored_dirs)
+
+    def __shared_ignored_dirs(self, ignored_dirs: List[str]) -> List[str]:
+        """Directories ignored both by the index and by a caller"""
+        index_trie = PathTrie(self.__ignored_dirs)
+        caller_trie = PathTrie(ignored_dirs)
+        shared = [directory for directory in ignored_dirs if index_trie.covers(directory)]
+        shared += [directory for directory in self.__ignored_dirs if caller_trie.covers(directory)]
+
+        return list(dict.fromkeys(shared))
+
+    @staticmethod
+    def __scan(directory: str, mtime_ns: int) -> Optional[list]:
+        try:
+            dirs, linked_dirs, files = ParallelWalker.scandir(directory)
+        except OSError:
+            return None
+
+        return [mtime_ns, sorted(dirs), sorted(linked_dirs), sorted(files)]
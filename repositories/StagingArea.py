@@ -0,0 +1,179 @@
+import os
+import time
+import uuid
+from typing import List
+
+from models.StagedUninstall import StagedUninstall
+from services.CacheDirectory import CacheDirectory
+
+
+class StagingArea:
+    """
+    Directory in the user cache dir where the files of an uninstall are renamed to, so the uninstall is done in
+    O(1) per path and can be undone until the staging directory is purged. Every uninstall gets its own directory
+    with a JSON manifest of the moved paths. The manifest is written before the renames, so the directories left
+    by a crash are still found, and restored or purged, on the next launch.
+    """
+
+    VERSION = 1
+    DIRNAME = 'staging'
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, root: str = None):
+        self.__root = root
+
+    @property
+    def root(self) -> str:
+        if self.__root is None:
+            self.__root = CacheDirectory.path(self.DIRNAME)
+
+        os.makedirs(self.__root, exist_ok=True)
+        return self.__root
+
+    def create(self, label: str = '') -> StagedUninstall:
+        staged_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        staged = StagedUninstall(staged_id, os.path.join(self.root, staged_id), label, time.time(),
+                                 owner_pid=os.getpid())
+        os.mkdir(staged.directory)
+        self.__save(staged)
+
+        return staged
+
+    def stage(self, staged: StagedUninstall, paths: List[str]) -> List[str]:
+        """
+        Rename paths into a staging directory. Paths on another device than the staging area, or which cannot
+        be renamed, are left in place.
+
+        :param staged: Staging directory created by create()
+        :param paths: Paths to move, none of them inside another one
+        :return: The paths which were not staged
+        """
+        device = os.stat(staged.directory).st_dev
+        planned = list()
+        unstaged = list()
+        for path in paths:
+            try:
+                same_device = os.lstat(path).st_dev == device
+            except OSError:
+                same_device = False
+
+            if same_device:
+                planned.append((path, os.path.join(staged.directory, str(len(staged.entries) + len(planned)))))
+            else:
+                unstaged.append(path)
+
+        # Written first, a crash during the renames must not lose track of the staged paths
+        staged.entries.extend(planned)
+        self.__save(staged)
+
+        moved = list()
+        for path, staged_path in planned:
+            try:
+                os.rename(path, staged_path)
+                moved.append((path, staged_path))
+            except OSError:
+                unstaged.append(path)
+
+        staged.entries = [entry for entry in staged.entries if entry not in planned] + moved
+        self.__save(staged)
+
+        return unstaged
+
+    def restore(self, staged: StagedUninstall) -> List[str]:
+        """
+        Move the staged paths back to their original location.
+
+        :return: The original paths which could not be restored, they stay staged
+        """
+        failed = list()
+        remaining = list()
+        for path, staged_path in staged.entries:
+            if not os.path.lexists(staged_path):
+                continue
+
+            try:
+                if os.path.lexists(path):
+                    raise FileExistsError(path)
+                os.rename(staged_path, path)
+            except OSError:
+                failed.append(path)
+                remaining.append((path, staged_path))
+
+        staged.entries = remaining
+        if remaining:
+            self.__save(staged)
+        else:
+            self.discard(staged)
+
+        return failed
+
+    def pending(self) -> List[StagedUninstall]:
+        """Staging directories which were not purged yet, including the ones left by a crash"""
+        pending = list()
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(self.__load(entry.name, entry.path))
+        except OSError as e:
+            print(f"Error reading staging area: {e}")
+
+        return sorted(pending, key=lambda staged: staged.created_at)
+
+    def purgeable(self, undo_window: float) -> List[StagedUninstall]:
+        """
+        Staging directories no process can undo anymore: the ones of this process, which decides for itself when
+        to purge them, the ones whose owner process is gone and the ones older than the undo window. Another
+        running instance keeps its last uninstall until its own undo window closes.
+        """
+        pid = os.getpid()
+        return [
+            staged for staged in self.pending()
+            if staged.owner_pid == pid or time.time() - staged.created_at > undo_window
+            or (staged.owner_pid and not self.__is_running(staged.owner_pid))
+        ]
+
+    def discard(self, staged: StagedUninstall) -> None:
+        """Forget an empty staging directory"""
+        try:
+            os.unlink(os.path.join(staged.directory, self.MANIFEST))
+            os.rmdir(staged.directory)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing staging directory {staged.directory}: {e}")
+
+    def __load(self, staged_id: str, directory: str) -> StagedUninstall:
+        data = CacheDirectory.read_versioned(os.path.join(directory, self.MANIFEST), self.VERSION, 'staging manifest')
+
+        # A directory without a readable manifest cannot be restored, but it still has to be purged. It may also
+        # be one being created by another instance, so it is dated by its mtime and purged once that is old.
+        if data is None:
+            try:
+                created_at = os.stat(directory).st_mtime
+            except OSError:
+                created_at = 0.0
+            return StagedUninstall(staged_id, directory, created_at=created_at)
+
+        return StagedUninstall(staged_id, directory, data.get('label', ''), data.get('created_at', 0.0),
+                               [tuple(entry) for entry in data.get('entries', [])], data.get('owner_pid', 0))
+
+    def __save(self, staged: StagedUninstall) -> None:
+        CacheDirectory.write_versioned(os.path.join(staged.directory, self.MANIFEST), self.VERSION, {
+            'label': staged.label,
+            'created_at': staged.created_at,
+            'entries': staged.entries,
+            'owner_pid': staged.owner_pid,
+        })
+
+    @staticmethod
+    def __is_running(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Running under another user
+            return True
+
+        return True
@@ -0,0 +1,98 @@
+import os
+from typing import List, Optional
+
+from services.CancellationToken import CancellationToken
+from services.ScanMetrics import ScanMetrics
+
+
+class AppDiscoveryService:
+    """
+    Finds .app bundles below a folder using os.scandir. The walk stops at every bundle boundary,
+    so the cost follows the number of apps rather than the number of files inside them.
+    """
+
+    EXCLUDED = [
+        '/Python',
+        'StarCraft II'
+    ]
+
+    def __init__(self, lookup_folder: str, max_depth: Optional[int] = None, excluded: List[str] = None,
+                 cancellation_token: CancellationToken = None, metrics: ScanMetrics = None) -> None:
+        self.__lookup_folder = lookup_folder
+        self.__metrics = metrics or ScanMetrics.disabled()
+        self.__cancellation_token = cancellation_token
+        self.__incomplete_reason = None
+        self.__max_depth = max_depth
+        self.__excluded = self.EXCLUDED if excluded is None else excluded
+        self.__visited_entries = 0
+
+    @property
+    def visited_entries(self) -> int:
+        """Number of directory entries examined by the last discover() call"""
+        return self.__visited_entries
+
+    @property
+    def incomplete_reason(self) -> Optional[str]:
+        """Why the last discover() call stopped early, None when it completed"""
+        return self.__incomplete_reason
+
+    def discover(self) -> List[str]:
+        """
+        Collect the paths of the bundles below the lookup folder.
+
+        :return: Sorted list of bundle paths
+        """
+        self.__visited_entries = 0
+        self.__incomplete_reason = None
+        token = self.__cancellation_token
+        if self.__is_bundle(self.__lookup_folder):
+            return [self.__lookup_folder]
+
+        metrics = self.__metrics
+        app_paths = []
+        stack = [(self.__lookup_folder, 1)]
+        while stack:
+            if token is not None and token.is_stopped():
+                self.__incomplete_reason = token.reason
+                break
+
+            directory, depth = stack.pop()
+            visited_entries = self.__visited_entries
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        self.__visited_entries += 1
+                        if self.__is_excluded(entry.path):
+                            metrics.increment(ScanMetrics.SUBTREES_PRUNED)
+                            continue
+
+                        if self.__is_bundle(entry.name):
+                            # Symlinked bundles were never followed by the previous os.walk lookup
+                            if not entry.is_symlink():
+                                app_paths.append(entry.path)
+                                metrics.increment(ScanMetrics.BUNDLES_FOUND)
+                            continue
+
+                        if self.__max_depth is not None and depth >= self.__max_depth:
+                            continue
+
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, depth + 1))
+            except OSError as e:
+                if isinstance(e, PermissionError):
+                    metrics.increment(ScanMetrics.PERMISSION_ERRORS)
+                print(f"Error scanning {directory}: {e}")
+
+            metrics.increment(ScanMetrics.DIRECTORIES_VISITED)
+            metrics.increment(ScanMetrics.ENTRIES_EXAMINED, self.__visited_entries - visited_entries)
+            if token is not None:
+                token.consume(self.__visited_entries - visited_entries)
+
+        return sorted(app_paths)
+
+    def __is_excluded(self, path: str) -> bool:
+        return any(d in path for d in self.__excluded)
+
+    @staticmethod
+    def __is_bundle(path: str) -> bool:
+        return path.rstrip('/').endswith('.app')
@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from models.AppMetadata import AppMetadata
+from repositories.AppMetadataCache import AppMetadataCache
+from services.BundleInfoService import BundleInfoService
+from services.DiskUsageService import DiskUsageService
+
+# Converts an icon file to a PNG thumbnail: (icon path, thumbnail path, size in pixels) -> success
+Thumbnailer = Callable[[str, str, int], bool]
+
+
+class AppMetadataService:
+    """
+    Loads the extra metadata of a bundle (icon thumbnail, version, size, last use) on demand. Results are kept in
+    an in-memory LRU and in an AppMetadataCache on disk, both keyed by bundle path and Info.plist mtime, so only
+    new or updated apps are read and measured. The last use is read again every time, it is a single stat.
+    """
+
+    LRU_SIZE = 256
+    THUMBNAIL_SIZE = 64
+
+    def __init__(self, cache: AppMetadataCache = None, thumbnailer: Thumbnailer = None) -> None:
+        self.__cache = cache
+        self.__thumbnailer = thumbnailer
+        self.__lru: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def cached(self, bundle_path: str) -> Optional[AppMetadata]:
+        """Metadata already in memory, without touching the disk, so it can be called while painting"""
+        with self.__lock:
+            entry = self.__lru.get(bundle_path)
+            if entry is None:
+                return None
+
+            self.__lru.move_to_end(bundle_path)
+            return entry[1]
+
+    def flush(self) -> None:
+        """Persist the metadata read since the last flush"""
+        if self.__cache is not None:
+            self.__cache.flush()
+
+    def read(self, bundle_path: str, executable: str = '') -> AppMetadata:
+        """
+        Read the metadata of a bundle, from the caches when its Info.plist did not change.
+
+        :param bundle_path: Path to the .app bundle
+        :param executable: CFBundleExecutable of the bundle, its access time is the last use of the app
+        """
+        try:
+            plist_mtime_ns = os.stat(BundleInfoService.info_plist_path(bundle_path)).st_mtime_ns
+        except OSError:
+            plist_mtime_ns = 0
+
+        with self.__lock:
+            entry = self.__lru.get(bundle_path)
+        if entry is not None and entry[0] == plist_mtime_ns:
+            metadata = entry[1]
+        else:
+            metadata = self.__cache.lookup(bundle_path, plist_mtime_ns) if self.__cache is not None else None
+            if metadata is None:
+                metadata = self.__load(bundle_path, plist_mtime_ns)
+                if self.__cache is not None:
+                    self.__cache.store(metadata, plist_mtime_ns)
+
+        with self.__lock:
+            self.__lru[bundle_path] = (plist_mtime_ns, metadata)
+            self.__lru.move_to_end(bundle_path)
+            while len(self.__lru) > self.LRU_SIZE:
+                self.__lru.popitem(last=False)
+
+        # The remembered metadata is shared between the readers, each one gets its own last use
+        return AppMetadata(metadata.path, metadata.version, metadata.size, self.last_used(bundle_path, executable),
+                           metadata.thumbnail_path)
+
+    @staticmethod
+    def icon_path(bundle_path: str, info: dict) -> Optional[str]:
+        """Icon file named by CFBundleIconFile, icons only shipped in an asset catalog are not readable"""
+        icon_file = info.get('CFBundleIconFile')
+        if not isinstance(icon_file, str) or not icon_file.strip():
+            return None
+
+        icon_file = icon_file.strip()
+        if not os.path.splitext(icon_file)[1]:
+            icon_file += '.icns'
+        icon_path = os.path.join(bundle_path, 'Contents', 'Resources', icon_file)
+
+        return icon_path if os.path.isfile(icon_path) else None
+
+    @staticmethod
+    def last_used(bundle_path: str, executable: str = '') -> Optional[float]:
+        """Access time of the bundle's executable, the bundle itself when it has none"""
+        paths = [os.path.join(bundle_path, 'Contents', 'MacOS', executable)] if executable else []
+        for path in paths + [bundle_path]:
+            try:
+                return os.stat(path).st_atime
+            except OSError:
+                continue
+
+        return None
+
+    def __load(self, bundle_path: str, plist_mtime_ns: int) -> AppMetadata:
+        info = BundleInfoService.load_info_plist(bundle_path) or {}
+        version = ''
+        for key in ('CFBundleShortVersionString', 'CFBundleVersion'):
+            if isinstance(info.get(key), str) and info[key].strip():
+                version = info[key].strip()
+                break
+
+        thumbnail_path = None
+        icon_path = self.icon_path(bundle_path, info)
+        if icon_path is not None and self.__thumbnailer is not None:
+            thumbnail_path = (self.__cache.thumbnail_path(bundle_path, plist_mtime_ns) if self.__cache is not None
+                              else None)
+            if thumbnail_path is None or not self.__thumbnailer(icon_path, thumbnail_path, self.THUMBNAIL_SIZE):
+                thumbnail_path = None
+
+        size = DiskUsageService(workers=1).measure(bundle_path)
+
+        return AppMetadata(bundle_path, version, size, None, thumbnail_path)
@@ -1,41 +1,194 @@
+import glob
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Union
 
+from models.BundleInfo import BundleInfo
+from repositories.AppCatalog import AppCatalog
 from repositories.AppRegistry import AppRegistry
+from services.AppDiscoveryService import AppDiscoveryService
+from services.BundleInfoService import BundleInfoService
+from services.CancellationToken import CancellationToken
+from services.ScanMetrics import ScanMetrics
 
 
 class AppService:
-    def __init__(self, lookup_folder):
-        self.__lookup_folder = lookup_folder
+    # Folders the apps are discovered in by default, besides the Applications folders of the other volumes
+    ROOTS = [
+        '/Applications',
+        '~/Applications',
+    ]
+
+    VOLUMES_PATTERN = '/Volumes/*/Applications'
+
+    def __init__(self, lookup_folders: Union[str, List[str]], max_depth: Optional[int] = None,
+                 catalog: AppCatalog = None, cancellation_token: CancellationToken = None,
+                 metrics: ScanMetrics = None):
+        # Every root is scanned by its own worker, a root inside another one would be scanned twice
+        self.__lookup_folders = self.top_level_roots(
+            [lookup_folders] if isinstance(lookup_folders, str) else lookup_folders)
+        self.__metrics = metrics or ScanMetrics.disabled()
+        self.__cancellation_token = cancellation_token
+        self.__incomplete_reason = None
+        self.__max_depth = max_depth
+        self.__catalog = catalog
+        self.__bundle_info_service = BundleInfoService()
+        self.__visited_entries = 0
+        self.__revalidated_bundles = 0
+
+    @classmethod
+    def default_roots(cls) -> List[str]:
+        """The system and user Applications folders, then the Applications folders of the mounted volumes"""
+        roots = [os.path.expanduser(root) for root in cls.ROOTS]
+        roots += sorted(path for path in glob.glob(cls.VOLUMES_PATTERN) if os.path.realpath(path) not in roots)
+
+        return [root for root in roots if os.path.isdir(root)]
+
+    @staticmethod
+    def top_level_roots(roots: List[str]) -> List[str]:
+        """Roots in their order, without the duplicates and the roots inside another one"""
+        roots = list(dict.fromkeys(os.path.normpath(root) for root in roots))
+
+        return [
+            root for root in roots
+            if not any(root != other and root.startswith(other.rstrip('/') + '/') for other in roots)
+        ]
+
+    @property
+    def lookup_folders(self) -> List[str]:
+        return self.__lookup_folders
+
+    @property
+    def visited_entries(self) -> int:
+        """Number of directory entries examined while discovering apps"""
+        return self.__visited_entries
+
+    @property
+    def revalidated_bundles(self) -> int:
+        """Number of bundles whose Info.plist had to be read again by the last list_apps() call"""
+        return self.__revalidated_bundles
 
     def create_app_path(self, app_name):
-        return os.path.join(self.__lookup_folder, app_name)
+        return os.path.join(self.__lookup_folders[0], app_name)
 
-    def list_apps(self) -> AppRegistry:
-        app_list = AppRegistry()
-        for root, dirs, files in os.walk(self.__lookup_folder):
-            if self.__is_excluded(root):
-                continue
+    def discover_app_paths(self) -> List[str]:
+        self.__visited_entries = 0
+        self.__incomplete_reason = None
+        app_paths = []
+        for lookup_folder in self.__lookup_folders:
+            paths, visited_entries, incomplete_reason = self.__discover(lookup_folder)
+            app_paths.extend(paths)
+            self.__visited_entries += visited_entries
+            self.__incomplete_reason = self.__incomplete_reason or incomplete_reason
 
-            if self.__is_mac_app(root):
-                app_list.append(root)
-                continue
+        return app_paths
 
-            for file in files:
-                if file.endswith('.app'):
-                    app_list.append(os.path.join(root, file))
+    def list_cached_apps(self) -> AppRegistry:
+        """
+        List the apps known to the catalog without touching the lookup folders.
+        """
+        app_list = AppRegistry(self.__bundle_info_service, self.__metrics)
+        if self.__catalog is not None:
+            for lookup_folder in self.__lookup_folders:
+                for bundle_info in self.__catalog.bundle_infos(lookup_folder):
+                    app_list.append_bundle_info(bundle_info)
 
         return app_list
 
-    @staticmethod
-    def __is_excluded(directory_path: str) -> bool:
-        dirs = [
-            '.app/',
-            '/Python',
-            'StarCraft II'
-        ]
+    def list_apps(self, on_partial: Callable[[AppRegistry], None] = None) -> AppRegistry:
+        """
+        List the apps of all the lookup folders, scanning every folder in its own worker. The copies of an app
+        found in several folders are merged into one model, whose primary path is in the first folder.
 
-        return any(d in directory_path for d in dirs)
+        :param on_partial: Called with the apps of the folders listed so far whenever a folder is done, before
+                           the slower folders (other volumes) finish
+        """
+        self.__visited_entries = 0
+        self.__revalidated_bundles = 0
+        self.__incomplete_reason = None
+        if self.__catalog is not None:
+            # Loaded once, before the workers look bundles up in it
+            self.__catalog.entries()
 
-    @staticmethod
-    def __is_mac_app(directory_path: str):
-        return directory_path.endswith('.app')
+        listed: Dict[str, List[BundleInfo]] = dict()
+        folders = self.__lookup_folders
+        with ThreadPoolExecutor(max_workers=max(1, len(folders))) as executor:
+            futures = {executor.submit(self.__list_folder, lookup_folder): lookup_folder for lookup_folder in folders}
+            for future in as_completed(futures):
+                lookup_folder = futures[future]
+                bundle_infos, signatures, visited_entries, revalidated_bundles, incomplete_reason = future.result()
+                self.__visited_entries += visited_entries
+                self.__revalidated_bundles += revalidated_bundles
+                self.__incomplete_reason = self.__incomplete_reason or incomplete_reason
+                listed[lookup_folder] = bundle_infos
+
+                # A partial discovery would drop the apps it did not reach from the catalog
+                if self.__catalog is not None and incomplete_reason is None:
+                    self.__catalog.replace(
+                        lookup_folder, [(bundle_info, signatures[bundle_info.path]) for bundle_info in bundle_infos])
+
+                if on_partial is not None and len(listed) < len(folders):
+                    on_partial(self.__merge(listed))
+
+        app_list = self.__merge(listed)
+        app_list.incomplete_reason = self.__incomplete_reason
+
+        return app_list
+
+    def __merge(self, listed: Dict[str, List[BundleInfo]]) -> AppRegistry:
+        """Registry of the listed folders, in the order of the lookup folders whatever order they finished in"""
+        app_list = AppRegistry(self.__bundle_info_service, self.__metrics)
+        for lookup_folder in self.__lookup_folders:
+            for bundle_info in listed.get(lookup_folder, []):
+                app_list.append_bundle_info(bundle_info)
+
+        return app_list
+
+    def __discover(self, lookup_folder: str) -> tuple:
+        discovery = AppDiscoveryService(lookup_folder, max_depth=self.__max_depth,
+                                        cancellation_token=self.__cancellation_token, metrics=self.__metrics)
+        with self.__metrics.phase('discovery'):
+            app_paths = discovery.discover()
+
+        return app_paths, discovery.visited_entries, discovery.incomplete_reason
+
+    def __list_folder(self, lookup_folder: str) -> tuple:
+        """
+        Discover the apps of a folder and read their metadata, from the catalog for the bundles whose
+        Info.plist and helper folders did not change.
+
+        :return: Bundle infos in discovery order, catalog signatures by path, visited entries, revalidated bundles
+                 and the reason the discovery stopped early
+        """
+        app_paths, visited_entries, incomplete_reason = self.__discover(lookup_folder)
+        if self.__catalog is None:
+            self.__metrics.increment(ScanMetrics.PLIST_READS, len(app_paths))
+            with self.__metrics.phase('plist_read'):
+                bundle_infos = self.__bundle_info_service.read_many(app_paths)
+            return bundle_infos, {}, visited_entries, len(app_paths), incomplete_reason
+
+        bundle_infos = {}
+        signatures = {}
+        stale_paths = []
+        with self.__metrics.phase('catalog_revalidation'):
+            for app_path in app_paths:
+                try:
+                    plist_stat = os.stat(BundleInfoService.info_plist_path(app_path))
+                except OSError:
+                    continue
+
+                signatures[app_path] = AppCatalog.signature(plist_stat,
+                                                            BundleInfoService.helper_dir_mtimes(app_path))
+                bundle_info = self.__catalog.lookup(app_path, signatures[app_path])
+                if bundle_info is None:
+                    stale_paths.append(app_path)
+                else:
+                    bundle_infos[app_path] = bundle_info
+
+        self.__metrics.increment(ScanMetrics.PLIST_READS, len(stale_paths))
+        with self.__metrics.phase('plist_read'):
+            for bundle_info in self.__bundle_info_service.read_many(stale_paths):
+                bundle_infos[bundle_info.path] = bundle_info
+
+        return ([bundle_infos[path] for path in app_paths if path in bundle_infos], signatures, visited_entries,
+                len(stale_paths), incomplete_reason)
@@ -0,0 +1,150 @@
+import os
+import plistlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+from xml.parsers.expat import ExpatError
+
+from models.BundleInfo import BundleInfo
+
+
+class BundleInfoService:
+    """
+    Reads bundle metadata straight from Info.plist with plistlib (XML and binary formats),
+    instead of spawning a `defaults` process per bundle.
+    """
+
+    # Folders of the helpers nested in a bundle, with the extension of their bundles. The privileged helper
+    # tools of Contents/Library/LaunchServices are plain executables named after their identifier.
+    HELPER_DIRS = (
+        (os.path.join('Contents', 'Library', 'LoginItems'), '.app'),
+        (os.path.join('Contents', 'XPCServices'), '.xpc'),
+        (os.path.join('Contents', 'PlugIns'), '.appex'),
+        (os.path.join('Contents', 'Library', 'SystemExtensions'), '.systemextension'),
+        (os.path.join('Contents', 'Library', 'LaunchServices'), None),
+    )
+
+    # Helpers can embed helpers of their own (a login item with its XPC services)
+    HELPER_DEPTH = 2
+
+    def __init__(self, max_workers: int = 8) -> None:
+        self.__max_workers = max(1, max_workers)
+
+    def read(self, bundle_path: str) -> Optional[BundleInfo]:
+        """
+        Read the metadata of a single bundle.
+
+        :param bundle_path: Path to the .app bundle
+        :return: The bundle metadata or None if the Info.plist is missing, corrupt or has no identifier
+        """
+        info = self.load_info_plist(bundle_path)
+        if info is None:
+            return None
+
+        identifier = info.get('CFBundleIdentifier')
+        if not isinstance(identifier, str) or not identifier.strip():
+            return None
+
+        fallback_name = os.path.basename(bundle_path.rstrip('/'))
+        if fallback_name.endswith('.app'):
+            fallback_name = fallback_name[:-4]
+
+        return BundleInfo(
+            bundle_path,
+            identifier.strip(),
+            self.__string_value(info, ('CFBundleDisplayName', 'CFBundleName'), fallback_name),
+            self.__string_value(info, ('CFBundleShortVersionString', 'CFBundleVersion'), ''),
+            self.__string_value(info, ('CFBundleExecutable',), ''),
+            self.read_helper_identifiers(bundle_path),
+        )
+
+    def read_many(self, bundle_paths: Iterable[str]) -> List[BundleInfo]:
+        """
+        Read the metadata of many bundles over a bounded thread pool.
+
+        :param bundle_paths: Paths to the .app bundles
+        :return: Metadata of the readable bundles, in the order of the given paths
+        """
+        bundle_paths = list(bundle_paths)
+        if len(bundle_paths) <= 1 or self.__max_workers == 1:
+            results = [self.read(path) for path in bundle_paths]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.__max_workers, len(bundle_paths))) as executor:
+                results = list(executor.map(self.read, bundle_paths))
+
+        return [info for info in results if info is not None]
+
+    def read_helper_identifiers(self, bundle_path: str, depth: int = HELPER_DEPTH) -> List[str]:
+        """
+        Read the identifiers of the helpers nested in a bundle. read_many() reads the helpers of the bundles on
+        its thread pool along with the bundles themselves.
+
+        :param bundle_path: Path to the bundle
+        :param depth: Levels of nested helpers to read
+        :return: Identifiers of the helpers, without duplicates
+        """
+        identifiers = list()
+        for helper_dir, extension in self.HELPER_DIRS:
+            directory = os.path.join(bundle_path, helper_dir)
+            try:
+                names = sorted(os.listdir(directory))
+            except OSError:
+                continue
+
+            for name in names:
+                if extension is None:
+                    if name.count('.') >= 2:
+                        identifiers.append(name)
+                    continue
+                if not name.endswith(extension):
+                    continue
+
+                helper_path = os.path.join(directory, name)
+                info = self.load_info_plist(helper_path)
+                identifier = info.get('CFBundleIdentifier') if info is not None else None
+                if isinstance(identifier, str) and identifier.strip():
+                    identifiers.append(identifier.strip())
+                if depth > 1:
+                    identifiers.extend(self.read_helper_identifiers(helper_path, depth - 1))
+
+        return list(dict.fromkeys(identifiers))
+
+    @classmethod
+    def helper_dir_mtimes(cls, bundle_path: str) -> List[Optional[int]]:
+        """
+        mtime of every folder of HELPER_DIRS, None for the missing ones. Adding, removing or replacing a helper
+        changes the mtime of its folder, so a bundle whose mtimes are unchanged still has the same helpers.
+        """
+        mtimes = list()
+        for helper_dir, _ in cls.HELPER_DIRS:
+            try:
+                mtimes.append(os.stat(os.path.join(bundle_path, helper_dir)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+
+        return mtimes
+
+    @staticmethod
+    def info_plist_path(bundle_path: str) -> str:
+        return os.path.join(bundle_path, 'Contents', 'Info.plist')
+
+    @classmethod
+    def load_info_plist(cls, bundle_path: str) -> Optional[dict]:
+        try:
+            with open(cls.info_plist_path(bundle_path), 'rb') as fp:
+                info = plistlib.load(fp)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        except (OSError, ValueError, ExpatError, plistlib.InvalidFileException) as e:
+            print(f"Error reading Info.plist of {bundle_path}: {e}")
+            return None
+
+        return info if isinstance(info, dict) else None
+
+    @staticmethod
+    def __string_value(info: dict, keys: tuple, default: str) -> str:
+        for key in keys:
+            value = info.get(key)
+            if isinstance(value, str) and value.strip():
+                return value.strip()
+
+        return default
@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+from typing import Optional
+
+
+class CacheDirectory:
+    """Location of the per-user cache files (catalogs, indexes, manifests)"""
+
+    APP_NAME = 'MacAppsUninstaller'
+    ENV_OVERRIDE = 'MAC_APPS_UNINSTALLER_CACHE_DIR'
+
+    @classmethod
+    def root(cls) -> str:
+        override = os.environ.get(cls.ENV_OVERRIDE)
+        if override:
+            return override
+
+        if sys.platform == 'darwin':
+            return os.path.expanduser(os.path.join('~/Library/Caches', cls.APP_NAME))
+
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        return os.path.join(base, cls.APP_NAME)
+
+    @classmethod
+    def path(cls, *parts: str) -> str:
+        """
+        Build a path inside the cache directory, creating the cache directory if needed.
+        """
+        root = cls.root()
+        os.makedirs(root, exist_ok=True)
+
+        return os.path.join(root, *parts)
+
+    @staticmethod
+    def read_versioned(path: str, version: int, description: str) -> Optional[dict]:
+        """
+        Read a JSON file written by write_versioned().
+
+        :param description: What the file holds, for the error message of a damaged file
+        :return: The content of the file, None when it is missing, damaged or written by another version
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading {description}: {e}")
+            return None
+
+        if not isinstance(data, dict) or data.get('version') != version:
+            return None
+
+        return data
+
+    @staticmethod
+    def write_versioned(path: str, version: int, content: dict) -> None:
+        """
+        Write a JSON object tagged with its format version. It is written to a temporary file renamed over the
+        previous one, so readers never see a partial file. Raises OSError.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump(dict(content, version=version), fp)
+        os.replace(tmp_path, path)
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Optional
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation shared between a scan and whoever started it. Besides an explicit cancel(),
+    a scan can be bounded by a deadline (seconds from the creation of the token) and a budget of entries.
+    Scans check the token between directories and stop with partial results.
+    """
+
+    CANCELLED = 'cancelled'
+    DEADLINE = 'deadline'
+    BUDGET = 'budget'
+
+    def __init__(self, timeout: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        self.__deadline = time.monotonic() + timeout if timeout is not None else None
+        self.__max_entries = max_entries
+        self.__entries = 0
+        self.__reason = None
+        self.__lock = threading.Lock()
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why the scan has to stop, None while it may continue"""
+        if self.__reason is None and self.__deadline is not None and time.monotonic() >= self.__deadline:
+            self.__reason = self.DEADLINE
+
+        return self.__reason
+
+    @property
+    def entries(self) -> int:
+        """Entries accounted for so far, only counted when the token has a budget"""
+        return self.__entries
+
+    @property
+    def max_entries(self) -> Optional[int]:
+        return self.__max_entries
+
+    def is_stopped(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self) -> None:
+        if self.__reason is None:
+            self.__reason = self.CANCELLED
+
+    def consume(self, entries: int = 1) -> bool:
+        """
+        Account for examined entries.
+
+        :return: False once the scan has to stop
+        """
+        if self.__max_entries is not None:
+            with self.__lock:
+                self.__entries += entries
+                if self.__entries >= self.__max_entries and self.__reason is None:
+                    self.__reason = self.BUDGET
+
+        return not self.is_stopped()
@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Tuple
+
+from models.DeletionResult import DeletionResult
+from models.StagedUninstall import StagedUninstall
+from repositories.StagingArea import StagingArea
+from services.PathTrie import PathTrie
+
+
+class DeletionService:
+    """
+    Removes files and directory trees natively (os.scandir / unlink / rmdir, bottom-up) instead of spawning
+    an `rm -rf` process per path. Independent top-level paths are removed concurrently.
+    """
+
+    WORKERS = 4
+
+    # Errors kept per path, a tree owned by root can fail on every entry
+    MAX_ERRORS = 5
+
+    def __init__(self, workers: int = None) -> None:
+        self.__workers = max(1, workers or self.WORKERS)
+
+    def remove_many(self, paths: Iterable[str],
+                    on_result: Callable[[DeletionResult], None] = None) -> List[DeletionResult]:
+        """
+        Remove many paths. Paths inside another path of the list are removed along with it.
+
+        :param paths: Files or directories to remove
+        :param on_result: Called with the result of every path as soon as it is known, from a worker thread
+        :return: Results in the order of the given paths
+        """
+        paths = PathTrie.top_level(paths)
+        results = dict()
+        with ThreadPoolExecutor(max_workers=min(self.__workers, max(1, len(paths)))) as executor:
+            futures = {executor.submit(self.remove, path): path for path in paths}
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.path] = result
+                if on_result is not None:
+                    on_result(result)
+
+        return [results[path] for path in paths]
+
+    def stage_many(self, paths: Iterable[str], staging_area: StagingArea, label: str = '',
+                   on_result: Callable[[DeletionResult], None] = None) -> Tuple[StagedUninstall, List[DeletionResult]]:
+        """
+        Rename the paths into a new staging directory, which takes O(1) per path whatever the size of the
+        trees. The paths which cannot be renamed, such as the ones on another device, are removed instead.
+
+        :param paths: Files or directories to remove
+        :param staging_area: Staging area receiving the paths
+        :param label: Name shown for the staged uninstall, usually the app name
+        :param on_result: Called with the result of every path as soon as it is known
+        :return: The staged uninstall, to restore or purge later, and the results in the order of the given paths
+        """
+        paths = PathTrie.top_level(paths)
+        staged = staging_area.create(label)
+        unstaged = set(staging_area.stage(staged, paths))
+
+        results = dict()
+        for path in paths:
+            if path not in unstaged:
+                results[path] = DeletionResult(path, True, staged=True)
+                if on_result is not None:
+                    on_result(results[path])
+
+        for result in self.remove_many([path for path in paths if path in unstaged], on_result):
+            results[result.path] = result
+
+        if not staged.entries:
+            staging_area.discard(staged)
+
+        return staged, [results[path] for path in paths]
+
+    def purge(self, staged: StagedUninstall) -> DeletionResult:
+        """Remove a staging directory with everything staged in it"""
+        return self.remove(staged.directory)
+
+    def remove(self, path: str) -> DeletionResult:
+        """
+        Remove a file, symlink or directory tree. A missing path counts as removed, like `rm -rf`.
+        """
+        errors = list()
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                self.__remove_tree(path, errors)
+            else:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            errors.append(self.__describe(e))
+
+        return DeletionResult(path, not errors and not os.path.lexists(path), errors)
+
+    def __remove_tree(self, root: str, errors: list) -> None:
+        # Each stack item is a directory and whether its entries were already removed
+        stack = [(root, False)]
+        while stack:
+            directory, emptied = stack.pop()
+            if emptied:
+                try:
+                    os.rmdir(directory)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.__add_error(errors, e)
+                continue
+
+            stack.append((directory, True))
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, False))
+                            continue
+
+                        try:
+                            os.unlink(entry.path)
+                        except FileNotFoundError:
+                            pass
+                        except OSError as e:
+                            self.__add_error(errors, e)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.__add_error(errors, e)
+
+    def __add_error(self, errors: list, error: OSError) -> None:
+        if len(errors) < self.MAX_ERRORS:
+            errors.append(self.__describe(error))
+
+    @staticmethod
+    def __describe(error: OSError) -> str:
+        return f"{error.filename}: {error.strerror}" if error.filename else str(error)
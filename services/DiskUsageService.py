@@ -0,0 +1,161 @@
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from typing import Callable, Dict, Iterable, Set, Tuple
+
+from repositories.DiskUsageCache import DiskUsageCache
+from services.CancellationToken import CancellationToken
+from services.PathTrie import PathTrie
+
+
+class DiskUsageService:
+    """
+    Computes the disk space which removing paths gives back: the allocated blocks (st_blocks) of every file and
+    directory, hard-linked files counted once by (st_dev, st_ino). With several workers, independent top-level
+    paths are measured concurrently. With a DiskUsageCache, the size memoized by the previous run of an unchanged
+    path is reported right away and replaced by the measured one when it is known.
+    """
+
+    # st_blocks is always in 512 bytes units, whatever the block size of the file system
+    BLOCK_SIZE = 512
+
+    # Threads measuring top-level paths. Measuring is a stat per entry, which holds the GIL most of the time,
+    # so concurrent measures are opted in through workers.
+    WORKERS = 1
+
+    def __init__(self, workers: int = None, cache: DiskUsageCache = None,
+                 cancellation_token: CancellationToken = None) -> None:
+        self.__workers = max(1, workers or self.WORKERS)
+        self.__cache = cache
+        self.__cancellation_token = cancellation_token
+
+    def measure_many(self, paths: Iterable[str], on_result: Callable[[str, int], None] = None) -> Dict[str, int]:
+        """
+        Measure many paths. Paths inside another path of the list are counted with it.
+
+        :param paths: Files or directories to measure
+        :param on_result: Called with a path and its size in bytes, first with the memoized size if there is one,
+                          then with the measured size as soon as it is known, on the calling thread
+        :return: Size in bytes of every top-level path, missing for the paths not measured before a cancellation
+        """
+        paths = PathTrie.top_level(paths)
+        signatures = dict()
+        if self.__cache is not None:
+            for path in paths:
+                try:
+                    path_stat = os.lstat(path)
+                except OSError:
+                    continue
+
+                signatures[path] = DiskUsageCache.signature(path_stat)
+                size = self.__cache.lookup(path, path_stat)
+                if size is not None and on_result is not None:
+                    on_result(path, size)
+
+        seen = set()
+        seen_lock = Lock()
+        sizes = dict()
+        with ThreadPoolExecutor(max_workers=min(self.__workers, max(1, len(paths)))) as executor:
+            futures = {executor.submit(self.__measure, path, seen, seen_lock): path for path in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                size = future.result()
+                if size is None:
+                    continue
+
+                sizes[path] = size
+                if on_result is not None:
+                    on_result(path, size)
+
+        if self.__cache is not None:
+            self.__cache.update({path: [signatures[path], size] for path, size in sizes.items() if path in signatures})
+
+        return {path: sizes[path] for path in paths if path in sizes}
+
+    def measure(self, path: str) -> int:
+        return self.measure_many([path]).get(os.path.normpath(path), 0)
+
+    @staticmethod
+    def format_size(size: int) -> str:
+        for unit in ('bytes', 'KB', 'MB', 'GB'):
+            if size < 1000 or unit == 'GB':
+                break
+            size /= 1000
+
+        return f"{size} {unit}" if unit == 'bytes' else f"{size:.1f} {unit}"
+
+    def __measure(self, path: str, seen: Set[Tuple[int, int]], seen_lock: Lock):
+        """Sum the blocks of a tree, walking it top-down with a stack. Returns None if the token stopped it"""
+        token = self.__cancellation_token
+        try:
+            path_stat = os.lstat(path)
+        except OSError:
+            return 0
+
+        if not stat.S_ISDIR(path_stat.st_mode):
+            return self.__count_file(path_stat, seen, seen_lock) * self.BLOCK_SIZE
+
+        blocks = 0
+        stack = [(path, path_stat)]
+        while stack:
+            if token is not None and token.is_stopped():
+                return None
+
+            directory, dir_stat = stack.pop()
+            file_blocks, subdirs, linked = self.__list(directory)
+            blocks += dir_stat.st_blocks + file_blocks
+            if linked:
+                with seen_lock:
+                    for dev, ino, linked_blocks in linked:
+                        if (dev, ino) not in seen:
+                            seen.add((dev, ino))
+                            blocks += linked_blocks
+
+            for name in subdirs:
+                subdir = os.path.join(directory, name)
+                try:
+                    stack.append((subdir, os.lstat(subdir)))
+                except OSError:
+                    pass
+
+        return blocks * self.BLOCK_SIZE
+
+    @staticmethod
+    def __list(directory: str) -> list:
+        """List a directory as [plain file blocks, subdirectory names, [[dev, ino, blocks]] of hard-linked files]"""
+        file_blocks = 0
+        subdirs = list()
+        linked = list()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            continue
+
+                        entry_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+
+                    if entry_stat.st_nlink > 1:
+                        linked.append([entry_stat.st_dev, entry_stat.st_ino, entry_stat.st_blocks])
+                    else:
+                        file_blocks += entry_stat.st_blocks
+        except OSError:
+            pass
+
+        return [file_blocks, subdirs, linked]
+
+    @staticmethod
+    def __count_file(file_stat: os.stat_result, seen: Set[Tuple[int, int]], seen_lock: Lock) -> int:
+        if file_stat.st_nlink <= 1:
+            return file_stat.st_blocks
+
+        with seen_lock:
+            if (file_stat.st_dev, file_stat.st_ino) in seen:
+                return 0
+            seen.add((file_stat.st_dev, file_stat.st_ino))
+
+        return file_stat.st_blocks
@@ -1,72 +1,358 @@
 import os
-from typing import List
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
 from models.AppModel import AppModel
+from models.ScanResult import ScanResult
+from repositories.PathIndex import PathIndex
+from repositories.StagingArea import StagingArea
+from services.CacheDirectory import CacheDirectory
+from services.CancellationToken import CancellationToken
+from services.MountService import MountService
+from services.ParallelWalker import ParallelWalker
+from services.PathTrie import PathTrie
+from services.PatternMatcher import PatternMatcher
+from services.ScanMetrics import ScanMetrics
 
 
 class FileLookupService:
-    def __init__(self, app_model: AppModel) -> None:
-        self.__app_model = app_model
+    ALL_TIERS = 0
+    TIER_ONE = 1
+    TIER_TWO = 2
 
-    def find_app_related_files(self) -> List[str]:
-        if not os.access("/private", os.R_OK):
-            raise PermissionError("Python does not have read access to the /private folder.")
+    SEARCH_PATHS = [
+        '/'
+    ]
 
-        search_paths = [
-            '/'
-        ]
+    # Locations where almost all leftovers live, scanned first by the tiered lookup
+    TIER_ONE_PATHS = [
+        '~/Library/Application Support',
+        '~/Library/Caches',
+        '~/Library/Preferences',
+        '~/Library/Containers',
+        '~/Library/Group Containers',
+        '~/Library/Saved Application State',
+        '~/Library/HTTPStorages',
+        '~/Library/LaunchAgents',
+        '/Library/LaunchDaemons',
+        '/Library/PrivilegedHelperTools',
+        '/Library/Receipts',
+        '/private/var/db/receipts',
+    ]
+
+    # Threads listing directories during a walk of the disk. On a warm cache the walk is bound by the GIL and
+    # extra threads only add contention (0.57x with 2 threads in benchmarks/walker_benchmark.py), so listing
+    # on several threads is opted in through workers, for cold disks or network shares.
+    WORKERS = 1
 
-        ignored_dirs = [
+    # Seconds during which the path index is trusted without checking the disk again. A refresh stats every
+    # indexed directory, so it is not run on every query: the tier one locations, where most leftovers are
+    # created, are always walked live, the UI shows the age of the index and offers a forced rescan.
+    INDEX_MAX_AGE = 10 * 60
+
+    def __init__(self, app_model: AppModel = None, search_paths: List[str] = None,
+                 ignored_dirs: List[str] = None, path_index: PathIndex = None, force_rescan: bool = False,
+                 workers: int = None, cancellation_token: CancellationToken = None,
+                 metrics: ScanMetrics = None, devices: Iterable[int] = None,
+                 mount_service: MountService = None) -> None:
+        self.__app_model = app_model
+        self.__metrics = metrics or ScanMetrics.disabled()
+        self.__cancellation_token = cancellation_token
+        self.__incomplete_reason = None
+        self.__workers = workers or self.WORKERS
+        self.__path_index = path_index
+        self.__force_rescan = force_rescan
+        self.__visited_dirs = 0
+        self.__indexed_dirs = 0
+        self.__deduplicated_dirs = 0
+        self.__skipped_dirs = 0
+        # st_dev of the devices the lookup is restricted to, all of them when None
+        self.__devices = frozenset(devices) if devices is not None else None
+        self.__search_paths = search_paths or self.SEARCH_PATHS
+        self.__ignored_dirs = ignored_dirs if ignored_dirs is not None else [
             '/System',
-            os.path.expanduser('~/Library/WebKit')
+            os.path.expanduser('~/Library/WebKit'),
+            # Files of the uninstalls which can still be undone
+            os.path.join(CacheDirectory.root(), StagingArea.DIRNAME),
         ]
 
-        related_files = [self.__app_model.path]
+        # Network shares, pseudo file systems and removable volumes below the search paths are not walked
+        if mount_service is not None:
+            self.__ignored_dirs = self.__ignored_dirs + [
+                path for path in mount_service.excluded_paths(self.__search_paths) if path not in self.__ignored_dirs
+            ]
 
-        for path in search_paths:
-            for root, dirs, files in os.walk(path):
-                should_continue = self.__process_directory(root, related_files)
-                if should_continue:
-                    continue
+    def find_app_related_files(self) -> ScanResult:
+        return self.find_related_files([self.__app_model])[self.__app_model]
+
+    def iter_app_related_files(self, tier: int = ALL_TIERS) -> Iterator[str]:
+        """
+        Yield the files related to the app as soon as they are found.
 
-                dirs[:] = self.__filter_dirs(root, dirs, ignored_dirs)
-                for file in files:
-                    filename = os.path.join(root, file)
-                    if self.__app_model.identifier in filename or self.__app_model.relative_identifier in filename:
-                        related_files.append(filename)
+        :param tier: ALL_TIERS, TIER_ONE or TIER_TWO
+        """
+        for directory, matches in self.walk_related_files([self.__app_model], tier):
+            for app_model, path in matches:
+                yield path
 
-        return related_files
+    def find_related_files(self, app_models: List[AppModel]) -> Dict[AppModel, ScanResult]:
+        """
+        Find the files related to many apps with a single walk. Every path is matched against the
+        identifiers of all the apps at once.
 
-    @staticmethod
-    def __filter_dirs(root: str, dirs: List[str], ignored_dirs: List[str]) -> List[str]:
+        :param app_models: Apps to look up
+        :return: Mapping of every app to its related paths, starting with the app path itself
+        """
+        return self.__collect(app_models, self.ALL_TIERS)
+
+    def find_tier_one_related_files(self, app_models: List[AppModel]) -> Dict[AppModel, ScanResult]:
+        """
+        Find the related files in the well known Library locations only. This takes milliseconds
+        and covers almost all the leftovers.
+
+        :param app_models: Apps to look up
+        :return: Mapping of every app to its related paths, starting with the app path itself
+        """
+        return self.__collect(app_models, self.TIER_ONE)
+
+    def find_tier_two_related_files(self, app_models: List[AppModel]) -> Dict[AppModel, ScanResult]:
+        """
+        Sweep the search paths for the related files outside the tier one locations.
+
+        :param app_models: Apps to look up
+        :return: Mapping of every app to the related paths which were not found by the tier one lookup
+        """
+        return self.__collect(app_models, self.TIER_TWO)
+
+    def tier_one_paths(self) -> List[str]:
+        return [os.path.expanduser(path) for path in self.TIER_ONE_PATHS]
+
+    @property
+    def search_paths(self) -> List[str]:
+        return self.__search_paths
+
+    @property
+    def ignored_dirs(self) -> List[str]:
+        return self.__ignored_dirs
+
+    @property
+    def visited_dirs(self) -> int:
+        """Number of directories walked so far by the current or last lookup"""
+        return self.__visited_dirs
+
+    @property
+    def indexed_dirs(self) -> int:
+        """Number of directories scanned so far by the path index refresh of the current or last lookup"""
+        return self.__indexed_dirs
+
+    @property
+    def deduplicated_dirs(self) -> int:
+        """Directories of the last lookup skipped because they were already walked through another path"""
+        return self.__deduplicated_dirs
+
+    @property
+    def skipped_dirs(self) -> int:
+        """Directories of the last lookup skipped because they are on another device"""
+        return self.__skipped_dirs
+
+    @property
+    def complete(self) -> bool:
+        """False when the last lookup was stopped by its cancellation token"""
+        return self.__incomplete_reason is None
+
+    @property
+    def incomplete_reason(self) -> str:
+        return self.__incomplete_reason
+
+    # Protected accessors for the subclasses walking the search paths their own way
+
+    @property
+    def _workers(self) -> int:
+        return self.__workers
+
+    @property
+    def _cancellation_token(self) -> Optional[CancellationToken]:
+        return self.__cancellation_token
+
+    @property
+    def _metrics(self) -> ScanMetrics:
+        return self.__metrics
+
+    @property
+    def _devices(self) -> Optional[FrozenSet[int]]:
+        return self.__devices
+
+    def _set_progress(self, visited_dirs: int, incomplete_reason: str = None) -> None:
+        """Report the directories walked and, once the lookup is over, why it stopped early"""
+        self.__visited_dirs = visited_dirs
+        self.__incomplete_reason = incomplete_reason
+
+    def walk_related_files(self, app_models: List[AppModel],
+                           tier: int = ALL_TIERS) -> Iterator[Tuple[str, List[Tuple[AppModel, str]]]]:
         """
-        Filter out directories from a given list of directories that do not start with any of the ignored directories.
+        Walk the search paths and yield, for every directory, the (app, path) matches found in it.
+        The app paths themselves are yielded first, except for the tier two lookup. While the path index
+        is refreshed, every directory it scans is yielded without matches, so the caller can report progress.
 
-        :param root: base path /root for os
-        :param dirs: List of directories
-        :param ignored_dirs: List of ignored directories
-        :return: Filtered list of directories
+        :param app_models: Apps to look up
+        :param tier: ALL_TIERS, TIER_ONE or TIER_TWO
         """
-        filtered_dirs = list()
-
-        for d in dirs:
-            ignore_dir = False
-            for dir_to_ignore in ignored_dirs:
-                dirname = os.path.abspath(os.path.join(root, d))
-                if dirname.startswith(dir_to_ignore):
-                    ignore_dir = True
+        self.__visited_dirs = 0
+        self.__indexed_dirs = 0
+        self.__deduplicated_dirs = 0
+        self.__skipped_dirs = 0
+        self.__incomplete_reason = None
+        token = self.__cancellation_token
+        metrics = self.__metrics
+        path_index = self.__path_index
+        ignored_dirs = self.__ignored_dirs
+        search_paths = self.__search_paths
+        if tier == self.TIER_ONE:
+            search_paths = [path for path in self.tier_one_paths() if os.path.isdir(path)]
+            path_index = None
+        elif tier == self.TIER_TWO:
+            ignored_dirs = ignored_dirs + self.tier_one_paths()
+
+        if '/' in search_paths and not os.access("/private", os.R_OK):
+            raise PermissionError("Python does not have read access to the /private folder.")
+
+        if tier != self.TIER_TWO:
+            yield '', [(app_model, path) for app_model in app_models for path in app_model.paths]
+
+        all_apps = frozenset(range(len(app_models)))
+        matcher = self.__create_matcher(app_models)
+        ignored_trie = PathTrie(ignored_dirs)
+
+        # App bundles are related to their own app without being matched by name
+        app_trie = PathTrie()
+        for idx, app_model in enumerate(app_models):
+            for path in app_model.paths:
+                node = app_trie.node(path)
+                app_trie.add(path, (node.value if node is not None and node.value else frozenset()) | {idx})
+
+        listdir = None
+        if path_index is not None:
+            with metrics.phase('index_refresh'):
+                for directory in path_index.iter_ensure_fresh(search_paths, ignored_dirs, max_age=self.INDEX_MAX_AGE,
+                                                              force_rescan=self.__force_rescan,
+                                                              cancellation_token=token):
+                    self.__indexed_dirs += 1
+                    yield directory, []
+            listdir = path_index.listdir
+
+        def on_error(directory: str, error: OSError):
+            if isinstance(error, PermissionError):
+                metrics.increment(ScanMetrics.PERMISSION_ERRORS)
+
+        # The index is in memory, listing it from several threads would only add contention. The index
+        # holds every directory once already, a walk of the disk skips the aliases by (st_dev, st_ino).
+        walker = ParallelWalker(1 if listdir is not None else self.__workers, listdir, on_error,
+                                dedupe=listdir is None, devices=self.__devices)
+
+        # Reasons of the visits skipped because the token stopped the lookup
+        stopped = list()
+
+        def visit(root: str, dirs: List[str], files: List[str], state: tuple):
+            """
+            Match the entries of a directory. The state holds the apps which already own the subtree and the
+            nodes of the directory in the ignored and app path tries, so every child is checked in O(1).
+            """
+            claimed_here, ignored_node, app_node = state
+            if token is not None and not token.consume(len(dirs) + len(files)):
+                stopped.append(token.reason)
+                return [], []
+
+            metrics.increment(ScanMetrics.ENTRIES_EXAMINED, len(dirs) + len(files))
+            found = list()
+            children = list()
+            pruned = 0
+            for d in dirs:
+                ignored_child = ignored_node.child(d) if ignored_node is not None else None
+                if ignored_child is not None and ignored_child.terminal:
+                    pruned += 1
+                    continue
+
+                dirname = os.path.join(root, d)
+                app_child = app_node.child(d) if app_node is not None else None
+                owners = app_child.value if app_child is not None and app_child.terminal else frozenset()
+                owners = owners - claimed_here
+                matches = matcher.match(d) - claimed_here - owners
+                for idx in matches:
+                    found.append((app_models[idx], dirname))
+
+                claimed_below = claimed_here | owners | matches
+                if claimed_below != all_apps:
+                    children.append((d, (claimed_below, ignored_child, app_child)))
+                else:
+                    pruned += 1
+
+            for file in files:
+                for idx in matcher.match(file) - claimed_here:
+                    found.append((app_models[idx], os.path.join(root, file)))
+
+            if pruned:
+                metrics.increment(ScanMetrics.SUBTREES_PRUNED, pruned)
+            if found:
+                metrics.increment(ScanMetrics.MATCHES, len(found))
+
+            return children, found
+
+        # Includes the time the consumer spends between two directories
+        with metrics.phase('walk'):
+            for path in search_paths:
+                if ignored_trie.covers(path):
+                    continue
+
+                owner = app_trie.covering(path)
+                claimed = owner.value if owner is not None else frozenset()
+                state = (claimed, ignored_trie.node(path), app_trie.node(path))
+                walk = walker.walk(path, state, visit)
+                try:
+                    for root, found in walk:
+                        self.__visited_dirs += 1
+                        metrics.increment(ScanMetrics.DIRECTORIES_VISITED)
+                        yield root, found
+
+                        if token is not None and token.is_stopped():
+                            stopped.append(token.reason)
+                            break
+                finally:
+                    walk.close()
+                    self.__count_skipped(walker)
+
+                if stopped:
+                    self.__incomplete_reason = stopped[0]
                     break
 
-            if not ignore_dir:
-                filtered_dirs.append(d)
+    def __count_skipped(self, walker: ParallelWalker) -> None:
+        deduplicated = walker.deduplicated_dirs - self.__deduplicated_dirs
+        skipped = walker.skipped_dirs - self.__skipped_dirs
+        if deduplicated:
+            self.__metrics.increment(ScanMetrics.DIRECTORIES_DEDUPLICATED, deduplicated)
+        if skipped:
+            self.__metrics.increment(ScanMetrics.DIRECTORIES_SKIPPED, skipped)
 
-        return filtered_dirs
+        self.__deduplicated_dirs = walker.deduplicated_dirs
+        self.__skipped_dirs = walker.skipped_dirs
 
-    def __process_directory(self, root: str, related_files: List[str]) -> bool:
-        if any(root.startswith(rel_file) for rel_file in related_files):
-            return True
-        elif self.__app_model.identifier in root or self.__app_model.relative_identifier in root:
-            related_files.append(root)
-            return True
+    def __collect(self, app_models: List[AppModel], tier: int) -> Dict[AppModel, ScanResult]:
+        """Collect the matches of a lookup, the app paths first and the other paths sorted"""
+        app_paths = {app_model: [] for app_model in app_models}
+        related_files = {app_model: [] for app_model in app_models}
+        for directory, matches in self.walk_related_files(app_models, tier):
+            for app_model, path in matches:
+                (related_files if directory else app_paths)[app_model].append(path)
+
+        return {
+            app_model: ScanResult(app_paths[app_model] + sorted(related_files[app_model]), self.complete,
+                                  self.incomplete_reason)
+            for app_model in app_models
+        }
+
+    @staticmethod
+    def __create_matcher(app_models: List[AppModel]) -> PatternMatcher:
+        patterns = dict()
+        for idx, app_model in enumerate(app_models):
+            for pattern in app_model.match_patterns:
+                patterns.setdefault(pattern, set()).add(idx)
 
-        return False
+        return PatternMatcher(patterns)
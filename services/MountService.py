@@ -0,0 +1,170 @@
+import os
+import re
+import subprocess
+import sys
+from typing import Iterable, List, Optional, Tuple
+
+from models.MountPoint import MountPoint
+from services.PathTrie import PathTrie
+
+
+class MountService:
+    """
+    Enumerates the mounted file systems and classifies them as local, network, pseudo or removable, so the scans
+    can stay on the local volumes instead of stalling on a network share or walking /dev and disk images.
+    Mount points are read from /proc/self/mounts on Linux and from the output of mount(8) on macOS; none of them
+    is stat-ed, a dead network share would block the call.
+    """
+
+    LOCAL = 'local'
+    NETWORK = 'network'
+    PSEUDO = 'pseudo'
+    REMOVABLE = 'removable'
+
+    KINDS = [LOCAL, NETWORK, PSEUDO, REMOVABLE]
+
+    NETWORK_FS_TYPES = {
+        'afpfs', 'smbfs', 'nfs', 'nfs4', 'webdav', 'ftp', 'cifs', 'smb3', 'ncpfs', 'davfs', 'fuse.sshfs',
+        'fuse.rclone', 'afs', 'ceph', 'glusterfs', '9p',
+    }
+
+    PSEUDO_FS_TYPES = {
+        'devfs', 'autofs', 'fdesc', 'nullfs', 'lifs', 'proc', 'sysfs', 'devtmpfs', 'devpts', 'tmpfs', 'ramfs',
+        'cgroup', 'cgroup2', 'mqueue', 'debugfs', 'tracefs', 'securityfs', 'pstore', 'bpf', 'configfs',
+        'fusectl', 'hugetlbfs', 'binfmt_misc', 'efivarfs', 'rpc_pipefs', 'nsfs', 'selinuxfs', 'autofs4',
+    }
+
+    # Disk images, external drives and Time Machine snapshots are mounted there
+    REMOVABLE_ROOTS = ['/Volumes', '/media', '/run/media']
+    SNAPSHOT_PREFIXES = ['/Volumes/com.apple.TimeMachine', '/Volumes/.timemachine']
+
+    MOUNT_LINE = re.compile(r'^(?P<source>.+?) on (?P<path>/.*?) \((?P<fs_type>[^,)]+)(?:, (?P<options>[^)]*))?\)$')
+
+    def __init__(self, kinds: Iterable[str] = (LOCAL,), allowed_fs_types: Iterable[str] = None,
+                 denied_fs_types: Iterable[str] = None) -> None:
+        self.__kinds = frozenset(kinds)
+        # When given, only the mounts of these file system types are scanned, whatever their kind
+        self.__allowed_fs_types = frozenset(allowed_fs_types) if allowed_fs_types else None
+        self.__denied_fs_types = frozenset(denied_fs_types or ())
+        self.__mounts = None
+
+    def mounts(self) -> List[MountPoint]:
+        """Mounted file systems sorted by path, the last mount wins when several share a mount point"""
+        if self.__mounts is None:
+            mounts = dict()
+            for mount in self.read_mounts():
+                mount.kind = self.classify(mount)
+                mounts[mount.path] = mount
+            self.__mounts = [mounts[path] for path in sorted(mounts)]
+
+        return self.__mounts
+
+    def is_selected(self, mount: MountPoint) -> bool:
+        if mount.fs_type in self.__denied_fs_types:
+            return False
+        if self.__allowed_fs_types is not None:
+            return mount.fs_type in self.__allowed_fs_types
+
+        return mount.kind in self.__kinds
+
+    def excluded_paths(self, search_paths: List[str]) -> List[str]:
+        """Mount points lying below the search paths which must not be walked"""
+        search_trie = PathTrie(search_paths)
+        return [
+            mount.path for mount in self.mounts()
+            if not self.is_selected(mount) and mount.path not in search_paths and search_trie.covers(mount.path)
+        ]
+
+    def volumes(self, search_paths: List[str]) -> List[Tuple[MountPoint, List[str], List[str]]]:
+        """
+        Split the search paths by volume.
+
+        :return: (mount, roots, nested mount points) for every selected volume holding a part of the search paths,
+                 where the roots are the folders to walk and the nested mount points belong to other volumes
+        """
+        mounts = self.mounts()
+        mount_trie = PathTrie()
+        for mount in mounts:
+            mount_trie.add(mount.path, mount)
+
+        search_trie = PathTrie(search_paths)
+        roots = dict()
+        for path in search_paths:
+            covering = mount_trie.covering(path)
+            if covering is not None:
+                roots.setdefault(covering.value.path, (covering.value, []))[1].append(path)
+        for mount in mounts:
+            if mount.path not in roots and search_trie.covers(mount.path):
+                roots[mount.path] = (mount, [mount.path])
+
+        volumes = list()
+        for mount, volume_roots in roots.values():
+            if not self.is_selected(mount):
+                continue
+
+            roots_trie = PathTrie(volume_roots)
+            nested = [other.path for other in mounts if other.path != mount.path and roots_trie.covers(other.path)]
+            volumes.append((mount, volume_roots, nested))
+
+        return sorted(volumes, key=lambda volume: volume[0].path)
+
+    def classify(self, mount: MountPoint) -> str:
+        fs_type = mount.fs_type
+        if fs_type in self.PSEUDO_FS_TYPES or (fs_type.startswith('fuse.') and fs_type not in self.NETWORK_FS_TYPES):
+            return self.PSEUDO
+        if any(mount.path.startswith(prefix) for prefix in self.SNAPSHOT_PREFIXES):
+            return self.PSEUDO
+        if fs_type in self.NETWORK_FS_TYPES or mount.source.startswith('//') or ':/' in mount.source:
+            return self.NETWORK
+        if PathTrie(self.REMOVABLE_ROOTS).covers(mount.path) and mount.path not in self.REMOVABLE_ROOTS:
+            return self.REMOVABLE
+
+        return self.LOCAL
+
+    @classmethod
+    def read_mounts(cls) -> List[MountPoint]:
+        if os.path.exists('/proc/self/mounts'):
+            return cls.__read_proc_mounts('/proc/self/mounts')
+        if sys.platform == 'darwin':
+            return cls.__read_mount_output()
+
+        return [MountPoint('/', '', 'unknown')]
+
+    @classmethod
+    def parse_mount_line(cls, line: str) -> Optional[MountPoint]:
+        """Parse a line of the macOS mount(8) output: source on path (type, option, option)"""
+        match = cls.MOUNT_LINE.match(line.strip())
+        if match is None:
+            return None
+
+        options = [option.strip() for option in (match.group('options') or '').split(',') if option.strip()]
+        return MountPoint(match.group('path'), match.group('source'), match.group('fs_type'), options)
+
+    @staticmethod
+    def __unescape(field: str) -> str:
+        return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), field)
+
+    @classmethod
+    def __read_proc_mounts(cls, mounts_path: str) -> List[MountPoint]:
+        mounts = list()
+        try:
+            with open(mounts_path, 'r', encoding='utf-8', errors='replace') as fp:
+                for line in fp:
+                    fields = line.split()
+                    if len(fields) >= 4:
+                        mounts.append(MountPoint(cls.__unescape(fields[1]), cls.__unescape(fields[0]), fields[2],
+                                                 fields[3].split(',')))
+        except OSError as e:
+            print(f"Error reading mount points: {e}")
+
+        return mounts
+
+    @classmethod
+    def __read_mount_output(cls) -> List[MountPoint]:
+        try:
+            output = subprocess.run(['/sbin/mount'], capture_output=True, text=True, check=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Error reading mount points: {e}")
+            return [MountPoint('/', '', 'unknown')]
+
+        return [mount for mount in map(cls.parse_mount_line, output.splitlines()) if mount is not None]
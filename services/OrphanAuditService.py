@@ -0,0 +1,148 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.AppModel import AppModel
+from models.OrphanGroup import OrphanGroup
+from services.CancellationToken import CancellationToken
+from services.DiskUsageService import DiskUsageService
+from services.FileLookupService import FileLookupService
+from services.ScanMetrics import ScanMetrics
+
+
+class OrphanAuditService:
+    """
+    Finds the leftovers of apps which are not installed anymore. The entries of the Library locations are
+    listed once, a bundle identifier is inferred from every entry name (com.example.App.plist,
+    TEAMID.com.example.App, com.example.App.savedState...) and looked up in the set of installed identifiers,
+    so the cost of the audit does not depend on the number of apps.
+    """
+
+    # Installer receipts (/Library/Receipts, /private/var/db/receipts) are left out: they are named after package
+    # identifiers, which rarely match the bundle identifier of the app they installed
+    LOCATIONS = [location for location in FileLookupService.TIER_ONE_PATHS
+                 if os.path.basename(location).lower() != 'receipts'] + [
+        '~/Library/Preferences/ByHost',
+        '~/Library/Logs',
+        '~/Library/WebKit',
+        '~/Library/Cookies',
+        '/Library/Application Support',
+        '/Library/Caches',
+        '/Library/Preferences',
+        '/Library/LaunchAgents',
+    ]
+
+    # Extensions added to a bundle identifier by the system, stripped before the lookup
+    SUFFIXES = ('.plist', '.savedState', '.binarycookies', '.lockfile', '.bom', '.log')
+
+    # Identifiers owned by the system, never reported
+    SYSTEM_PREFIXES = ('com.apple.',)
+
+    # Optional team identifier (group containers) or group. prefix, then at least three dot separated components
+    IDENTIFIER = re.compile(r'(?:[A-Z0-9]{10}\.)?(?:group\.)?([a-z][a-z0-9]*(?:\.[A-Za-z0-9_-]+){2,})')
+
+    # Host UUID appended by ~/Library/Preferences/ByHost
+    HOST_SUFFIX = re.compile(r'\.[0-9A-Fa-f]{8}(?:-[0-9A-Fa-f]{4}){3}-[0-9A-Fa-f]{12}$|\.[0-9A-Fa-f]{12}$')
+
+    def __init__(self, locations: List[str] = None, disk_usage_service: DiskUsageService = None,
+                 cancellation_token: CancellationToken = None, metrics: ScanMetrics = None) -> None:
+        self.__locations = [os.path.expanduser(location) for location in locations or self.LOCATIONS]
+        self.__disk_usage_service = disk_usage_service or DiskUsageService(cancellation_token=cancellation_token)
+        self.__cancellation_token = cancellation_token
+        self.__metrics = metrics or ScanMetrics.disabled()
+
+    def audit(self, installed_apps: Iterable[AppModel]) -> List[OrphanGroup]:
+        """
+        Group the Library entries of the apps which are not installed, and measure every group.
+
+        :param installed_apps: Apps whose entries are not orphans, usually AppService.list_apps()
+        :return: Orphan groups, the largest first
+        """
+        groups: Dict[str, OrphanGroup] = dict()
+        for identifier, path in self.iter_orphaned_entries(installed_apps):
+            group = groups.get(identifier.lower())
+            if group is None:
+                group = groups[identifier.lower()] = OrphanGroup(identifier)
+            group.paths.append(path)
+
+        with self.__metrics.phase('measure'):
+            sizes = self.__disk_usage_service.measure_many(path for group in groups.values() for path in group.paths)
+        for group in groups.values():
+            group.paths.sort()
+            group.size = sum(sizes.get(path, 0) for path in group.paths)
+
+        return sorted(groups.values(), key=lambda group: (-group.size, group.identifier.lower()))
+
+    def iter_orphaned_entries(self, installed_apps: Iterable[AppModel]) -> Iterator[Tuple[str, str]]:
+        """
+        List the audited locations once and yield the (inferred identifier, path) of the entries which belong to
+        no installed app, as soon as they are found.
+
+        :param installed_apps: Apps whose entries are not orphans
+        """
+        installed = {
+            identifier.lower() for app in installed_apps for identifier in (app.identifier, *app.helper_identifiers)
+            if identifier
+        }
+        token = self.__cancellation_token
+        metrics = self.__metrics
+        with metrics.phase('walk'):
+            for location in self.__locations:
+                try:
+                    with os.scandir(location) as entries:
+                        names = [entry.name for entry in entries]
+                except FileNotFoundError:
+                    continue
+                except PermissionError:
+                    metrics.increment(ScanMetrics.PERMISSION_ERRORS)
+                    continue
+                except OSError:
+                    continue
+
+                if token is not None and not token.consume(len(names)):
+                    return
+                metrics.increment(ScanMetrics.DIRECTORIES_VISITED)
+                metrics.increment(ScanMetrics.ENTRIES_EXAMINED, len(names))
+
+                for name in names:
+                    identifier = self.identifier(name)
+                    if identifier is None or self.is_installed(identifier, installed):
+                        continue
+
+                    metrics.increment(ScanMetrics.MATCHES)
+                    yield identifier, os.path.join(location, name)
+
+    @classmethod
+    def identifier(cls, name: str) -> Optional[str]:
+        """Bundle identifier an entry name was derived from, None if the name does not look like one"""
+        stripped = True
+        while stripped:
+            stripped = False
+            for suffix in cls.SUFFIXES:
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+                    stripped = True
+        name = cls.HOST_SUFFIX.sub('', name)
+
+        match = cls.IDENTIFIER.fullmatch(name)
+        if match is None:
+            return None
+
+        identifier = match.group(1)
+        if identifier.lower().startswith(cls.SYSTEM_PREFIXES):
+            return None
+
+        return identifier
+
+    @staticmethod
+    def is_installed(identifier: str, installed: set) -> bool:
+        """
+        An identifier belongs to an installed app if it is the app identifier or one of its children
+        (com.example.App.helper), checked with one set lookup per component.
+        """
+        components = identifier.lower().split('.')
+        for end in range(len(components), 2, -1):
+            if '.'.join(components[:end]) in installed:
+                return True
+
+        return False
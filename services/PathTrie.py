@@ -0,0 +1,101 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class PathTrie:
+    """
+    Trie of absolute paths keyed by path component. Checking whether a path lies below one of the stored
+    paths costs O(depth), whatever the number of stored paths, and a top-down walk can carry the node of
+    the current directory along so checking a child costs a single dictionary lookup.
+    """
+
+    class Node:
+        __slots__ = ('children', 'terminal', 'value')
+
+        def __init__(self) -> None:
+            self.children: Dict[str, 'PathTrie.Node'] = dict()
+            self.terminal = False
+            self.value = None
+
+        def child(self, name: str) -> Optional['PathTrie.Node']:
+            return self.children.get(name)
+
+    def __init__(self, paths: Iterable[str] = ()) -> None:
+        self.__root = PathTrie.Node()
+        self.__size = 0
+        for path in paths:
+            self.add(path)
+
+    def __len__(self) -> int:
+        return self.__size
+
+    @property
+    def root(self) -> 'PathTrie.Node':
+        return self.__root
+
+    def add(self, path: str, value: Any = None) -> 'PathTrie.Node':
+        node = self.__root
+        for name in self.split(path):
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = PathTrie.Node()
+            node = child
+
+        if not node.terminal:
+            node.terminal = True
+            self.__size += 1
+        node.value = value
+
+        return node
+
+    def node(self, path: str) -> Optional['PathTrie.Node']:
+        """Return the node of a path, None when no stored path goes through it"""
+        node = self.__root
+        for name in self.split(path):
+            node = node.children.get(name)
+            if node is None:
+                return None
+
+        return node
+
+    def covers(self, path: str) -> bool:
+        """Check if the path is one of the stored paths or lies below one of them"""
+        return self.covering(path) is not None
+
+    def covering(self, path: str) -> Optional['PathTrie.Node']:
+        """Return the node of the closest stored path which is the path itself or one of its ancestors"""
+        node = self.__root
+        if node.terminal:
+            return node
+
+        for name in self.split(path):
+            node = node.children.get(name)
+            if node is None:
+                return None
+            if node.terminal:
+                return node
+
+        return None
+
+    @staticmethod
+    def top_level(paths: Iterable[str]) -> List[str]:
+        """
+        Drop the duplicates and the paths lying inside another path of the list. Sorted, a path can come after
+        siblings of its ancestor, so it is checked against every path kept rather than the last one:
+
+        >>> PathTrie.top_level(['/x/com.foo', '/x/com.foo.bar', '/x/com.foo/y'])
+        ['/x/com.foo', '/x/com.foo.bar']
+        """
+        top_level = list()
+        kept = PathTrie()
+        for path in sorted(set(os.path.normpath(path) for path in paths)):
+            if kept.covers(path):
+                continue
+            kept.add(path)
+            top_level.append(path)
+
+        return top_level
+
+    @staticmethod
+    def split(path: str) -> list:
+        return [name for name in os.path.abspath(path).split(os.sep) if name]
@@ -0,0 +1,61 @@
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, Iterable
+
+
+class PatternMatcher:
+    """
+    Aho–Corasick automaton that finds which of many patterns occur in a string in a single pass.
+    Every pattern is associated with one or more keys; match() returns the keys of all patterns found.
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[Hashable]]) -> None:
+        self.__goto = [{}]
+        self.__fail = [0]
+        self.__output = [frozenset()]
+        outputs = [set()]
+
+        for pattern, keys in patterns.items():
+            if not pattern:
+                continue
+
+            state = 0
+            for char in pattern:
+                next_state = self.__goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.__goto)
+                    self.__goto[state][char] = next_state
+                    self.__goto.append({})
+                    self.__fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].update(keys)
+
+        # Breadth-first construction of the failure links, merging the outputs of the fallback states
+        queue = deque(self.__goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.__goto[state].items():
+                queue.append(next_state)
+                fallback = self.__fail[state]
+                while fallback and char not in self.__goto[fallback]:
+                    fallback = self.__fail[fallback]
+                self.__fail[next_state] = self.__goto[fallback].get(char, 0)
+                outputs[next_state].update(outputs[self.__fail[next_state]])
+
+        self.__output = [frozenset(keys) for keys in outputs]
+
+    def match(self, text: str) -> FrozenSet[Hashable]:
+        goto = self.__goto
+        fail = self.__fail
+        output = self.__output
+
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return frozenset(found)
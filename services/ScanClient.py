@@ -0,0 +1,95 @@
+import os
+import socket
+
+from models.AppModel import AppModel
+from models.ScanResult import ScanResult
+from repositories.AppRegistry import AppRegistry
+from services.FileLookupService import FileLookupService
+from services.ScanProtocol import ScanProtocol
+
+
+class ScanClient:
+    """
+    Client of the scan daemon. The answers come from the scans the daemon keeps warm, so they take
+    milliseconds instead of a walk of the disk. Every method raises ScanClient.Unavailable when no daemon
+    answers, whether none is running, it timed out or it failed, the caller then scans by itself.
+    """
+
+    class Unavailable(ConnectionError):
+        """The daemon could not answer the request"""
+
+    # Seconds to wait for an answer, a cold daemon may still be building its index
+    TIMEOUT = 120
+
+    def __init__(self, socket_path: str = None, timeout: float = None) -> None:
+        self.__socket_path = socket_path or ScanProtocol.socket_path()
+        self.__timeout = timeout or self.TIMEOUT
+
+    def available(self) -> bool:
+        """Cheap check before a request: the socket of a daemon exists"""
+        return os.path.exists(self.__socket_path)
+
+    def list_apps(self) -> AppRegistry:
+        result = self.request(ScanProtocol.LIST_APPS)
+        app_list = AppRegistry()
+        for record in result['apps']:
+            app_list.append_model(ScanProtocol.app_model(record))
+        app_list.incomplete_reason = result['incomplete_reason']
+
+        return app_list
+
+    def find_related_files(self, app_model: AppModel, tier: int = FileLookupService.ALL_TIERS,
+                           force_rescan: bool = False) -> ScanResult:
+        """
+        Find the files related to an app, starting with the app paths themselves.
+
+        :param app_model: App to look up, with its helpers and copies
+        :param tier: ALL_TIERS, TIER_ONE or TIER_TWO
+        :param force_rescan: Have the daemon rebuild its path index first, unless it rebuilt it recently
+        """
+        result = self.request(ScanProtocol.FIND_RELATED, app=ScanProtocol.app_record(app_model), tier=tier,
+                              force_rescan=force_rescan)
+
+        return ScanResult(result['paths'], result['incomplete_reason'] is None, result['incomplete_reason'])
+
+    def find_app(self, identifier: str) -> AppModel:
+        for app_model in self.list_apps().list():
+            if app_model.identifier == identifier:
+                return app_model
+
+        raise LookupError(f"No application found for {identifier}")
+
+    def status(self) -> dict:
+        return self.request(ScanProtocol.STATUS)
+
+    def request(self, command: str, **parameters):
+        """
+        Send a request and return the result of its answer.
+
+        :raises LookupError: The daemon does not know the app asked for
+        :raises ScanClient.Unavailable: No answer (no daemon, timeout, another protocol version) or a failed scan
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.__timeout)
+                connection.connect(self.__socket_path)
+                ScanProtocol.send(connection, dict(parameters, command=command))
+                with connection.makefile('rb') as reader:
+                    response = ScanProtocol.receive(reader)
+        except OSError as e:
+            # Missing socket, refused connection, timeout, connection reset...
+            raise self.Unavailable(f"No answer from the scan daemon on {self.__socket_path}: {e}")
+        except ValueError as e:
+            # Another version of the daemon, the caller scans by itself as if there were none
+            raise self.Unavailable(f"Cannot talk to the scan daemon: {e}")
+
+        if response is None:
+            raise self.Unavailable("The scan daemon closed the connection without answering")
+        if response.get('ok'):
+            return response['result']
+
+        if response.get('kind') == ScanProtocol.LOOKUP_ERROR:
+            raise LookupError(response['error'])
+
+        # The daemon could not scan (permissions, internal error), the caller may still manage by itself
+        raise self.Unavailable(f"Scan daemon error: {response['error']}")
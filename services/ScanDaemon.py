@@ -0,0 +1,306 @@
+import os
+import select
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from models.AppModel import AppModel
+from models.ScanResult import ScanResult
+from repositories.AppCatalog import AppCatalog
+from repositories.AppRegistry import AppRegistry
+from repositories.PathIndex import PathIndex
+from services.AppService import AppService
+from services.CancellationToken import CancellationToken
+from services.FileLookupService import FileLookupService
+from services.MountService import MountService
+from services.ScanMetrics import ScanMetrics
+from services.ScanProtocol import ScanProtocol
+
+
+class ScanDaemon:
+    """
+    Background service owning the app list and the path index. Both are kept in memory and brought up to date
+    by periodic incremental rescans, and the clients' list-apps and find-related queries are answered from them
+    over a Unix domain socket, so several clients share one set of scans.
+    """
+
+    # Seconds between two rediscoveries of the apps, which only stat the Info.plist and helper folders of the bundles
+    REFRESH_INTERVAL = 30
+
+    # Age at which the periodic refresh rescans the path index, which stats every indexed directory. It is
+    # rescanned shortly before the queries would find it older than FileLookupService.INDEX_MAX_AGE and wait
+    # for a rescan, rather than on every refresh.
+    INDEX_REFRESH_AGE = FileLookupService.INDEX_MAX_AGE - 2 * REFRESH_INTERVAL
+
+    # Seconds after a forced rescan during which the clients asking for another one are answered from the
+    # index it rebuilt, so no client can keep the daemon rebuilding the index
+    FORCED_RESCAN_INTERVAL = 5 * 60
+
+    # Seconds between two checks that the client of a lookup is still connected
+    DISCONNECT_POLL_INTERVAL = 0.5
+
+    def __init__(self, socket_path: str = None, roots: List[str] = None, search_paths: List[str] = None,
+                 refresh_interval: float = None, workers: int = None, metrics: ScanMetrics = None) -> None:
+        self.__socket_path = socket_path or ScanProtocol.socket_path()
+        self.__app_service = AppService(roots or AppService.default_roots(), catalog=AppCatalog(), metrics=metrics)
+        self.__search_paths = search_paths
+        self.__refresh_interval = refresh_interval or self.REFRESH_INTERVAL
+        self.__workers = workers
+        self.__metrics = metrics or ScanMetrics.disabled()
+        self.__apps = AppRegistry()
+        self.__path_index = PathIndex(workers=workers)
+        # Reads the mount table once, a new one is created by every refresh to see the volumes mounted since
+        self.__mount_service = MountService()
+        # The path index is not thread safe, the lookups reading it and the rescans take turns
+        self.__index_lock = threading.Lock()
+        self.__forced_rescan_at = None
+        self.__forced_rescan_lock = threading.Lock()
+        self.__refreshed_at = None
+        self.__stopped = threading.Event()
+        self.__server = None
+
+    @property
+    def socket_path(self) -> str:
+        return self.__socket_path
+
+    def serve_forever(self) -> None:
+        """
+        Listen, scan, then answer the queries until stop() is called. The socket is removed on the way out.
+        It is bound before the first scan, so a second daemon finds it taken and exits without scanning, and the
+        clients connecting meanwhile wait for the scan instead of scanning by themselves.
+        """
+        self.__claim_socket()
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.handle(self.connection, self.rfile)
+
+        self.__server = socketserver.ThreadingUnixStreamServer(self.__socket_path, Handler, bind_and_activate=False)
+        self.__server.daemon_threads = True
+        # Clients connecting at once are refused beyond the backlog, on Unix sockets they are not retried
+        self.__server.request_queue_size = socket.SOMAXCONN
+        # Only the user can connect: the socket is created with these permissions rather than changed after bind
+        previous_umask = os.umask(0o177)
+        try:
+            self.__server.server_bind()
+        except OSError as e:
+            # Another daemon bound the socket since it was claimed
+            self.__server.server_close()
+            raise RuntimeError(f"Cannot listen on {self.__socket_path}: {e}") from e
+        finally:
+            os.umask(previous_umask)
+
+        try:
+            self.__server.server_activate()
+            self.refresh()
+            refresher = threading.Thread(target=self.__refresh_periodically, name='scan-daemon-refresh',
+                                         daemon=True)
+            refresher.start()
+            print(f"Scan daemon listening on {self.__socket_path}")
+            self.__server.serve_forever()
+        finally:
+            self.__stopped.set()
+            self.__server.server_close()
+            self.__remove_socket()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        if self.__server is not None:
+            self.__server.shutdown()
+
+    def refresh(self, force_rescan: bool = False) -> None:
+        """
+        Rediscover the apps and, once it is about to be stale, bring the path index up to date, listing only
+        the changed directories.
+        """
+        apps = self.__app_service.list_apps()
+        # Swapped at once, the queries read whichever list and mount table are current
+        self.__apps = apps
+        self.__mount_service = MountService()
+
+        lookup_service = self.__create_lookup_service()
+        with self.__index_lock:
+            # The index is built for the tier two lookup, which leaves the tier one locations to the live walk
+            self.__path_index.ensure_fresh(lookup_service.search_paths,
+                                           lookup_service.ignored_dirs + lookup_service.tier_one_paths(),
+                                           max_age=self.INDEX_REFRESH_AGE, force_rescan=force_rescan)
+        self.__refreshed_at = time.time()
+
+    def list_apps(self) -> AppRegistry:
+        return self.__apps
+
+    def find_related_files(self, app_model: AppModel, tier: int = FileLookupService.ALL_TIERS,
+                           force_rescan: bool = False, cancellation_token: CancellationToken = None) -> ScanResult:
+        """
+        Find the files related to an app: the tier one locations are walked live, they are small and change
+        often, the rest of the disk is answered from the warm path index. A forced rescan is only run if none
+        was run in the last FORCED_RESCAN_INTERVAL seconds.
+        """
+        force_rescan = force_rescan and self.__accept_forced_rescan()
+        tiers = [FileLookupService.TIER_ONE, FileLookupService.TIER_TWO] if tier == FileLookupService.ALL_TIERS \
+            else [tier]
+        paths = []
+        incomplete_reason = None
+        for lookup_tier in tiers:
+            lookup_service = self.__create_lookup_service(app_model, force_rescan, cancellation_token)
+            if lookup_tier == FileLookupService.TIER_ONE:
+                result = lookup_service.find_tier_one_related_files([app_model])[app_model]
+            else:
+                with self.__index_lock:
+                    result = lookup_service.find_tier_two_related_files([app_model])[app_model]
+            paths.extend(result)
+
+            if not result.complete:
+                incomplete_reason = result.reason
+                break
+
+        return ScanResult(paths, incomplete_reason is None, incomplete_reason)
+
+    def status(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'apps': self.__apps.length(),
+            'roots': self.__app_service.lookup_folders,
+            'refreshed_at': self.__refreshed_at,
+            'indexed_at': self.__path_index.refreshed_at,
+        }
+
+    def handle(self, connection: socket.socket, reader) -> None:
+        """Answer the requests of a connection until the client closes it"""
+        while True:
+            try:
+                request = ScanProtocol.receive(reader)
+            except ValueError as e:
+                ScanProtocol.send(connection, {'ok': False, 'error': str(e), 'kind': ScanProtocol.PROTOCOL_ERROR})
+                return
+            if request is None:
+                return
+
+            try:
+                response = {'ok': True, 'result': self.__answer(request, connection)}
+            except LookupError as e:
+                response = {'ok': False, 'error': str(e), 'kind': ScanProtocol.LOOKUP_ERROR}
+            except PermissionError as e:
+                response = {'ok': False, 'error': str(e), 'kind': ScanProtocol.PERMISSION_ERROR}
+            except (KeyError, TypeError, ValueError) as e:
+                response = {'ok': False, 'error': f"Malformed request: {e}", 'kind': ScanProtocol.PROTOCOL_ERROR}
+            except Exception as e:
+                print(f"Error answering {request.get('command')}: {e}")
+                response = {'ok': False, 'error': str(e), 'kind': ScanProtocol.INTERNAL_ERROR}
+
+            try:
+                ScanProtocol.send(connection, response)
+            except OSError:
+                # The client went away, e.g. it timed out waiting for the answer
+                return
+
+    def __answer(self, request: dict, connection: socket.socket):
+        command = request.get('command')
+        if command == ScanProtocol.LIST_APPS:
+            apps = self.list_apps()
+            return {
+                'apps': [ScanProtocol.app_record(app_model) for app_model in apps.list()],
+                'incomplete_reason': apps.incomplete_reason,
+            }
+
+        if command == ScanProtocol.FIND_RELATED:
+            if 'app' in request:
+                app_model = ScanProtocol.app_model(request['app'])
+            else:
+                app_model = self.__find_app(request['identifier'])
+            with self.__cancelled_on_disconnect(connection) as cancellation_token:
+                result = self.find_related_files(app_model, int(request.get('tier', FileLookupService.ALL_TIERS)),
+                                                 bool(request.get('force_rescan', False)), cancellation_token)
+            return {'paths': list(result), 'incomplete_reason': result.reason}
+
+        if command == ScanProtocol.STATUS:
+            return self.status()
+
+        raise ValueError(f"unknown command {command!r}")
+
+    def __find_app(self, identifier: str) -> AppModel:
+        for app_model in self.__apps.list():
+            if app_model.identifier == identifier:
+                return app_model
+
+        raise LookupError(f"No application found for {identifier}")
+
+    def __create_lookup_service(self, app_model: AppModel = None, force_rescan: bool = False,
+                                cancellation_token: CancellationToken = None) -> FileLookupService:
+        return FileLookupService(app_model, search_paths=self.__search_paths, path_index=self.__path_index,
+                                 force_rescan=force_rescan, workers=self.__workers,
+                                 cancellation_token=cancellation_token, metrics=self.__metrics,
+                                 mount_service=self.__mount_service)
+
+    def __accept_forced_rescan(self) -> bool:
+        with self.__forced_rescan_lock:
+            now = time.monotonic()
+            if self.__forced_rescan_at is not None and now - self.__forced_rescan_at < self.FORCED_RESCAN_INTERVAL:
+                return False
+
+            self.__forced_rescan_at = now
+            return True
+
+    @contextmanager
+    def __cancelled_on_disconnect(self, connection: socket.socket) -> Iterator[CancellationToken]:
+        """
+        Token of a lookup which is cancelled when its client closes the connection, e.g. because it timed out,
+        so the lookup does not keep scanning for nobody.
+        """
+        token = CancellationToken()
+        answered = threading.Event()
+
+        def watch():
+            while not answered.is_set():
+                try:
+                    readable, _, _ = select.select([connection], [], [], self.DISCONNECT_POLL_INTERVAL)
+                    if not readable or answered.is_set():
+                        continue
+                    # Data is the client's next request, only the end of the stream means it left
+                    if connection.recv(1, socket.MSG_PEEK):
+                        return
+                except (OSError, ValueError):
+                    # Reset by the client, or already closed by the server once answered
+                    pass
+                if not answered.is_set():
+                    token.cancel()
+                return
+
+        watcher = threading.Thread(target=watch, name='scan-daemon-watch', daemon=True)
+        watcher.start()
+        try:
+            yield token
+        finally:
+            answered.set()
+
+    def __refresh_periodically(self) -> None:
+        while not self.__stopped.wait(self.__refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing the scans: {e}")
+
+    def __claim_socket(self) -> None:
+        """Remove the socket left by a daemon which did not exit cleanly, refuse to start next to a live one"""
+        if not os.path.exists(self.__socket_path):
+            return
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.__socket_path)
+            except OSError:
+                self.__remove_socket()
+                return
+
+        raise RuntimeError(f"A scan daemon is already listening on {self.__socket_path}")
+
+    def __remove_socket(self) -> None:
+        try:
+            os.remove(self.__socket_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,94 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger('mac_apps_uninstaller.scan')
+
+
+class ScanMetrics:
+    """
+    Counters and per-phase timings of a scan. The methods are thread safe and cheap; use
+    ScanMetrics.disabled() where no metrics are wanted, whose methods do nothing.
+    """
+
+    DIRECTORIES_VISITED = 'directories_visited'
+    ENTRIES_EXAMINED = 'entries_examined'
+    SUBTREES_PRUNED = 'subtrees_pruned'
+    DIRECTORIES_DEDUPLICATED = 'directories_deduplicated'
+    DIRECTORIES_SKIPPED = 'directories_skipped'
+    VOLUMES_SCANNED = 'volumes_scanned'
+    VOLUMES_TIMED_OUT = 'volumes_timed_out'
+    PERMISSION_ERRORS = 'permission_errors'
+    BUNDLES_FOUND = 'bundles_found'
+    PLIST_READS = 'plist_reads'
+    MATCHES = 'matches'
+
+    def __init__(self, scan: str = 'scan') -> None:
+        self.scan = scan
+        self.__counters: Dict[str, int] = dict()
+        self.__phases: Dict[str, float] = dict()
+        self.__started = time.monotonic()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def disabled() -> 'ScanMetrics':
+        return _DisabledScanMetrics()
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def increment(self, counter: str, count: int = 1) -> None:
+        with self.__lock:
+            self.__counters[counter] = self.__counters.get(counter, 0) + count
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase of the scan, phases with the same name add up"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self.__lock:
+                self.__phases[name] = self.__phases.get(name, 0.0) + elapsed
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            return {
+                'scan': self.scan,
+                'elapsed': round(time.monotonic() - self.__started, 3),
+                'counters': dict(self.__counters),
+                'phases': {name: round(seconds, 3) for name, seconds in self.__phases.items()},
+            }
+
+    def summary(self) -> str:
+        """One line human readable summary of the counters"""
+        counters = self.snapshot()['counters']
+        return ", ".join(f"{name.replace('_', ' ')}: {value}" for name, value in sorted(counters.items()))
+
+    def log(self, **fields) -> None:
+        """Write the final figures to the scan log as a single JSON record"""
+        logger.info(json.dumps(dict(self.snapshot(), **fields), sort_keys=True))
+
+
+class _DisabledScanMetrics(ScanMetrics):
+    def __init__(self) -> None:
+        super().__init__('disabled')
+
+    @property
+    def enabled(self) -> bool:
+        return False
+
+    def increment(self, counter: str, count: int = 1) -> None:
+        pass
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def log(self, **fields) -> None:
+        pass
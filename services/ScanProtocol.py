@@ -0,0 +1,81 @@
+import json
+import socket
+from typing import Optional
+
+from models.AppModel import AppModel
+from services.CacheDirectory import CacheDirectory
+
+
+class ScanProtocol:
+    """
+    Protocol spoken between the scan daemon and its clients over a Unix domain socket: one JSON object per line.
+
+    A request is {"version": VERSION, "command": ..., ...parameters}, its response is
+    {"version": VERSION, "ok": true, "result": ...} or {"version": VERSION, "ok": false, "error": ..., "kind": ...}.
+    Requests of another version are refused, a change of the messages has to bump VERSION.
+    """
+
+    VERSION = 1
+    SOCKET_NAME = 'scan_daemon.sock'
+
+    LIST_APPS = 'list-apps'
+    FIND_RELATED = 'find-related'
+    STATUS = 'status'
+    COMMANDS = (LIST_APPS, FIND_RELATED, STATUS)
+
+    # Kinds of errors, so a client can raise the same exception as a local scan
+    LOOKUP_ERROR = 'lookup'
+    PERMISSION_ERROR = 'permission'
+    PROTOCOL_ERROR = 'protocol'
+    INTERNAL_ERROR = 'internal'
+
+    # Requests and responses are read line by line, a larger one is a protocol error
+    MAX_LINE = 64 * 1024 * 1024
+
+    @classmethod
+    def socket_path(cls) -> str:
+        return CacheDirectory.path(cls.SOCKET_NAME)
+
+    @staticmethod
+    def app_record(app_model: AppModel) -> dict:
+        return {
+            'name': app_model.name,
+            'identifier': app_model.identifier,
+            'path': app_model.path,
+            'display_name': app_model.display_name,
+            'version': app_model.version,
+            'executable': app_model.executable,
+            'helper_identifiers': list(app_model.helper_identifiers),
+            'copies': [list(copy) for copy in app_model.copies],
+        }
+
+    @staticmethod
+    def app_model(record: dict) -> AppModel:
+        return AppModel(record['name'], record['identifier'], record['path'], record['display_name'],
+                        record['version'], record['executable'], record['helper_identifiers'],
+                        [tuple(copy) for copy in record['copies']])
+
+    @classmethod
+    def send(cls, connection: socket.socket, message: dict) -> None:
+        connection.sendall(json.dumps(dict(message, version=cls.VERSION)).encode('utf-8') + b'\n')
+
+    @classmethod
+    def receive(cls, reader) -> Optional[dict]:
+        """
+        Read one message from a binary file object of the connection.
+
+        :return: The message, None when the other end closed the connection
+        """
+        line = reader.readline(cls.MAX_LINE + 1)
+        if not line:
+            return None
+        if len(line) > cls.MAX_LINE:
+            raise ValueError("Message too large")
+
+        message = json.loads(line)
+        if not isinstance(message, dict):
+            raise ValueError("Message is not a JSON object")
+        if message.get('version') != cls.VERSION:
+            raise ValueError(f"Unsupported protocol version {message.get('version')}, expected {cls.VERSION}")
+
+        return message
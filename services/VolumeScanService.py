@@ -0,0 +1,227 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from models.AppModel import AppModel
+from models.MountPoint import MountPoint
+from services.CancellationToken import CancellationToken
+from services.FileLookupService import FileLookupService
+from services.MountService import MountService
+from services.PathTrie import PathTrie
+from services.ScanMetrics import ScanMetrics
+
+
+class VolumeScanService(FileLookupService):
+    """
+    Lookup of the related files which walks every selected volume below the search paths in its own process, so a
+    slow device cannot hold up the others, and merges the matches streamed back by the processes. Network shares,
+    pseudo file systems and removable volumes are left out unless the mount service selects them.
+
+    Every volume process is bounded by the volume timeout: it stops by itself with partial results, and is killed
+    if it is still blocked in a system call KILL_GRACE seconds later. Without a timeout, a process which sends
+    nothing for STALL_TIMEOUT seconds is killed. Every process sends its messages through a pipe of its own, so a
+    process killed in the middle of a message only loses its own volume. The path index is not used.
+    """
+
+    # Reason of an incomplete lookup when a volume process failed
+    VOLUME_ERROR = 'volume_error'
+
+    # Minimum number of seconds between two batches of matches sent by a volume process
+    PROGRESS_INTERVAL = 0.1
+
+    # Seconds given to a volume process to stop by itself after its timeout before it is killed
+    KILL_GRACE = 2.0
+
+    # Seconds without any message after which a volume process is considered blocked in a system call and
+    # killed, with or without a volume timeout. A process walking a volume reports every PROGRESS_INTERVAL.
+    STALL_TIMEOUT = 60.0
+
+    def __init__(self, app_model: AppModel = None, search_paths: List[str] = None, ignored_dirs: List[str] = None,
+                 workers: int = None, cancellation_token: CancellationToken = None, metrics: ScanMetrics = None,
+                 mount_service: MountService = None, volume_timeout: float = None,
+                 devices: Iterable[int] = None) -> None:
+        self.__mount_service = mount_service or MountService()
+        super().__init__(app_model, search_paths, ignored_dirs, workers=workers,
+                         cancellation_token=cancellation_token, metrics=metrics, devices=devices,
+                         mount_service=self.__mount_service)
+        self.__volume_timeout = volume_timeout
+        self.__timed_out_volumes: List[str] = list()
+
+    @property
+    def timed_out_volumes(self) -> List[str]:
+        """Mount points of the volumes of the last lookup which timed out or stalled"""
+        return self.__timed_out_volumes
+
+    def volumes(self) -> List[Tuple[MountPoint, List[str], List[str]]]:
+        """Volumes walked by a lookup: (mount, roots, ignored dirs), the ignored dirs include the nested mounts"""
+        ignored = self.ignored_dirs
+        ignored_trie = PathTrie(ignored)
+        volumes = list()
+        for mount, roots, nested in self.__mount_service.volumes(self.search_paths):
+            # e.g. /System/Volumes/Data, whose content is reached through the firmlinks of /
+            roots = [root for root in roots if not ignored_trie.covers(root)]
+            if roots:
+                volumes.append((mount, roots, ignored + [path for path in nested if path not in ignored]))
+
+        return volumes
+
+    def walk_related_files(self, app_models: List[AppModel],
+                           tier: int = FileLookupService.ALL_TIERS) -> Iterator[Tuple[str, List[Tuple[AppModel, str]]]]:
+        self.__timed_out_volumes = list()
+
+        # The well known locations are a handful of folders, not worth a process
+        if tier == self.TIER_ONE:
+            yield from super().walk_related_files(app_models, tier)
+            return
+
+        self._set_progress(0)
+        if '/' in self.search_paths and not os.access("/private", os.R_OK):
+            raise PermissionError("Python does not have read access to the /private folder.")
+
+        if tier != self.TIER_TWO:
+            yield '', [(app_model, path) for app_model in app_models for path in app_model.paths]
+
+        token = self._cancellation_token
+        metrics = self._metrics
+        # Every volume process gets the whole budget, the entries they examine are accounted for by the token
+        max_entries = token.max_entries if token is not None else None
+        context = multiprocessing.get_context('spawn')
+        processes = dict()
+        pipes = dict()
+        for mount, roots, ignored in self.volumes():
+            pipes[mount.path] = context.Pipe(duplex=False)
+            processes[mount.path] = context.Process(target=_scan_volume, daemon=True,
+                                                    args=(mount.path, roots, ignored, app_models, tier, self._workers,
+                                                          self._devices, self.__volume_timeout, max_entries,
+                                                          pipes[mount.path][1]))
+        volume_of = {reader: volume for volume, (reader, _) in pipes.items()}
+        metrics.increment(ScanMetrics.VOLUMES_SCANNED, len(processes))
+
+        running = set(processes)
+        visited_dirs = dict()
+        examined_entries = dict()
+        stopped = list()
+        with metrics.phase('walk'):
+            for volume, process in processes.items():
+                process.start()
+                # Only the volume process holds the sending end, its pipe reaches the end of file when it exits
+                pipes[volume][1].close()
+            started = time.monotonic()
+            last_message = dict.fromkeys(processes, started)
+
+            try:
+                while running:
+                    if token is not None and token.is_stopped():
+                        stopped.append(token.reason)
+                        break
+
+                    # Every volume started at the same time, the ones still running are all overdue
+                    if (self.__volume_timeout is not None and
+                            time.monotonic() - started > self.__volume_timeout + self.KILL_GRACE):
+                        self.__timed_out_volumes.extend(sorted(running))
+                        metrics.increment(ScanMetrics.VOLUMES_TIMED_OUT, len(running))
+                        stopped.append(CancellationToken.DEADLINE)
+                        break
+
+                    for volume in sorted(running):
+                        if time.monotonic() - last_message[volume] > self.STALL_TIMEOUT:
+                            print(f"Error scanning {volume}: no progress for {self.STALL_TIMEOUT:.0f}s, stopped")
+                            self.__stop([processes[volume]])
+                            running.discard(volume)
+                            self.__timed_out_volumes.append(volume)
+                            metrics.increment(ScanMetrics.VOLUMES_TIMED_OUT)
+                            stopped.append(CancellationToken.DEADLINE)
+
+                    ready = multiprocessing.connection.wait([pipes[volume][0] for volume in sorted(running)],
+                                                            timeout=0.1)
+                    for reader in ready:
+                        volume = volume_of[reader]
+                        if volume not in running:
+                            continue
+
+                        try:
+                            message = reader.recv()
+                        except (EOFError, OSError) as e:
+                            # The process exited, or was killed, before sending its results
+                            processes[volume].join(self.KILL_GRACE)
+                            print(f"Error scanning {volume}: exit code {processes[volume].exitcode} ({e!r})")
+                            running.discard(volume)
+                            stopped.append(self.VOLUME_ERROR)
+                            continue
+
+                        kind = message[0]
+                        last_message[volume] = time.monotonic()
+                        if kind == 'progress':
+                            directory, visited_dirs[volume], entries, matches = message[2:]
+                            self._set_progress(sum(visited_dirs.values()))
+                            if token is not None:
+                                token.consume(entries - examined_entries.get(volume, 0))
+                                examined_entries[volume] = entries
+                            yield directory, [(app_models[idx], path) for idx, path in matches]
+                        elif kind == 'done':
+                            visited_dirs[volume], reason, counters = message[2:]
+                            self._set_progress(sum(visited_dirs.values()))
+                            running.discard(volume)
+                            for counter, count in counters.items():
+                                metrics.increment(counter, count)
+                            if reason is not None:
+                                stopped.append(reason)
+                            if reason == CancellationToken.DEADLINE:
+                                self.__timed_out_volumes.append(volume)
+                                metrics.increment(ScanMetrics.VOLUMES_TIMED_OUT)
+                        elif kind == 'error':
+                            print(f"Error scanning {volume}: {message[2]}")
+                            running.discard(volume)
+                            stopped.append(self.VOLUME_ERROR)
+            finally:
+                self.__stop(processes.values())
+                for reader, _ in pipes.values():
+                    reader.close()
+
+        self._set_progress(sum(visited_dirs.values()), stopped[0] if stopped else None)
+
+    @classmethod
+    def __stop(cls, processes: Iterable[multiprocessing.Process]) -> None:
+        """Terminate the volume processes still running, and kill the ones still there KILL_GRACE seconds later"""
+        processes = [process for process in processes if process.is_alive()]
+        for process in processes:
+            process.terminate()
+
+        deadline = time.monotonic() + cls.KILL_GRACE
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join(cls.KILL_GRACE)
+
+
+def _scan_volume(volume: str, roots: List[str], ignored_dirs: List[str], app_models: List[AppModel], tier: int,
+                 workers: int, devices: Optional[FrozenSet[int]], timeout: float, max_entries: Optional[int],
+                 connection) -> None:
+    """Walk one volume in a volume process, sending the matches back through its pipe as (app index, path) batches"""
+    try:
+        metrics = ScanMetrics('volume')
+        token = CancellationToken(timeout=timeout, max_entries=max_entries)
+        lookup_service = FileLookupService(search_paths=roots, ignored_dirs=ignored_dirs, workers=workers,
+                                           cancellation_token=token, metrics=metrics, devices=devices)
+        indexes = {id(app_model): idx for idx, app_model in enumerate(app_models)}
+        batch = list()
+        last_sent = time.monotonic()
+        directory = ''
+        for directory, matches in lookup_service.walk_related_files(app_models, tier):
+            # The app paths are yielded once by the parent
+            if directory:
+                batch.extend((indexes[id(app_model)], path) for app_model, path in matches)
+
+            if time.monotonic() - last_sent >= VolumeScanService.PROGRESS_INTERVAL:
+                connection.send(('progress', volume, directory, lookup_service.visited_dirs, token.entries, batch))
+                batch = list()
+                last_sent = time.monotonic()
+
+        connection.send(('progress', volume, directory, lookup_service.visited_dirs, token.entries, batch))
+        connection.send(('done', volume, lookup_service.visited_dirs, lookup_service.incomplete_reason,
+                      metrics.snapshot()['counters']))
+    except Exception as e:
+        connection.send(('error', volume, str(e)))
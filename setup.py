@@ -24,7 +24,7 @@ OPTIONS = {
         'NSHighResolutionCapable': True,
     },
     'packages': ['PySide6'],
-    'includes': ['models', 'services', 'repositories'],
+    'includes': ['models', 'services', 'repositories', 'views'],
 }
 
 setup(
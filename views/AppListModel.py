@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QIcon
+
+from models.AppMetadata import AppMetadata
+from models.AppModel import AppModel
+from services.DiskUsageService import DiskUsageService
+from views.AppMetadataLoader import AppMetadataLoader
+
+
+class AppListModel(QAbstractListModel):
+    """
+    Apps shown by the app list, sorted by name. The view only asks for the rows it paints, so no widget item
+    is created per app, and the icon and details of a row are only loaded once the row is painted.
+    """
+
+    # Icons kept in memory, the thumbnails stay on disk
+    ICON_CACHE_SIZE = 256
+
+    def __init__(self, metadata_loader: AppMetadataLoader = None, parent=None):
+        super().__init__(parent)
+        self.__apps: List[AppModel] = []
+        self.__rows = dict()
+        self.__metadata_loader = metadata_loader
+        self.__icons: 'OrderedDict[str, QIcon]' = OrderedDict()
+        if metadata_loader is not None:
+            metadata_loader.loaded.connect(self.__on_metadata_loaded)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.__apps)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        app = self.__apps[index.row()]
+        if role == Qt.DisplayRole:
+            return app.name
+        if role == Qt.UserRole:
+            return app
+        if role not in (Qt.DecorationRole, Qt.ToolTipRole):
+            return None
+
+        metadata = self.metadata(app)
+        if role == Qt.ToolTipRole:
+            return self.describe(app, metadata)
+        if metadata is None or metadata.thumbnail_path is None:
+            return None
+
+        return self.__icon(metadata.thumbnail_path)
+
+    def metadata(self, app: AppModel) -> Optional[AppMetadata]:
+        """Metadata of an app if it is loaded, otherwise it is requested and the row is updated once loaded"""
+        if self.__metadata_loader is None:
+            return None
+
+        metadata = self.__metadata_loader.cached(app.path)
+        if metadata is None:
+            self.__metadata_loader.request(app)
+
+        return metadata
+
+    @staticmethod
+    def describe(app: AppModel, metadata: Optional[AppMetadata]) -> str:
+        lines = [app.path]
+        if metadata is None:
+            return "\n".join(lines)
+
+        if metadata.version:
+            lines.append(f"Version: {metadata.version}")
+        if metadata.size is not None:
+            lines.append(f"Size: {DiskUsageService.format_size(metadata.size)}")
+        if metadata.last_used is not None:
+            lines.append(f"Last used: {time.strftime('%Y-%m-%d %H:%M', time.localtime(metadata.last_used))}")
+
+        return "\n".join(lines)
+
+    def set_apps(self, apps: List[AppModel]) -> None:
+        self.beginResetModel()
+        self.__apps = sorted(apps, key=lambda app: app.name.lower())
+        self.__rows = {app.path: row for row, app in enumerate(self.__apps)}
+        self.endResetModel()
+
+    def app(self, row: int) -> Optional[AppModel]:
+        return self.__apps[row] if 0 <= row < len(self.__apps) else None
+
+    def row_of(self, path: str) -> int:
+        """Row of the app installed at a path, -1 if it is not listed"""
+        return self.__rows.get(path, -1)
+
+    def __icon(self, thumbnail_path: str) -> QIcon:
+        icon = self.__icons.get(thumbnail_path)
+        if icon is None:
+            icon = QIcon(thumbnail_path)
+            self.__icons[thumbnail_path] = icon
+            while len(self.__icons) > self.ICON_CACHE_SIZE:
+                self.__icons.popitem(last=False)
+        else:
+            self.__icons.move_to_end(thumbnail_path)
+
+        return icon
+
+    def __on_metadata_loaded(self, bundle_path: str, metadata: AppMetadata) -> None:
+        row = self.row_of(bundle_path)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole, Qt.ToolTipRole])
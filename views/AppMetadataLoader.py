@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QImage
+
+from models.AppMetadata import AppMetadata
+from models.AppModel import AppModel
+from services.AppMetadataService import AppMetadataService
+
+
+def create_thumbnail(icon_path: str, thumbnail_path: str, size: int) -> bool:
+    """Scale an icon file (.icns, .png) down to a PNG thumbnail, QImage can be used outside the GUI thread"""
+    image = QImage(icon_path)
+    if image.isNull():
+        return False
+
+    tmp_path = f"{thumbnail_path}.tmp.png"
+    if not image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation).save(tmp_path, 'PNG'):
+        return False
+    os.replace(tmp_path, thumbnail_path)
+
+    return True
+
+
+class AppMetadataLoader(QObject):
+    """
+    Loads the metadata of the apps whose rows are painted on a small thread pool. The most recent requests are
+    served first and the oldest pending ones are dropped, so after scrolling the rows on screen load first; a
+    dropped row is asked for again if it is painted again.
+    """
+
+    loaded = Signal(str, object)  # Signal emitted with the bundle path and its AppMetadata
+
+    WORKERS = 4
+    MAX_PENDING = 64
+
+    def __init__(self, metadata_service: AppMetadataService, parent=None):
+        super().__init__(parent)
+        self.__metadata_service = metadata_service
+        self.__pool = QThreadPool(self)
+        self.__pool.setMaxThreadCount(self.WORKERS)
+        self.__pending: 'OrderedDict[str, str]' = OrderedDict()
+        self.__requested = set()
+        self.__running = 0
+        self.__lock = threading.Lock()
+
+    def cached(self, bundle_path: str) -> Optional[AppMetadata]:
+        return self.__metadata_service.cached(bundle_path)
+
+    def request(self, app: AppModel) -> None:
+        with self.__lock:
+            if app.path in self.__pending:
+                self.__pending.move_to_end(app.path)
+                return
+            if app.path in self.__requested:
+                return
+
+            self.__pending[app.path] = app.executable
+            self.__requested.add(app.path)
+            while len(self.__pending) > self.MAX_PENDING:
+                dropped, _ = self.__pending.popitem(last=False)
+                self.__requested.discard(dropped)
+
+            start = self.__running < self.WORKERS
+            if start:
+                self.__running += 1
+
+        if start:
+            self.__pool.start(_MetadataTask(self))
+
+    def wait(self) -> None:
+        self.__pool.waitForDone()
+
+    def _next_request(self):
+        """Most recent pending request, None when there is none and the calling task ends"""
+        with self.__lock:
+            if self.__pending:
+                return self.__pending.popitem(last=True)
+
+            self.__running -= 1
+            idle = self.__running == 0
+
+        # The cache is written once the queue is drained rather than after every app
+        if idle:
+            self.__metadata_service.flush()
+        return None
+
+    def _load(self, bundle_path: str, executable: str) -> None:
+        try:
+            metadata = self.__metadata_service.read(bundle_path, executable)
+        except Exception as e:
+            print(f"Error reading the metadata of {bundle_path}: {e}")
+            metadata = None
+
+        with self.__lock:
+            self.__requested.discard(bundle_path)
+        if metadata is not None:
+            self.loaded.emit(bundle_path, metadata)
+
+
+class _MetadataTask(QRunnable):
+    def __init__(self, loader: AppMetadataLoader):
+        super().__init__()
+        self.__loader = loader
+
+    def run(self):
+        while True:
+            request = self.__loader._next_request()
+            if request is None:
+                return
+
+            self.__loader._load(*request)
@@ -0,0 +1,156 @@
+import heapq
+from typing import Iterable, List, Tuple
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from services.DiskUsageService import DiskUsageService
+
+
+class RelatedFilesModel(QAbstractTableModel):
+    """
+    Related files of the selected app, with a checkbox to include or exclude every path from the uninstall and
+    the size of the path once it is measured. Rows are appended in batches while the lookup streams its results,
+    and the view only renders the visible rows, so it stays responsive with hundreds of thousands of paths.
+    """
+
+    PATH_COLUMN = 0
+    SIZE_COLUMN = 1
+    HEADERS = ['Path', 'Size']
+
+    # Raw value to sort a column by, the displayed size is formatted
+    SORT_ROLE = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.__paths: List[str] = []
+        self.__rows = dict()
+        self.__checked = bytearray()
+        self.__sizes = dict()
+        self.__checked_size = 0
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.__paths)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        path = self.__paths[row]
+        if index.column() == self.PATH_COLUMN:
+            if role in (Qt.DisplayRole, Qt.ToolTipRole, self.SORT_ROLE):
+                return path
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.__checked[row] else Qt.Unchecked
+        else:
+            size = self.__sizes.get(path)
+            if role == Qt.DisplayRole:
+                return DiskUsageService.format_size(size) if size is not None else ''
+            if role == self.SORT_ROLE:
+                return size if size is not None else -1
+            if role == Qt.TextAlignmentRole:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+
+        return None
+
+    def setData(self, index: QModelIndex, value, role: int = Qt.EditRole) -> bool:
+        if not index.isValid() or index.column() != self.PATH_COLUMN or role != Qt.CheckStateRole:
+            return False
+
+        row = index.row()
+        checked = Qt.CheckState(value) == Qt.Checked
+        if checked != bool(self.__checked[row]):
+            self.__checked[row] = checked
+            size = self.__sizes.get(self.__paths[row], 0)
+            self.__checked_size += size if checked else -size
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+        return True
+
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.PATH_COLUMN:
+            flags |= Qt.ItemIsUserCheckable
+
+        return flags
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self.__paths = []
+        self.__rows = dict()
+        self.__checked = bytearray()
+        self.__sizes = dict()
+        self.__checked_size = 0
+        self.endResetModel()
+
+    def append_paths(self, paths: Iterable[str]) -> None:
+        """Append a batch of paths, checked, skipping the ones already listed"""
+        new_paths = list()
+        for path in paths:
+            if path not in self.__rows:
+                self.__rows[path] = len(self.__paths) + len(new_paths)
+                new_paths.append(path)
+        if not new_paths:
+            return
+
+        first = len(self.__paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+        self.__paths.extend(new_paths)
+        self.__checked.extend(b'\x01' * len(new_paths))
+        self.endInsertRows()
+
+    def set_size(self, path: str, size: int) -> None:
+        row = self.__rows.get(path)
+        if row is None:
+            return
+
+        if self.__checked[row]:
+            self.__checked_size += size - self.__sizes.get(path, 0)
+        self.__sizes[path] = size
+        index = self.index(row, self.SIZE_COLUMN)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def set_all_checked(self, checked: bool) -> None:
+        if not self.__paths:
+            return
+
+        self.__checked = bytearray([checked]) * len(self.__paths)
+        self.__checked_size = sum(self.__sizes.values()) if checked else 0
+        self.dataChanged.emit(self.index(0, self.PATH_COLUMN), self.index(len(self.__paths) - 1, self.PATH_COLUMN),
+                              [Qt.CheckStateRole])
+
+    def paths(self) -> List[str]:
+        return list(self.__paths)
+
+    def checked_paths(self) -> List[str]:
+        return [path for path, checked in zip(self.__paths, self.__checked) if checked]
+
+    def largest_checked(self, count: int) -> List[Tuple[str, int]]:
+        """(path, size) of the largest checked paths measured so far, largest first"""
+        return heapq.nlargest(count, ((path, size) for path, size in self.__sizes.items()
+                                      if self.__checked[self.__rows[path]]), key=lambda item: item[1])
+
+    @property
+    def checked_count(self) -> int:
+        return self.__checked.count(1)
+
+    @property
+    def checked_size(self) -> int:
+        """Bytes measured so far of the checked paths"""
+        return self.__checked_size
+
+    @property
+    def measured_count(self) -> int:
+        return len(self.__sizes)